@@ -0,0 +1 @@
+"""Modules shared by the model_exp and voicebot apps"""
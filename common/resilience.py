@@ -0,0 +1,770 @@
+"""
+Deadlines, retries and hedged requests for backend calls.
+
+Every call to a backend (STT, translation, TTS, OCR, Gemini) goes through the
+Policy for its endpoint:
+
+    response = POLICIES["tts"].call(lambda timeout: requests.post(url, json=body, timeout=timeout))
+
+The callable gets the per-attempt timeout, already clipped to what is left of
+the endpoint's overall deadline, and must be safe to run more than once (build
+file objects inside it). Failed attempts - transport errors or a retryable
+status - are retried with full-jitter exponential backoff while the deadline
+allows. With hedging on, a duplicate request is fired when the first has not
+answered within the endpoint's recent p95 latency, the first good answer wins
+and the loser is cancelled (async) or has its response closed (threads).
+
+When retries run out, the last response is returned (so callers keep their
+status handling) or the last error is raised.
+
+Each Policy also has a CircuitBreaker. Once most recent calls to a backend
+have failed (after retries), calls fail fast with CircuitOpenError instead of each
+waiting out its timeout, until a trial call shows the backend is back.
+
+A service with several replicas puts a ReplicaPool in front of fn:
+
+    POLICIES["tts"].call(TTS_REPLICAS.bind(lambda url, timeout: requests.post(url, ...)))
+
+Every attempt (hedges included) then goes to the replica with the lowest
+(in-flight + 1) x EWMA latency, and a replica that keeps failing is taken
+out of rotation for a while.
+
+Passing key=request_key(...) coalesces identical concurrent calls: the
+first runs, the rest wait for it and get the same result.
+"""
+
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+LATENCY_WINDOW = 200
+# Latency samples needed before the p95 replaces the default hedge delay
+MIN_LATENCY_SAMPLES = 20
+HEDGE_WORKERS = 32
+# Hedges may add at most HEDGE_BUDGET extra requests per attempt (a token
+# bucket holding up to HEDGE_BURST), so a slow backend is not sent double load
+HEDGE_BUDGET = 0.1
+HEDGE_BURST = 5
+# Async attempts are also bounded by wait_for, a little after the client's own
+# timeout so that the client's timeout error (a replica failure) surfaces first
+WAIT_FOR_GRACE = 0.5
+
+# Circuit breaker defaults: open when at least BREAKER_FAILURE_RATE of the
+# calls in the last BREAKER_WINDOW seconds failed (and there were at least
+# BREAKER_MIN_CALLS), try again after BREAKER_RESET_TIMEOUT
+BREAKER_WINDOW = 30.0
+BREAKER_MIN_CALLS = 5
+BREAKER_FAILURE_RATE = 0.5
+BREAKER_RESET_TIMEOUT = 15.0
+
+# Replica scoring and ejection
+EWMA_ALPHA = 0.3
+EJECT_AFTER_FAILURES = 3
+EJECT_SECONDS = 30.0
+
+
+class CircuitOpenError(Exception):
+    """A backend's circuit breaker is open - the call was not attempted"""
+
+    def __init__(self, name, retry_in):
+        detail = f"circuit open, retrying in {retry_in:.0f}s" if retry_in > 0 else "circuit half-open, trial call in flight"
+        super().__init__(f"{name} backend unavailable ({detail})")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def _transport_errors():
+    """Connection/timeout exception types of whichever HTTP libraries are installed"""
+    types = [ConnectionError, TimeoutError]
+    try:
+        import requests
+        types += [requests.exceptions.ConnectionError, requests.exceptions.Timeout]
+    except ImportError:
+        pass
+    try:
+        import httpx
+        types.append(httpx.TransportError)
+    except ImportError:
+        pass
+    return tuple(types)
+
+
+def is_transient(error):
+    """Default retry test for exceptions: connection failures and timeouts"""
+    return isinstance(error, _transport_errors())
+
+
+def request_key(*parts):
+    """Hash identifying a request by its parts (bytes, or anything JSON-serializable)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else \
+            json.dumps(part, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers with the same key.
+
+    Nothing is cached: once the call finishes the key is free again.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._tasks = {}
+        self._waiters = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return call.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def ado(self, key, fn):
+        """Async do: fn() returns an awaitable. One event loop per process (as under uvicorn).
+
+        The shared task is cancelled once every caller waiting on it has been
+        cancelled, so a call nobody wants any more stops at the backend too.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            self._waiters[task] = 0
+
+            def forget(done):
+                if self._tasks.get(key) is done:
+                    del self._tasks[key]
+                if not done.cancelled():
+                    done.exception()  # mark retrieved even if every caller went away
+
+            task.add_done_callback(forget)
+        else:
+            self.coalesced += 1
+
+        self._waiters[task] += 1
+        try:
+            # Shielded: one caller going away does not cancel the call for the others
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if self._waiters[task] == 0:
+                del self._waiters[task]
+                if not task.done():
+                    # The last caller was cancelled: later callers start a fresh call
+                    if self._tasks.get(key) is task:
+                        del self._tasks[key]
+                    task.cancel()
+
+
+class Deadline:
+    """Overall time budget for one logical call, across retries and hedges"""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def timeout(self, per_attempt):
+        # Never 0 - HTTP clients treat that as "no timeout" or reject it
+        return max(0.001, min(per_attempt, self.remaining()))
+
+
+class LatencyTracker:
+    """Rolling window of winning-attempt latencies.
+
+    Losing hedges are not recorded, so the p95 tracks a healthy replica and
+    a slow one does not push the hedge delay out.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        with self._lock:
+            if len(self._samples) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class CircuitBreaker:
+    """closed -> open -> half_open -> closed breaker over a sliding failure-rate window.
+
+    open fails every call fast; after reset_timeout it turns half_open and
+    lets one trial call through, which closes the breaker on success and
+    reopens it on failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 failure_rate=BREAKER_FAILURE_RATE, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.reset_timeout = reset_timeout
+        self.opened = 0
+        self.rejected = 0
+        self._events = deque()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _current_state(self, now):
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def _open(self, now):
+        self._state = self.OPEN
+        self._opened_at = now
+        self._events.clear()
+        self.opened += 1
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    @property
+    def available(self):
+        """False while open - callers can skip optional work (e.g. TTS) up front"""
+        return self.state != self.OPEN
+
+    def retry_in(self):
+        with self._lock:
+            if self._current_state(time.monotonic()) != self.OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def error(self):
+        """CircuitOpenError describing the current state, for callers that skip the call themselves"""
+        return CircuitOpenError(self.name, self.retry_in())
+
+    def check(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self._opened_at + self.reset_timeout - now)
+        raise CircuitOpenError(self.name, retry_in)
+
+    def record(self, ok):
+        """Outcome of a call: True, False, or None when it says nothing about the backend"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                if ok is True:
+                    self._state = self.CLOSED
+                    self._events.clear()
+                elif ok is False:
+                    self._open(now)
+                return
+            if state == self.OPEN or ok is None:
+                return
+
+            self._events.append((now, ok))
+            while self._events and self._events[0][0] < now - self.window:
+                self._events.popleft()
+            failures = sum(1 for _, success in self._events if not success)
+            if len(self._events) >= self.min_calls and failures / len(self._events) >= self.failure_rate:
+                self._open(now)
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            recent = [success for at, success in self._events if at >= now - self.window]
+            return {
+                "state": state,
+                "failure_rate": round(1 - sum(recent) / len(recent), 2) if recent else 0.0,
+                "window_calls": len(recent),
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "retry_in_s": round(max(0.0, self._opened_at + self.reset_timeout - now), 1)
+                if state == self.OPEN else 0.0
+            }
+
+
+class Replica:
+    """One backend URL with its load and health"""
+
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        self.ewma = None
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    def score(self, default_latency):
+        """Expected wait: requests ahead of us times typical latency"""
+        latency = self.ewma if self.ewma is not None else default_latency
+        return (self.outstanding + 1) * latency
+
+
+class ReplicaPool:
+    """Least-loaded routing over the replicas of one service.
+
+    A replica with no latency samples yet is scored with the pool's mean, so a
+    newly added replica starts taking traffic at once. After
+    eject_after consecutive failures a replica is skipped for eject_for
+    seconds; when it comes back, one more failure ejects it again.
+    """
+
+    def __init__(self, name, urls, ewma_alpha=EWMA_ALPHA, eject_after=EJECT_AFTER_FAILURES,
+                 eject_for=EJECT_SECONDS, retry_statuses=RETRY_STATUSES):
+        if not urls:
+            raise ValueError(f"{name} needs at least one replica URL")
+        self.name = name
+        self.replicas = [Replica(url) for url in urls]
+        self.ewma_alpha = ewma_alpha
+        self.eject_after = eject_after
+        self.eject_for = eject_for
+        self.retry_statuses = retry_statuses
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.replicas)
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            known = [r.ewma for r in self.replicas if r.ewma is not None]
+            default_latency = sum(known) / len(known) if known else 1.0
+            healthy = [r for r in self.replicas if r.ejected_until <= now]
+            if healthy:
+                replica = min(healthy, key=lambda r: (r.score(default_latency), r.outstanding))
+            else:
+                # Everything is ejected: rather than fail, try the one due back first
+                replica = min(self.replicas, key=lambda r: r.ejected_until)
+            replica.outstanding += 1
+            replica.requests += 1
+            return replica
+
+    def release(self, replica, ok, latency=None):
+        """ok is True/False, or None for a cancelled attempt that says nothing about the replica"""
+        with self._lock:
+            replica.outstanding -= 1
+            if ok is True:
+                replica.consecutive_failures = 0
+                if latency is not None:
+                    replica.ewma = latency if replica.ewma is None else \
+                        self.ewma_alpha * latency + (1 - self.ewma_alpha) * replica.ewma
+            elif ok is False:
+                replica.failures += 1
+                replica.consecutive_failures += 1
+                if replica.consecutive_failures >= self.eject_after:
+                    replica.ejected_until = time.monotonic() + self.eject_for
+
+    def _judge(self, result=None, error=None):
+        if error is not None:
+            return False if is_transient(error) else None
+        return getattr(result, "status_code", None) not in self.retry_statuses
+
+    def bind(self, fn):
+        """fn(url, timeout) -> fn(timeout) that runs against the best replica"""
+        def attempt(timeout):
+            replica = self.acquire()
+            start = time.monotonic()
+            try:
+                result = fn(replica.url, timeout)
+            except Exception as e:
+                self.release(replica, self._judge(error=e))
+                raise
+            except BaseException:
+                self.release(replica, None)
+                raise
+            self.release(replica, self._judge(result), time.monotonic() - start)
+            return result
+        return attempt
+
+    def abind(self, fn):
+        """Async bind: fn(url, timeout) returns an awaitable"""
+        async def attempt(timeout):
+            replica = self.acquire()
+            start = time.monotonic()
+            try:
+                result = await fn(replica.url, timeout)
+            except Exception as e:
+                self.release(replica, self._judge(error=e))
+                raise
+            except BaseException:
+                # Hedge loser or client gone: not the replica's fault
+                self.release(replica, None)
+                raise
+            self.release(replica, self._judge(result), time.monotonic() - start)
+            return result
+        return attempt
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    "url": r.url,
+                    "outstanding": r.outstanding,
+                    "ewma_ms": round(r.ewma * 1000) if r.ewma is not None else None,
+                    "requests": r.requests,
+                    "failures": r.failures,
+                    "ejected_s": round(max(0.0, r.ejected_until - now), 1)
+                }
+                for r in self.replicas
+            ]
+
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+_hedge_inflight = 0
+_hedge_inflight_lock = threading.Lock()
+
+
+def _get_hedge_executor():
+    """Threads for sync hedged attempts, shared by every policy"""
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+    return _hedge_executor
+
+
+def _hedge_finished(future):
+    global _hedge_inflight
+    with _hedge_inflight_lock:
+        _hedge_inflight -= 1
+
+
+def _submit(fn, *args):
+    """Run fn on the hedge threads, counting it as in flight until it finishes"""
+    global _hedge_inflight
+    with _hedge_inflight_lock:
+        _hedge_inflight += 1
+    future = _get_hedge_executor().submit(fn, *args)
+    future.add_done_callback(_hedge_finished)
+    return future
+
+
+def _hedge_pool_saturated():
+    """True when every hedge thread is taken - a hedge would only queue"""
+    with _hedge_inflight_lock:
+        return _hedge_inflight >= HEDGE_WORKERS
+
+
+def _close(result):
+    close = getattr(result, "close", None)
+    if callable(close):
+        close()
+
+
+def _discard(future):
+    """Cancel a losing attempt; if it is already running, close its response when it lands"""
+    if future.cancel():
+        return
+    future.add_done_callback(lambda f: f.exception() is None and _close(f.result()[0]))
+
+
+class Policy:
+    """Retry and hedging settings for one backend endpoint.
+
+    timeout is per attempt and deadline is the total budget. hedge_after is
+    the hedge delay until enough latencies are recorded for a p95.
+    """
+
+    def __init__(self, name, timeout, deadline, retries=2, backoff_base=0.5, backoff_max=8.0,
+                 hedge=False, hedge_after=2.0, hedge_min=0.2, hedge_budget=HEDGE_BUDGET,
+                 retry_statuses=RETRY_STATUSES, retryable=is_transient, breaker=None):
+        self.name = name
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.hedge_min = hedge_min
+        self.hedge_budget = hedge_budget
+        self._hedge_tokens = float(HEDGE_BURST)
+        self._hedge_lock = threading.Lock()
+        self.retry_statuses = retry_statuses
+        self.retryable = retryable
+        self.latency = LatencyTracker()
+        self.breaker = breaker or CircuitBreaker(name)
+        self.flights = SingleFlight()
+        self.counters = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "hedges_skipped": 0}
+
+    def hedge_delay(self):
+        p95 = self.latency.percentile(0.95)
+        delay = self.hedge_after if p95 is None else p95
+        return min(max(delay, self.hedge_min), self.timeout / 2)
+
+    def _earn_hedge(self):
+        with self._hedge_lock:
+            self._hedge_tokens = min(HEDGE_BURST, self._hedge_tokens + self.hedge_budget)
+
+    def _spend_hedge(self, saturated=False):
+        """Take a hedge token, unless the budget is spent or the hedge threads are all busy"""
+        with self._hedge_lock:
+            if saturated or self._hedge_tokens < 1:
+                self.counters["hedges_skipped"] += 1
+                return False
+            self._hedge_tokens -= 1
+            self.counters["hedges"] += 1
+            return True
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _failed(self, result):
+        return getattr(result, "status_code", None) in self.retry_statuses
+
+    def _timed(self, fn, timeout):
+        start = time.monotonic()
+        return fn(timeout), time.monotonic() - start
+
+    def _won(self, timed):
+        result, elapsed = timed
+        if not self._failed(result):
+            self.latency.record(elapsed)
+        return result
+
+    def _attempt(self, fn, deadline):
+        if not self.hedge:
+            return self._won(self._timed(fn, deadline.timeout(self.timeout)))
+
+        self._earn_hedge()
+        started = threading.Event()
+
+        def run_primary():
+            started.set()
+            return self._timed(fn, deadline.timeout(self.timeout))
+
+        primary = _submit(run_primary)
+        pending = {primary}
+        # The hedge delay counts from when the primary starts, not from while it
+        # queues for a thread - otherwise a busy pool turns every call into two
+        started.wait(max(0.0, deadline.remaining()))
+        done, pending = wait(pending, timeout=max(0.0, min(self.hedge_delay(), deadline.remaining())))
+        if not done and deadline.remaining() > 0 and self._spend_hedge(_hedge_pool_saturated()):
+            pending.add(_submit(self._timed, fn, deadline.timeout(self.timeout)))
+
+        outcome = None
+        while True:
+            for future in done:
+                error = future.exception()
+                if error is None and not self._failed(future.result()[0]):
+                    if future is not primary:
+                        self.counters["hedge_wins"] += 1
+                    for loser in pending:
+                        _discard(loser)
+                    if outcome is not None and not isinstance(outcome, BaseException):
+                        _close(outcome)
+                    return self._won(future.result())
+                if outcome is not None and not isinstance(outcome, BaseException):
+                    _close(outcome)
+                outcome = error if error is not None else future.result()[0]
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    def _backend_error(self, error):
+        return self.retryable(error) or isinstance(error, asyncio.TimeoutError)
+
+    def call(self, fn, key=None):
+        """Run fn(timeout) under this policy - returns its result.
+
+        The breaker judges the call as a whole (after retries and replica
+        failover), so one dead replica among healthy ones does not open it.
+        With a key, concurrent calls with the same key share one result.
+        """
+        if key is not None:
+            return self.flights.do(key, lambda: self.call(fn))
+        self.breaker.check()
+        self.counters["calls"] += 1
+        try:
+            result = self._retry(fn)
+        except Exception as e:
+            self.breaker.record(False if self._backend_error(e) else None)
+            raise
+        except BaseException:
+            self.breaker.record(None)
+            raise
+        self.breaker.record(not self._failed(result))
+        return result
+
+    def _retry(self, fn):
+        deadline = Deadline(self.deadline)
+        attempt = 0
+        while True:
+            try:
+                result = self._attempt(fn, deadline)
+                if not self._failed(result):
+                    return result
+                outcome = result
+            except Exception as e:
+                if not self._backend_error(e):
+                    raise
+                outcome = e
+
+            delay = self.backoff(attempt)
+            if attempt >= self.retries or delay >= deadline.remaining():
+                if isinstance(outcome, BaseException):
+                    raise outcome
+                return outcome
+            if not isinstance(outcome, BaseException):
+                _close(outcome)
+            time.sleep(delay)
+            attempt += 1
+            self.counters["retries"] += 1
+
+    async def _atimed(self, fn, timeout):
+        start = time.monotonic()
+        return await asyncio.wait_for(fn(timeout), timeout + WAIT_FOR_GRACE), time.monotonic() - start
+
+    async def _aattempt(self, fn, deadline):
+        if not self.hedge:
+            return self._won(await self._atimed(fn, deadline.timeout(self.timeout)))
+
+        self._earn_hedge()
+        primary = asyncio.ensure_future(self._atimed(fn, deadline.timeout(self.timeout)))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending,
+                                               timeout=max(0.0, min(self.hedge_delay(), deadline.remaining())))
+            if not done and deadline.remaining() > 0 and self._spend_hedge():
+                pending.add(asyncio.ensure_future(self._atimed(fn, deadline.timeout(self.timeout))))
+
+            outcome = None
+            while True:
+                for task in done:
+                    error = task.exception()
+                    if error is None and not self._failed(task.result()[0]):
+                        if task is not primary:
+                            self.counters["hedge_wins"] += 1
+                        return self._won(task.result())
+                    outcome = error if error is not None else task.result()[0]
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # The loser (or everything, if we were cancelled) stops here
+            for task in pending:
+                task.cancel()
+
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    async def acall(self, fn, key=None):
+        """Async counterpart of call: fn(timeout) returns an awaitable"""
+        if key is not None:
+            return await self.flights.ado(key, lambda: self.acall(fn))
+        self.breaker.check()
+        self.counters["calls"] += 1
+        try:
+            result = await self._aretry(fn)
+        except Exception as e:
+            self.breaker.record(False if self._backend_error(e) else None)
+            raise
+        except BaseException:
+            # Cancelled: frees a half-open trial slot without judging the backend
+            self.breaker.record(None)
+            raise
+        self.breaker.record(not self._failed(result))
+        return result
+
+    async def _aretry(self, fn):
+        deadline = Deadline(self.deadline)
+        attempt = 0
+        while True:
+            try:
+                result = await self._aattempt(fn, deadline)
+                if not self._failed(result):
+                    return result
+                outcome = result
+            except Exception as e:
+                if not self._backend_error(e):
+                    raise
+                outcome = e
+
+            delay = self.backoff(attempt)
+            if attempt >= self.retries or delay >= deadline.remaining():
+                if isinstance(outcome, BaseException):
+                    raise outcome
+                return outcome
+            await asyncio.sleep(delay)
+            attempt += 1
+            self.counters["retries"] += 1
+
+    def stats(self):
+        return {
+            "endpoint": self.name,
+            "p95_s": self.latency.percentile(0.95),
+            "hedge_delay_s": round(self.hedge_delay(), 3) if self.hedge else None,
+            **self.counters,
+            "coalesced": self.flights.coalesced,
+            "breaker": self.breaker.stats()
+        }
+
+
+# Per-endpoint defaults. STT and TTS chunks are short and cheap to duplicate, so
+# they hedge; translation and OCR are heavy and only retry. The voicebot defines
+# its Gemini policy next to the account pool.
+POLICIES = {
+    "stt": Policy("stt", timeout=30, deadline=60, retries=2, hedge=True, hedge_after=3.0),
+    "tts": Policy("tts", timeout=20, deadline=45, retries=2, hedge=True, hedge_after=2.0),
+    "translation": Policy("translation", timeout=60, deadline=120, retries=2),
+    "ocr": Policy("ocr", timeout=90, deadline=180, retries=1),
+}
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# common is imported as a package from the repo root, as both apps import it
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
@@ -0,0 +1,450 @@
+"""
+Unit tests for resilience.py, with fake backends and short, controlled delays.
+"""
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+from common import resilience
+from common.resilience import (
+    CircuitBreaker, CircuitOpenError, Deadline, Policy, ReplicaPool, SingleFlight, request_key
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_policy(**kwargs):
+    settings = dict(timeout=1.0, deadline=2.0, retries=2, backoff_base=0.001, backoff_max=0.001)
+    settings.update(kwargs)
+    return Policy("test", **settings)
+
+
+def sequence(*outcomes):
+    """fn(timeout) returning (or raising) each outcome in turn, counting its calls"""
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        outcome = outcomes[min(len(calls), len(outcomes)) - 1]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    return fn, calls
+
+
+# Deadline
+
+def test_deadline_clips_attempt_timeout_to_remaining_budget():
+    deadline = Deadline(0.5)
+    assert deadline.timeout(10) <= 0.5
+    assert deadline.timeout(0.1) == pytest.approx(0.1)
+
+
+def test_expired_deadline_timeout_is_never_zero():
+    deadline = Deadline(-1)
+    assert deadline.timeout(10) == 0.001
+
+
+# Retries
+
+def test_transient_errors_are_retried_until_success():
+    policy = make_policy()
+    fn, calls = sequence(ConnectionError(), TimeoutError(), "ok")
+    assert policy.call(fn) == "ok"
+    assert len(calls) == 3
+    assert policy.counters["retries"] == 2
+
+
+def test_retryable_status_is_retried_and_the_failed_response_closed():
+    policy = make_policy()
+    failed, ok = FakeResponse(503), FakeResponse(200)
+    fn, calls = sequence(failed, ok)
+    assert policy.call(fn) is ok
+    assert failed.closed
+
+
+def test_last_response_is_returned_when_retries_run_out():
+    policy = make_policy(retries=1)
+    last = FakeResponse(502)
+    fn, calls = sequence(FakeResponse(503), last)
+    assert policy.call(fn) is last
+    assert len(calls) == 2
+
+
+def test_last_error_is_raised_when_retries_run_out():
+    policy = make_policy(retries=1)
+    fn, calls = sequence(ConnectionError("first"), ConnectionError("second"))
+    with pytest.raises(ConnectionError, match="second"):
+        policy.call(fn)
+
+
+def test_non_transient_errors_are_not_retried():
+    policy = make_policy()
+    fn, calls = sequence(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        policy.call(fn)
+    assert len(calls) == 1
+
+
+def test_retries_stop_at_the_deadline():
+    policy = make_policy(timeout=0.1, deadline=0.3, retries=50, backoff_base=0.05, backoff_max=0.05)
+
+    def fn(timeout):
+        time.sleep(timeout)
+        raise TimeoutError()
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        policy.call(fn)
+    assert time.monotonic() - start < 0.5
+
+
+def test_async_retries_transient_errors():
+    policy = make_policy()
+    fn, calls = sequence(ConnectionError(), "ok")
+
+    async def afn(timeout):
+        return fn(timeout)
+
+    assert asyncio.run(policy.acall(afn)) == "ok"
+    assert len(calls) == 2
+
+
+# Hedging
+
+def test_sync_hedge_wins_when_primary_is_slow():
+    policy = make_policy(hedge=True, hedge_after=0.05, hedge_min=0.01)
+    started = []
+
+    def fn(timeout):
+        started.append(time.monotonic())
+        if len(started) == 1:
+            time.sleep(0.5)
+            return "primary"
+        return "hedge"
+
+    start = time.monotonic()
+    assert policy.call(fn) == "hedge"
+    assert time.monotonic() - start < 0.4
+    assert policy.counters["hedges"] == 1
+    assert policy.counters["hedge_wins"] == 1
+
+
+def test_sync_no_hedge_when_primary_answers_in_time():
+    policy = make_policy(hedge=True, hedge_after=0.2, hedge_min=0.01)
+    fn, calls = sequence("ok")
+    assert policy.call(fn) == "ok"
+    time.sleep(0.25)
+    assert len(calls) == 1
+    assert policy.counters["hedges"] == 0
+
+
+def test_sync_losing_hedge_response_is_closed():
+    policy = make_policy(hedge=True, hedge_after=0.05, hedge_min=0.01)
+    responses = []
+
+    def fn(timeout):
+        response = FakeResponse(200)
+        responses.append(response)
+        if len(responses) == 1:
+            time.sleep(0.2)
+        return response
+
+    winner = policy.call(fn)
+    time.sleep(0.3)
+    assert winner is responses[1]
+    assert responses[0].closed and not winner.closed
+
+
+def test_hedge_budget_limits_duplicates():
+    policy = make_policy(hedge=True, hedge_after=0.01, hedge_min=0.01, hedge_budget=0)
+
+    def fn(timeout):
+        time.sleep(0.05)
+        return "ok"
+
+    for _ in range(resilience.HEDGE_BURST + 2):
+        policy.call(fn)
+    assert policy.counters["hedges"] == resilience.HEDGE_BURST
+    assert policy.counters["hedges_skipped"] == 2
+
+
+def test_hedge_delay_counts_from_when_the_primary_starts():
+    """Calls queued behind a full pool must not hedge just because they waited"""
+    # hedge_min pins the delay at 0.3 s even once the p95 is known
+    policy = make_policy(hedge=True, hedge_after=0.3, hedge_min=0.3, hedge_budget=1)
+    backend_calls = []
+    lock = threading.Lock()
+
+    def fn(timeout):
+        with lock:
+            backend_calls.append(1)
+        time.sleep(0.25)
+        return "ok"
+
+    callers = [threading.Thread(target=policy.call, args=(fn,)) for _ in range(resilience.HEDGE_WORKERS * 2)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    assert policy.counters["hedges"] == 0
+    assert len(backend_calls) == len(callers)
+
+
+def test_async_hedge_wins_and_loser_is_cancelled():
+    policy = make_policy(hedge=True, hedge_after=0.05, hedge_min=0.01)
+    cancelled = []
+    attempts = []
+
+    async def fn(timeout):
+        attempts.append(1)
+        if len(attempts) == 1:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "primary"
+        return "hedge"
+
+    async def run():
+        result = await policy.acall(fn)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == "hedge"
+    assert cancelled == [True]
+    assert policy.counters["hedge_wins"] == 1
+
+
+# Circuit breaker
+
+def test_breaker_opens_on_failure_rate_and_fails_fast():
+    breaker = CircuitBreaker("b", min_calls=2, failure_rate=0.5, reset_timeout=10)
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.available
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.check()
+    assert raised.value.retry_in > 0
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_stays_closed_below_min_calls():
+    breaker = CircuitBreaker("b", min_calls=3, failure_rate=0.5)
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_ignores_outcomes_that_say_nothing_about_the_backend():
+    breaker = CircuitBreaker("b", min_calls=1, failure_rate=0.5)
+    breaker.record(None)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_trial_through_and_closes_on_success():
+    breaker = CircuitBreaker("b", min_calls=1, failure_rate=0.5, reset_timeout=0.05)
+    breaker.record(False)
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.check()
+
+
+def test_half_open_reopens_when_the_trial_fails():
+    breaker = CircuitBreaker("b", min_calls=1, failure_rate=0.5, reset_timeout=0.05)
+    breaker.record(False)
+    time.sleep(0.06)
+    breaker.check()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["opened"] == 2
+
+
+def test_policy_does_not_call_the_backend_while_open():
+    policy = make_policy(breaker=CircuitBreaker("b", min_calls=1, failure_rate=0.5, reset_timeout=10))
+    policy.breaker.record(False)
+    fn, calls = sequence("ok")
+    with pytest.raises(CircuitOpenError):
+        policy.call(fn)
+    assert calls == []
+
+
+def test_policy_judges_the_call_after_retries():
+    policy = make_policy(breaker=CircuitBreaker("b", min_calls=1, failure_rate=0.5))
+    fn, calls = sequence(ConnectionError(), "ok")
+    policy.call(fn)
+    assert policy.breaker.stats()["failure_rate"] == 0.0
+
+
+# Replica pool
+
+def test_replica_pool_prefers_the_least_loaded_replica():
+    pool = ReplicaPool("svc", ["a", "b"])
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first.url, second.url} == {"a", "b"}
+    pool.release(first, True, 0.01)
+    pool.release(second, True, 1.0)
+    assert pool.acquire().url == first.url
+
+
+def test_replica_is_ejected_after_consecutive_failures():
+    pool = ReplicaPool("svc", ["a", "b"], eject_after=2, eject_for=10)
+    attempt = pool.bind(lambda url, timeout: FakeResponse(503 if url == "a" else 200))
+    for _ in range(6):
+        attempt(1.0)
+    a, b = pool.replicas
+    assert a.failures == 2
+    assert a.ejected_until > time.monotonic()
+    assert a.outstanding == b.outstanding == 0
+    assert all(pool.acquire().url == "b" for _ in range(3))
+
+
+def test_fully_ejected_pool_still_routes_to_the_replica_due_back_first():
+    pool = ReplicaPool("svc", ["a", "b"], eject_after=1, eject_for=10)
+    a, b = pool.replicas
+    pool.release(pool.acquire(), False)
+    pool.release(pool.acquire(), False)
+    a.ejected_until -= 5
+    assert pool.acquire() is a
+
+
+def test_replica_transport_error_counts_as_failure_but_other_errors_do_not():
+    pool = ReplicaPool("svc", ["a"])
+
+    def fn(url, timeout):
+        raise error
+
+    attempt = pool.bind(fn)
+    for error in (ConnectionError(), ValueError()):
+        with pytest.raises(type(error)):
+            attempt(1.0)
+    assert pool.replicas[0].failures == 1
+    assert pool.replicas[0].outstanding == 0
+
+
+# Single flight
+
+def test_request_key_is_stable_and_distinguishes_parts():
+    assert request_key("tts", {"a": 1, "b": 2}) == request_key("tts", {"b": 2, "a": 1})
+    assert request_key("tts", "ab") != request_key("tts", "a", "b")
+    assert request_key(b"\x00") != request_key("\x00")
+
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(1)
+        return "shared"
+
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(flights.do("k", fn))) for _ in range(5)]
+    for caller in callers:
+        caller.start()
+    time.sleep(0.05)
+    release.set()
+    for caller in callers:
+        caller.join()
+    assert results == ["shared"] * 5
+    assert len(calls) == 1
+    assert flights.coalesced == 4
+
+
+def test_single_flight_does_not_cache_finished_calls():
+    flights = SingleFlight()
+    fn, calls = sequence("first", "second")
+    assert flights.do("k", lambda: fn(None)) == "first"
+    assert flights.do("k", lambda: fn(None)) == "second"
+
+
+def test_single_flight_shares_errors():
+    flights = SingleFlight()
+
+    def fn():
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        flights.do("k", fn)
+
+
+def test_async_single_flight_survives_one_waiter_leaving():
+    flights = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "shared"
+
+    async def run():
+        first = asyncio.ensure_future(flights.ado("k", fn))
+        second = asyncio.ensure_future(flights.ado("k", fn))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "shared"
+    assert len(calls) == 1
+
+
+def test_async_single_flight_cancels_the_call_when_every_waiter_leaves():
+    flights = SingleFlight()
+    state = []
+
+    async def fn():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            state.append("cancelled")
+            raise
+        state.append("finished")
+
+    async def run():
+        waiters = [asyncio.ensure_future(flights.ado("k", fn)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert state == ["cancelled"]
+    assert flights._tasks == {}
+
+
+def test_policy_key_coalesces_async_calls():
+    policy = make_policy()
+    calls = []
+
+    async def fn(timeout):
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(*(policy.acall(fn, key="same") for _ in range(3)))
+
+    assert asyncio.run(run()) == ["ok"] * 3
+    assert len(calls) == 1
+    assert policy.stats()["coalesced"] == 2
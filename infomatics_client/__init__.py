@@ -0,0 +1,23 @@
+"""
+Python client for the voicebot's infomatics_bot API (voicebot/server.py).
+
+    from infomatics_client import InformaticsBotClient
+
+    with InformaticsBotClient("http://localhost:8000") as bot:
+        bot.set_metadata({"district": "Bangalore Urban"})
+        print(bot.send_message("What documents are needed for a driving license?").answer)
+
+AsyncInformaticsBotClient has the same methods as coroutines.
+"""
+
+from ._common import BotError, BotTimeout, BotResponse
+from .client import InformaticsBotClient
+from .async_client import AsyncInformaticsBotClient
+
+__all__ = [
+    "InformaticsBotClient",
+    "AsyncInformaticsBotClient",
+    "BotResponse",
+    "BotError",
+    "BotTimeout",
+]
@@ -0,0 +1,135 @@
+"""Pieces shared by the sync and asyncio clients: errors, responses, retry timing."""
+
+import json
+import time
+import base64
+import random
+
+GENERATE_PATH = "/infomatics_bot/generate_response"
+AUDIO_OUT_PATH = "/infomatics_bot/generate_response/audio_out"
+AUDIO_IN_PATH = "/infomatics_bot/generate_response/audio_in"
+STREAM_PATH = "/infomatics_bot/generate_response/stream"
+
+DEFAULT_BASE_URL = "http://localhost:8000"
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+# Gateway and overload responses are worth another attempt; other statuses are not.
+# Every endpoint takes the full chat history, so a repeated call has no side effects.
+RETRY_STATUSES = {429, 502, 503, 504}
+
+DEFAULT_METADATA = {
+    "language": "EN",
+    "user_id": None,
+    "district": None
+}
+
+
+class BotError(Exception):
+    """The service answered with an error"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class BotTimeout(BotError):
+    """The call's deadline passed before a successful response"""
+
+
+class BotResponse:
+    """One answered turn"""
+
+    def __init__(self, data):
+        self.raw = data
+        self.answer = data.get("answer", "")
+        self.source_reference = data.get("source_reference", "N/A")
+        self.chat_history = data.get("chat_history", [])
+        self.transcript = data.get("transcript")
+        self.sample_rate = data.get("sample_rate")
+        audio = data.get("audio_base64")
+        self.audio = base64.b64decode(audio) if audio else None
+
+    def __repr__(self):
+        return f"BotResponse(answer={self.answer!r}, source_reference={self.source_reference!r})"
+
+
+class Deadline:
+    """Time budget for one call, shared across its retries"""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def timeout(self, default):
+        """Per-attempt timeout: the default, cut short by the deadline"""
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        if remaining <= 0:
+            raise BotTimeout("Deadline exceeded")
+        return min(default, remaining)
+
+
+def backoff_delay(attempt, deadline):
+    """Exponential backoff with full jitter, never sleeping past the deadline"""
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+    remaining = deadline.remaining()
+    if remaining is not None and delay >= remaining:
+        raise BotTimeout("Deadline exceeded while backing off")
+    return delay
+
+
+def error_from_response(response):
+    try:
+        message = response.json().get("error") or response.text
+    except (ValueError, AttributeError):
+        message = response.text
+    return BotError(f"HTTP {response.status_code}: {message}", response.status_code)
+
+
+def parse_body(response):
+    """BotResponse from a successful response, BotError otherwise"""
+    if response.status_code != 200:
+        raise error_from_response(response)
+    data = response.json()
+    if data.get("error"):
+        raise BotError(data["error"], response.status_code)
+    return BotResponse(data)
+
+
+def parse_event(line):
+    """One NDJSON stream event, or None for blank keep-alive lines"""
+    if not line.strip():
+        return None
+    event = json.loads(line)
+    if event.get("type") == "error":
+        raise BotError(event.get("error", "Unknown error"))
+    if event.get("type") == "audio":
+        event["audio"] = base64.b64decode(event.pop("audio_base64"))
+    return event
+
+
+def build_turn(message, chat_history, metadata):
+    return {"message": message, "chat_history": list(chat_history or []), "metadata": metadata or {}}
+
+
+def audio_form(language, chat_history, metadata, audio_out):
+    return {
+        "language": language,
+        "chat_history": json.dumps(list(chat_history or []), ensure_ascii=False),
+        "metadata": json.dumps(metadata or {}, ensure_ascii=False),
+        "audio_out": "true" if audio_out else "false"
+    }
+
+
+def normalize_conversation(conversation):
+    """send_many accepts a single message or a list of turns per conversation"""
+    return [conversation] if isinstance(conversation, str) else list(conversation)
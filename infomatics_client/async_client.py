@@ -0,0 +1,170 @@
+"""asyncio client for the voicebot API."""
+
+import asyncio
+import httpx
+
+from ._common import (
+    GENERATE_PATH, AUDIO_OUT_PATH, AUDIO_IN_PATH, STREAM_PATH, DEFAULT_BASE_URL, DEFAULT_TIMEOUT,
+    DEFAULT_MAX_CONNECTIONS, DEFAULT_RETRIES, RETRY_STATUSES, DEFAULT_METADATA, BotError, BotTimeout,
+    Deadline, backoff_delay, error_from_response, parse_body, parse_event, build_turn, audio_form,
+    normalize_conversation
+)
+
+
+class AsyncInformaticsBotClient:
+    """asyncio version of InformaticsBotClient with the same methods as coroutines.
+
+    Use one client per event loop; all calls share its connection pool.
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, metadata=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.max_connections = max_connections
+        self.metadata = {**DEFAULT_METADATA, **(metadata or {})}
+        self.chat_history = []
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await self._http.aclose()
+
+    def set_metadata(self, metadata):
+        self.metadata = {**self.metadata, **metadata}
+
+    def clear_history(self):
+        self.chat_history = []
+
+    async def _request(self, method, path, deadline, **kwargs):
+        """Send with retries on connection errors and retryable statuses"""
+        attempt = 0
+        while True:
+            try:
+                response = await self._http.request(method, path, timeout=deadline.timeout(self.timeout),
+                                                    **kwargs)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                error = error_from_response(response)
+            except httpx.TimeoutException as e:
+                if deadline.remaining() is not None and deadline.remaining() <= 0:
+                    raise BotTimeout("Deadline exceeded") from e
+                if attempt >= self.retries:
+                    raise BotTimeout(f"{type(e).__name__}: {str(e)}") from e
+                error = e
+            except httpx.TransportError as e:
+                if attempt >= self.retries:
+                    raise BotError(f"{type(e).__name__}: {str(e)}") from e
+                error = e
+            try:
+                await asyncio.sleep(backoff_delay(attempt, deadline))
+            except BotTimeout as e:
+                raise BotTimeout(f"Deadline exceeded after: {error}") from e
+            attempt += 1
+
+    async def generate(self, message, chat_history=(), metadata=None, audio_out=False, deadline=None):
+        """One stateless turn - returns a BotResponse.
+
+        deadline is the total time budget in seconds across all retries.
+        """
+        path = AUDIO_OUT_PATH if audio_out else GENERATE_PATH
+        response = await self._request("POST", path, Deadline(deadline),
+                                       json=build_turn(message, chat_history, metadata or self.metadata))
+        return parse_body(response)
+
+    async def send_message(self, message, audio_out=False, deadline=None):
+        """Continue this client's conversation - returns a BotResponse"""
+        result = await self.generate(message, self.chat_history, self.metadata, audio_out, deadline)
+        self.chat_history = result.chat_history
+        return result
+
+    async def send_audio(self, audio_bytes, filename="recording.wav", language="kannada", chat_history=(),
+                         metadata=None, audio_out=True, deadline=None):
+        """Spoken turn - returns a BotResponse with transcript (and audio when audio_out)"""
+        response = await self._request(
+            "POST", AUDIO_IN_PATH, Deadline(deadline),
+            files={"file": (filename, audio_bytes, "audio/wav")},
+            data=audio_form(language, chat_history, metadata or self.metadata, audio_out)
+        )
+        return parse_body(response)
+
+    async def stream(self, message, chat_history=(), metadata=None, deadline=None):
+        """Async-iterate events as they arrive; see InformaticsBotClient.stream"""
+        deadline = Deadline(deadline)
+        body = build_turn(message, chat_history, metadata or self.metadata)
+        attempt = 0
+        started = False
+        while True:
+            try:
+                async with self._http.stream("POST", STREAM_PATH, json=body,
+                                             timeout=deadline.timeout(self.timeout)) as response:
+                    if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                        await response.aread()
+                        error = error_from_response(response)
+                    elif response.status_code != 200:
+                        await response.aread()
+                        raise error_from_response(response)
+                    else:
+                        async for line in response.aiter_lines():
+                            event = parse_event(line)
+                            if event is not None:
+                                started = True
+                                yield event
+                        return
+            except httpx.TimeoutException as e:
+                if deadline.remaining() is not None and deadline.remaining() <= 0:
+                    raise BotTimeout("Deadline exceeded") from e
+                if started or attempt >= self.retries:
+                    raise BotTimeout(f"{type(e).__name__}: {str(e)}") from e
+                error = e
+            except httpx.TransportError as e:
+                # Includes the server dropping the connection mid-stream (RemoteProtocolError)
+                if started or attempt >= self.retries:
+                    raise BotError(f"{type(e).__name__}: {str(e)}") from e
+                error = e
+            try:
+                await asyncio.sleep(backoff_delay(attempt, deadline))
+            except BotTimeout as e:
+                raise BotTimeout(f"Deadline exceeded after: {error}") from e
+            attempt += 1
+
+    async def stream_audio(self, message, chat_history=(), metadata=None, deadline=None):
+        """Async-iterate just the WAV chunks of the spoken answer, in playback order"""
+        async for event in self.stream(message, chat_history, metadata, deadline):
+            if event["type"] == "audio":
+                yield event["audio"]
+
+    async def _run_conversation(self, turns, metadata, audio_out, deadline, semaphore):
+        history = []
+        results = []
+        async with semaphore:
+            for message in turns:
+                try:
+                    result = await self.generate(message, history, metadata, audio_out, deadline)
+                except BotError as e:
+                    results.append(e)
+                    break
+                history = result.chat_history
+                results.append(result)
+        return results
+
+    async def send_many(self, conversations, metadata=None, audio_out=False, concurrency=None, deadline=None):
+        """Run many independent conversations concurrently - returns one list per conversation.
+
+        Each conversation is a message or a list of messages sent as consecutive turns.
+        Lists hold a BotResponse per turn; a failed turn is a BotError and ends its conversation.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.max_connections)
+        return await asyncio.gather(*(
+            self._run_conversation(normalize_conversation(c), metadata, audio_out, deadline, semaphore)
+            for c in conversations
+        ))
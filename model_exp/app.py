@@ -1,5 +1,15 @@
+import sys
+import time
+import importlib
+from pathlib import Path
 import streamlit as st
 
+# The repo-level common package (shared with the voicebot)
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+from common.resilience import POLICIES
+
 # Page config - must be first Streamlit command
 st.set_page_config(
     page_title="AI Tools Suite",
@@ -21,8 +31,35 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Import page modules
-from pages import home, ocr, stt, translation, tts
+# Sidebar label -> page module. Only the selected page is imported, so a rerun
+# never pays for the heavy dependencies (numpy, PIL, requests) of the others.
+PAGES = {
+    "🏠 Home": "pages.home",
+    "📝 OCR": "pages.ocr",
+    "🎙️ Speech-to-Text": "pages.stt",
+    "🌍 Translation": "pages.translation",
+    "🔊 Text-to-Speech": "pages.tts",
+    "🔁 Speech-to-Speech": "pages.speech_to_speech"
+}
+
+# SSH tunnels to the backends, started once per process and kept up by the
+# watchdog. Without JUMPHOST/TARGETHOST (e.g. when the backends are behind
+# NGROK_BASE_URL) there are none to manage.
+try:
+    import ssh_tunnel_manager
+except ValueError:
+    ssh_tunnel_manager = None
+else:
+    ssh_tunnel_manager.initialize_tunnels()
+
+
+def format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
 
 # Initialize session state for page navigation
 if 'page' not in st.session_state:
@@ -35,13 +72,38 @@ st.sidebar.markdown("---")
 # Navigation menu
 page = st.sidebar.radio(
     "Select a tool:",
-    ["🏠 Home", "📝 OCR", "🎙️ Speech-to-Text", "🌍 Translation", "🔊 Text-to-Speech"],
-    index=["🏠 Home", "📝 OCR", "🎙️ Speech-to-Text", "🌍 Translation", "🔊 Text-to-Speech"].index(st.session_state.page) if st.session_state.page in ["🏠 Home", "📝 OCR", "🎙️ Speech-to-Text", "🌍 Translation", "🔊 Text-to-Speech"] else 0
+    list(PAGES),
+    index=list(PAGES).index(st.session_state.page) if st.session_state.page in PAGES else 0
 )
 
 # Update session state when sidebar selection changes
 st.session_state.page = page
 
+# Backend circuit breakers, shared by every session in this process
+BREAKER_ICONS = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}
+with st.sidebar.expander("🩺 Backend Status"):
+    for name, policy in POLICIES.items():
+        breaker = policy.breaker.stats()
+        detail = (f"retry in {breaker['retry_in_s']:.0f}s" if breaker["state"] == "open"
+                  else f"{breaker['failure_rate']:.0%} failing")
+        st.caption(f"{BREAKER_ICONS[breaker['state']]} **{name.upper()}** {breaker['state'].replace('_', '-')} · {detail}")
+
+if ssh_tunnel_manager is not None:
+    TUNNEL_ICONS = {"up": "🟢", "connecting": "🟡", "down": "🔴"}
+    with st.sidebar.expander("🔌 SSH Tunnels"):
+        for tunnel in ssh_tunnel_manager.get_tunnel_status():
+            if tunnel["state"] == "up":
+                detail = f"up {format_duration(tunnel['uptime_s'])}"
+            elif tunnel["state"] == "connecting":
+                detail = "connecting"
+            else:
+                detail = f"reconnecting in {format_duration(tunnel['retry_in_s'])}"
+            st.caption(f"{TUNNEL_ICONS[tunnel['state']]} **{tunnel['port']}** {detail} · "
+                       f"{tunnel['reconnects']} reconnect(s)")
+            if tunnel["last_failure"]:
+                ago = format_duration(time.time() - tunnel["last_failure_at"])
+                st.caption(f"↳ last failure {ago} ago: {tunnel['last_failure']}")
+
 st.sidebar.markdown("---")
 st.sidebar.markdown(
     """
@@ -54,13 +116,4 @@ st.sidebar.markdown(
 )
 
 # Route to appropriate page
-if st.session_state.page == "🏠 Home":
-    home.show()
-elif st.session_state.page == "📝 OCR":
-    ocr.show()
-elif st.session_state.page == "🎙️ Speech-to-Text":
-    stt.show()
-elif st.session_state.page == "🌍 Translation":
-    translation.show()
-elif st.session_state.page == "🔊 Text-to-Speech":
-    tts.show()
\ No newline at end of file
+importlib.import_module(PAGES[st.session_state.page]).show()
@@ -1 +1,9 @@
 # Pages package
+import sys
+from pathlib import Path
+
+# Pages and the helpers they import use the repo-level common package (shared
+# with the voicebot); set up here too so a page can be imported on its own
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
@@ -1,91 +1,712 @@
 import streamlit as st
-import requests
 import base64
-from PIL import Image
 import io
 import os
+import re
+import json
+import time
 from pathlib import Path
 from dotenv import load_dotenv
+from common.resilience import POLICIES, request_key
 
 # Load environment variables
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(env_path)
 
+# Tiling settings
+TILE_MAX_TOKENS = 2048
+MAX_BAND_HEIGHT = 600
+TILE_HEIGHT = 600
+TILE_OVERLAP = 80
+INK_THRESHOLD = 128
+MAX_OCR_WORKERS = 4
+
+# Payload settings
+# Assumed page width (A4, inches) for scans that carry no DPI metadata
+ASSUMED_PAGE_WIDTH_IN = 8.27
+# Servers that rejected a multipart upload and only accept base64 JSON
+_JSON_ONLY_ENDPOINTS = set()
+
+PREPROCESS_PROFILES = {
+    "Original (no re-encode)": None,
+    "Grayscale, 200 DPI (WebP)": {"grayscale": True, "max_dpi": 200, "binarize": False, "format": "WEBP"},
+    "Binarized scan, 300 DPI (PNG)": {"grayscale": True, "max_dpi": 300, "binarize": True, "format": "PNG"},
+}
+
+# Batch settings
+PDF_RENDER_DPI = 200
+DEFAULT_BATCH_WORKERS = 4
+
+IMAGE_MIME_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+
+def find_text_lines(image, ink_threshold=INK_THRESHOLD):
+    """Return (top, bottom) row ranges that contain ink, using a horizontal projection profile"""
+    import numpy as np
+
+    gray = np.asarray(image.convert("L"))
+    ink_per_row = (gray < ink_threshold).sum(axis=1)
+    # Ignore specks and scanner noise when deciding if a row is blank
+    min_ink = max(1, int(gray.shape[1] * 0.002))
+    is_text = ink_per_row >= min_ink
+
+    lines = []
+    start = None
+    for row, has_ink in enumerate(is_text):
+        if has_ink and start is None:
+            start = row
+        elif not has_ink and start is not None:
+            lines.append((start, row))
+            start = None
+    if start is not None:
+        lines.append((start, len(is_text)))
+    return lines
+
+
+def plan_text_bands(image, max_band_height=MAX_BAND_HEIGHT):
+    """Group detected text lines into bands no taller than max_band_height, cut in the gaps between lines"""
+    lines = find_text_lines(image)
+    if not lines:
+        return []
+
+    bands = []
+    band_top, band_bottom = lines[0]
+    for line_top, line_bottom in lines[1:]:
+        if line_bottom - band_top > max_band_height:
+            bands.append((band_top, band_bottom))
+            band_top = line_top
+        band_bottom = line_bottom
+    bands.append((band_top, band_bottom))
+
+    # Pad each band into the surrounding whitespace without crossing into neighbours
+    padded = []
+    for i, (top, bottom) in enumerate(bands):
+        prev_bottom = bands[i - 1][1] if i > 0 else 0
+        next_top = bands[i + 1][0] if i + 1 < len(bands) else image.height
+        pad_top = max(prev_bottom, top - 8)
+        pad_bottom = min(next_top, bottom + 8)
+        padded.append((pad_top, pad_bottom))
+    return padded
+
+
+def plan_fixed_tiles(image, tile_height=TILE_HEIGHT, overlap=TILE_OVERLAP):
+    """Split the image into full-width horizontal tiles that overlap by `overlap` pixels"""
+    if image.height <= tile_height:
+        return [(0, image.height)]
+
+    step = tile_height - overlap
+    tiles = []
+    top = 0
+    while top < image.height:
+        bottom = min(top + tile_height, image.height)
+        tiles.append((top, bottom))
+        if bottom == image.height:
+            break
+        top += step
+    return tiles
+
+
+def encode_region(image, top, bottom, image_format="PNG"):
+    """Crop a horizontal region and encode it in the given format"""
+    region = image.crop((0, top, image.width, bottom))
+    return encode_image(region, image_format)
+
+
+def encode_image(image, image_format="PNG"):
+    """Encode a PIL image, using lossless settings for WebP so text edges stay sharp"""
+    buffer = io.BytesIO()
+    if image_format == "WEBP":
+        image.save(buffer, format="WEBP", lossless=image.mode in ("1", "L"), quality=80)
+    else:
+        image.save(buffer, format=image_format, optimize=True)
+    return buffer.getvalue()
+
+
+def otsu_threshold(gray):
+    """Compute Otsu's global threshold for a uint8 grayscale array"""
+    import numpy as np
+
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = gray.size
+    omega = np.cumsum(hist) / total
+    mu = np.cumsum(hist * np.arange(256)) / total
+    mu_total = mu[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between_var = (mu_total * omega - mu) ** 2 / (omega * (1.0 - omega))
+    return int(np.argmax(np.nan_to_num(between_var)))
+
+
+def source_dpi(image):
+    """DPI from image metadata, or estimated from the pixel width of an A4 page"""
+    dpi = image.info.get("dpi")
+    if dpi and dpi[0] and float(dpi[0]) > 1:
+        return float(dpi[0])
+    return image.width / ASSUMED_PAGE_WIDTH_IN
+
+
+def preprocess_image(image, profile):
+    """Apply a preprocessing profile (grayscale, DPI-aware downscale, Otsu binarization) to a PIL image"""
+    import numpy as np
+    from PIL import Image
+
+    if profile.get("grayscale") or profile.get("binarize"):
+        image = image.convert("L")
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    max_dpi = profile.get("max_dpi")
+    if max_dpi:
+        dpi = source_dpi(image)
+        if dpi > max_dpi:
+            scale = max_dpi / dpi
+            new_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(new_size, Image.LANCZOS)
+
+    if profile.get("binarize"):
+        gray = np.asarray(image)
+        threshold = otsu_threshold(gray)
+        image = Image.fromarray(np.where(gray > threshold, 255, 0).astype(np.uint8)).convert("1")
+
+    return image
+
+
+def prepare_payload(image_bytes, profile):
+    """Return (payload_bytes, mime_type) - the original bytes untouched unless a profile is selected"""
+    from PIL import Image
+
+    if not profile:
+        image_format = Image.open(io.BytesIO(image_bytes)).format or "PNG"
+        return image_bytes, IMAGE_MIME_TYPES.get(image_format, "application/octet-stream")
+
+    image = preprocess_image(Image.open(io.BytesIO(image_bytes)), profile)
+    image_format = profile.get("format", "PNG")
+    return encode_image(image, image_format), IMAGE_MIME_TYPES[image_format]
+
+
+def _rejects_multipart(response):
+    """True if the server refused the multipart upload itself, not this particular image"""
+    if response.status_code == 415:
+        return True
+    if response.status_code != 422:
+        return False
+    # A FastAPI endpoint with a JSON body model (image_b64) answers multipart with
+    # 422 at loc ["body"]; only an error about the "file" part is about this upload
+    try:
+        detail = response.json().get("detail")
+    except (ValueError, AttributeError):
+        return True
+    if not isinstance(detail, list):
+        return True
+    return not any(
+        isinstance(error, dict) and "file" in (error.get("loc") or [])
+        for error in detail
+    )
+
+
+def _post_ocr(api_url, image_bytes, language, max_tokens, mime_type):
+    """POST the image as multipart binary, falling back to base64 JSON for servers that reject it"""
+    import requests
+
+    form = {
+        "prompt": "<image>",
+        "language": language,
+        "temperature": 0.0,
+        "max_tokens": max_tokens
+    }
+    if api_url not in _JSON_ONLY_ENDPOINTS:
+        response = POLICIES["ocr"].call(lambda timeout: requests.post(
+            api_url, files={"file": ("image", image_bytes, mime_type)}, data=form, timeout=timeout
+        ), key=request_key(api_url, "multipart", form, mime_type, image_bytes))
+        if not _rejects_multipart(response):
+            return response
+        _JSON_ONLY_ENDPOINTS.add(api_url)
+
+    payload = dict(form, image_b64=base64.b64encode(image_bytes).decode('utf-8'))
+    return POLICIES["ocr"].call(lambda timeout: requests.post(api_url, json=payload, timeout=timeout),
+                                key=request_key(api_url, "json", form, image_bytes))
+
+
+def request_ocr(api_url, image_bytes, language, max_tokens=8192, mime_type="image/png"):
+    """Send one image to the OCR endpoint - returns (text, processing_time, error)"""
+    import requests
+
+    try:
+        response = _post_ocr(api_url, image_bytes, language, max_tokens, mime_type)
+        if response.status_code != 200:
+            return None, 0, f"Status {response.status_code}: {response.text[:200]}"
+        result = response.json()
+        if not result.get('success'):
+            return None, 0, result.get('error', 'Unknown error')
+        return result.get('text', ''), result.get('processing_time', 0), None
+    except requests.exceptions.ConnectionError:
+        return None, 0, f"Failed to connect to {api_url}. Is the server running?"
+    except Exception as e:
+        return None, 0, f"{type(e).__name__}: {str(e)}"
+
+
+def process_tile(tile_bytes, tile_index, api_url, language, mime_type="image/png"):
+    """Process single tile and return indexed result"""
+    text, processing_time, error = request_ocr(
+        api_url, tile_bytes, language, max_tokens=TILE_MAX_TOKENS, mime_type=mime_type
+    )
+    return (tile_index, text, processing_time, error)
+
+
+def _normalize_line(line):
+    return re.sub(r"\s+", " ", line).strip().lower()
+
+
+def _lines_match(a, b, threshold=0.85):
+    from difflib import SequenceMatcher
+
+    a, b = _normalize_line(a), _normalize_line(b)
+    if not a or not b:
+        return False
+    return a == b or SequenceMatcher(None, a, b).ratio() >= threshold
+
+
+def merge_tile_texts(tile_texts, max_overlap_lines=5):
+    """Join tile texts in reading order, dropping lines repeated across tile overlaps"""
+    merged = []
+    for text in tile_texts:
+        lines = [line for line in (text or "").splitlines() if line.strip()]
+        if not merged:
+            merged.extend(lines)
+            continue
+
+        # Find the longest run of trailing merged lines that reappears at the top of this tile.
+        # The last line of the previous tile may have been cut mid-line, so it is allowed to
+        # be a partial match of the first repeated line.
+        skip = 0
+        limit = min(max_overlap_lines, len(merged), len(lines))
+        for k in range(limit, 0, -1):
+            tail = merged[-k:]
+            head = lines[:k]
+            if all(_lines_match(t, h) for t, h in zip(tail[:-1], head[:-1])) and (
+                _lines_match(tail[-1], head[-1])
+                or _normalize_line(head[-1]).startswith(_normalize_line(tail[-1]))
+                or _normalize_line(head[-1]).endswith(_normalize_line(tail[-1]))
+            ):
+                # Prefer the tile's copy of the last shared line, it was not cut at the edge
+                merged[-1] = head[-1] if len(head[-1]) > len(tail[-1]) else tail[-1]
+                skip = k
+                break
+        merged.extend(lines[skip:])
+    return "\n".join(merged)
+
+
+def run_tiled_ocr(image, api_url, language, mode, image_format="PNG"):
+    """Split the image into tiles, OCR them concurrently and merge the results - returns (text, tiles, errors)"""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    if mode == "bands":
+        regions = plan_text_bands(image)
+        if len(regions) <= 1 and image.height > MAX_BAND_HEIGHT:
+            # No usable whitespace gaps (photo, skewed scan) - fall back to overlapping tiles
+            regions = plan_fixed_tiles(image)
+            mode = "tiles"
+    else:
+        regions = plan_fixed_tiles(image)
+    if not regions:
+        return "", [], []
+
+    tile_bytes = [encode_region(image, top, bottom, image_format) for top, bottom in regions]
+    mime_type = IMAGE_MIME_TYPES[image_format]
+    tile_texts = [None] * len(regions)
+    tile_times = [0] * len(regions)
+    errors = []
+
+    with ThreadPoolExecutor(max_workers=min(MAX_OCR_WORKERS, len(regions))) as executor:
+        futures = {
+            executor.submit(process_tile, data, i, api_url, language, mime_type): i
+            for i, data in enumerate(tile_bytes)
+        }
+
+        for future in as_completed(futures):
+            tile_index, text, processing_time, error = future.result()
+
+            if error:
+                errors.append(f"Tile {tile_index + 1}: {error}")
+            else:
+                tile_texts[tile_index] = text
+                tile_times[tile_index] = processing_time
+
+    if mode == "tiles":
+        merged = merge_tile_texts(tile_texts)
+    else:
+        # Bands are cut in blank gaps, so there is no shared text to remove
+        merged = "\n".join(text.strip() for text in tile_texts if text and text.strip())
+
+    tiles = [
+        {
+            "tile": i + 1,
+            "top": top,
+            "bottom": bottom,
+            "payload_bytes": len(tile_bytes[i]),
+            "processing_time": tile_times[i]
+        }
+        for i, (top, bottom) in enumerate(regions)
+    ]
+    return merged, tiles, errors
+
+
+def count_pdf_pages(pdf_bytes):
+    """Return the number of pages in a PDF"""
+    from pypdf import PdfReader
+    return len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+
+def render_pdf_pages(pdf_bytes, dpi=PDF_RENDER_DPI):
+    """Yield (page_number, image_bytes) for each page of a PDF.
+
+    Pages are rendered with pypdfium2 when it is installed. Otherwise the largest
+    embedded image of each page is used, which covers scanned documents.
+    """
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        pdfium = None
+
+    if pdfium is not None:
+        pdf = pdfium.PdfDocument(pdf_bytes)
+        try:
+            for index in range(len(pdf)):
+                bitmap = pdf[index].render(scale=dpi / 72)
+                yield index + 1, encode_image(bitmap.to_pil(), "PNG")
+        finally:
+            pdf.close()
+        return
+
+    from pypdf import PdfReader
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    for index, page in enumerate(reader.pages):
+        try:
+            images = list(page.images)
+        except Exception:
+            images = []
+        if not images:
+            yield index + 1, None
+            continue
+        largest = max(images, key=lambda img: len(img.data))
+        yield index + 1, largest.data
+
+
+def plan_batch_items(uploaded_files):
+    """Expand uploads into one OCR item per image or PDF page"""
+    items = []
+    for uploaded_file in uploaded_files:
+        if uploaded_file.name.lower().endswith(".pdf"):
+            page_count = count_pdf_pages(uploaded_file.getvalue())
+            items.extend({"source": uploaded_file.name, "page": page} for page in range(1, page_count + 1))
+        else:
+            items.append({"source": uploaded_file.name, "page": None})
+    return items
+
+
+def iter_batch_images(uploaded_files):
+    """Yield image bytes for every batch item, in the same order as plan_batch_items"""
+    for uploaded_file in uploaded_files:
+        if uploaded_file.name.lower().endswith(".pdf"):
+            for _, image_bytes in render_pdf_pages(uploaded_file.getvalue()):
+                yield image_bytes
+        else:
+            yield uploaded_file.getvalue()
+
+
+def process_batch_item(item_index, image_bytes, api_url, language, profile):
+    """Preprocess and OCR a single batch item - returns (index, text, processing_time, error)"""
+    if image_bytes is None:
+        return (item_index, None, 0, "No renderable image on this page (install pypdfium2 for text PDFs)")
+    try:
+        payload_bytes, mime_type = prepare_payload(image_bytes, profile)
+    except Exception as e:
+        return (item_index, None, 0, f"Could not read image: {type(e).__name__}: {str(e)}")
+    text, processing_time, error = request_ocr(api_url, payload_bytes, language, mime_type=mime_type)
+    return (item_index, text, processing_time, error)
+
+
+def run_batch_ocr(uploaded_files, items, api_url, language, profile, max_workers, on_result):
+    """OCR every item with at most max_workers requests in flight, calling on_result(index, text, time, error).
+
+    Images are produced lazily so a long PDF is never fully rendered in memory.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for item_index, image_bytes in enumerate(iter_batch_images(uploaded_files)):
+            if item_index >= len(items):
+                break
+            pending.add(executor.submit(process_batch_item, item_index, image_bytes, api_url, language, profile))
+
+            if len(pending) >= max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    on_result(*future.result())
+
+        for future in as_completed(pending):
+            on_result(*future.result())
+
+
+def build_jsonl_bundle(results):
+    """One JSON record per item"""
+    return "\n".join(json.dumps(result, ensure_ascii=False) for result in results) + "\n"
+
+
+def build_txt_bundle(results):
+    """Plain text with a header per item"""
+    sections = []
+    for result in results:
+        header = result["source"] if result["page"] is None else f"{result['source']} - page {result['page']}"
+        body = result["text"] if result["text"] else f"[error: {result['error']}]"
+        sections.append(f"===== {header} =====\n{body}\n")
+    return "\n".join(sections)
+
+
+def show_batch(api_url, language, profile):
+    """Display the batch OCR interface"""
+    uploaded_files = st.file_uploader(
+        "Upload images or PDFs:",
+        type=["png", "jpg", "jpeg", "pdf"],
+        accept_multiple_files=True,
+        help="Every image and every PDF page becomes one OCR item"
+    )
+
+    if not uploaded_files:
+        st.info("👆 Upload images or a multi-page PDF to get started")
+        return
+
+    try:
+        items = plan_batch_items(uploaded_files)
+    except Exception as e:
+        st.error(f"❌ Could not read uploads: {str(e)}")
+        return
+
+    max_workers = st.slider(
+        "Concurrent requests:",
+        min_value=1,
+        max_value=16,
+        value=DEFAULT_BATCH_WORKERS,
+        help="Upper bound on OCR requests in flight at once"
+    )
+    st.caption(f"{len(items)} item(s) from {len(uploaded_files)} file(s)")
+    batch_key = tuple((f.name, f.size) for f in uploaded_files)
+
+    if st.button("Extract Text from All", type="primary"):
+        results = [
+            {"item": i + 1, "source": item["source"], "page": item["page"],
+             "text": None, "processing_time": 0, "error": None}
+            for i, item in enumerate(items)
+        ]
+        progress_bar = st.progress(0.0, text=f"0/{len(items)} items")
+        status_placeholder = st.empty()
+        completed = [0]
+        start_time = time.time()
+
+        def on_result(item_index, text, processing_time, error):
+            results[item_index].update(text=text, processing_time=processing_time, error=error)
+            completed[0] += 1
+            label = results[item_index]["source"]
+            if results[item_index]["page"] is not None:
+                label += f" p{results[item_index]['page']}"
+            progress_bar.progress(
+                completed[0] / len(items),
+                text=f"{completed[0]}/{len(items)} items - last: {label} {'❌' if error else '✅'}"
+            )
+            status_placeholder.dataframe(
+                [
+                    {
+                        "Item": r["item"],
+                        "Source": r["source"],
+                        "Page": r["page"],
+                        "Status": "❌" if r["error"] else ("✅" if r["text"] is not None else "⏳"),
+                        "Chars": len(r["text"] or "")
+                    }
+                    for r in results
+                ],
+                use_container_width=True,
+                hide_index=True
+            )
+
+        run_batch_ocr(uploaded_files, items, api_url, language, profile, max_workers, on_result)
+
+        st.session_state.ocr_batch_results = results
+        st.session_state.ocr_batch_time = time.time() - start_time
+        st.session_state.ocr_batch_key = batch_key
+
+    # Results are kept in session state so the download buttons survive reruns
+    results = st.session_state.get("ocr_batch_results")
+    if not results or st.session_state.get("ocr_batch_key") != batch_key:
+        return
+
+    failed = [r for r in results if r["error"]]
+    st.success(
+        f"✅ {len(results) - len(failed)}/{len(results)} items extracted in "
+        f"{st.session_state.get('ocr_batch_time', 0):.1f} seconds"
+    )
+    if failed:
+        with st.expander(f"⚠️ {len(failed)} failed item(s)"):
+            for r in failed:
+                st.error(f"Item {r['item']} ({r['source']}): {r['error']}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            label="⬇️ Download JSONL",
+            data=build_jsonl_bundle(results),
+            file_name="ocr_results.jsonl",
+            mime="application/jsonl",
+            use_container_width=True
+        )
+    with col2:
+        st.download_button(
+            label="⬇️ Download TXT",
+            data=build_txt_bundle(results),
+            file_name="ocr_results.txt",
+            mime="text/plain",
+            use_container_width=True
+        )
+
+
 def show():
     """Display the OCR interface"""
-    
+    import requests
+    from PIL import Image
+
     st.title("📝 OCR Text Extraction")
-    
+
     # API endpoint
     NGROK_BASE = os.getenv("NGROK_BASE_URL", "https://your-ngrok-url.ngrok-free.app")
     API_URL = f"{NGROK_BASE}/ocr/infer"
-    
+
     # Language selection
     language = st.selectbox(
         "Select language:",
         ["kannada", "hindi", "english"],
         index=0
     )
-    
+
+    batch_mode = st.toggle("📚 Batch mode (multiple images or a PDF)", value=False)
+
+    # Payload preprocessing
+    profile_name = st.selectbox(
+        "Preprocessing:",
+        list(PREPROCESS_PROFILES.keys()),
+        index=0,
+        help="Original sends the uploaded bytes untouched. Other profiles shrink the upload before sending."
+    )
+    profile = PREPROCESS_PROFILES[profile_name]
+
+    if batch_mode:
+        show_batch(API_URL, language, profile)
+        return
+
+    # Processing mode
+    MODE_OPTIONS = {
+        "Whole image": "whole",
+        "Text-line bands (parallel)": "bands",
+        "Overlapping tiles (parallel)": "tiles"
+    }
+    mode_name = st.radio(
+        "Processing mode:",
+        list(MODE_OPTIONS.keys()),
+        index=0,
+        horizontal=True,
+        help="Tiled modes split large scans into strips that are recognised concurrently"
+    )
+    mode = MODE_OPTIONS[mode_name]
+
     # File uploader
     uploaded_file = st.file_uploader(
         "Upload an image:",
         type=["png", "jpg", "jpeg"],
         help="Upload an image containing text to extract"
     )
-    
+
     # Display uploaded image
     if uploaded_file is not None:
-        image = Image.open(uploaded_file)
-        st.image(image, caption="Uploaded Image", use_container_width=True)
-        
+        original_bytes = uploaded_file.getvalue()
+        st.image(original_bytes, caption="Uploaded Image", use_container_width=True)
+
         # Process button
         if st.button("Extract Text", type="primary"):
             with st.spinner("Extracting text..."):
                 try:
-                    # Convert image to base64
-                    img_byte_arr = io.BytesIO()
-                    image.save(img_byte_arr, format=image.format or 'PNG')
-                    img_byte_arr = img_byte_arr.getvalue()
-                    image_b64 = base64.b64encode(img_byte_arr).decode('utf-8')
-                    
-                    # Prepare payload
-                    payload = {
-                        "image_b64": image_b64,
-                        "prompt": "<image>",
-                        "language": language,
-                        "temperature": 0.0,
-                        "max_tokens": 8192
-                    }
-                    
-                    # Make API request
-                    response = requests.post(API_URL, json=payload)
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        
-                        if result.get('success'):
-                            st.success("✅ Text extracted successfully!")
-                            
-                            # Display processing time
-                            processing_time = result.get('processing_time', 0)
-                            st.info(f"⏱️ Processing time: {processing_time:.2f} seconds")
-                            
-                            # Display transcribed text
-                            st.subheader("Extracted Text:")
-                            transcribed_text = result.get('text', '')
-                            st.markdown(f"### {transcribed_text}")
-                            
-                            # Code block for easy copying
-                            st.code(transcribed_text, language=None)
-                            
+                    start_time = time.time()
+
+                    if mode == "whole":
+                        payload_bytes, mime_type = prepare_payload(original_bytes, profile)
+                        transcribed_text, processing_time, error = request_ocr(
+                            API_URL, payload_bytes, language, mime_type=mime_type
+                        )
+                        errors = [error] if error else []
+                        tiles = []
+                        payload_size = len(payload_bytes)
+                    else:
+                        image = Image.open(io.BytesIO(original_bytes))
+                        image_format = "PNG"
+                        if profile:
+                            image = preprocess_image(image, profile)
+                            image_format = profile.get("format", "PNG")
+                        transcribed_text, tiles, errors = run_tiled_ocr(
+                            image, API_URL, language, mode, image_format
+                        )
+                        processing_time = sum(tile["processing_time"] for tile in tiles)
+                        payload_size = sum(tile["payload_bytes"] for tile in tiles)
+
+                    wall_time = time.time() - start_time
+
+                    # Payload size report
+                    original_size = len(original_bytes)
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric("Original file", f"{original_size / 1024:.1f} KB")
+                    col2.metric(
+                        "Sent",
+                        f"{payload_size / 1024:.1f} KB",
+                        delta=f"{(payload_size - original_size) / 1024:+.1f} KB",
+                        delta_color="inverse"
+                    )
+                    col3.metric("Base64 JSON equivalent", f"{len(base64.b64encode(original_bytes)) / 1024:.1f} KB")
+
+                    if transcribed_text:
+                        st.success("✅ Text extracted successfully!")
+
+                        # Display processing time
+                        if tiles:
+                            st.info(
+                                f"⏱️ {len(tiles)} tiles in {wall_time:.2f} seconds "
+                                f"(server time {processing_time:.2f} seconds)"
+                            )
                         else:
-                            error_msg = result.get('error', 'Unknown error')
-                            st.error(f"❌ Error: {error_msg}")
+                            st.info(f"⏱️ Processing time: {processing_time:.2f} seconds")
+
+                        if errors:
+                            st.warning(f"⚠️ {len(errors)} tile(s) failed but continuing with available text")
+                            with st.expander("Error Details"):
+                                for err in errors:
+                                    st.error(err)
+
+                        # Display transcribed text
+                        st.subheader("Extracted Text:")
+                        st.markdown(f"### {transcribed_text}")
+
+                        # Code block for easy copying
+                        st.code(transcribed_text, language=None)
+
+                        if tiles:
+                            with st.expander("🧩 Tile Details"):
+                                st.json(tiles)
+
+                    elif errors:
+                        for err in errors:
+                            st.error(f"❌ Error: {err}")
                     else:
-                        st.error(f"❌ API request failed: {response.status_code}")
-                        st.error(response.text)
-                        
+                        st.warning("⚠️ No text found in image")
+
                 except requests.exceptions.ConnectionError:
                     st.error(f"❌ Failed to connect to {API_URL}. Is the server running?")
                 except Exception as e:
@@ -0,0 +1,150 @@
+import streamlit as st
+import os
+import time
+from dotenv import load_dotenv
+from translation_engine import TranslationEngine
+from speech_pipeline import SpeechPipeline, SENTENCE_WORKERS
+from pages.tts import stitch_audio_bytes
+
+# Load environment variables
+load_dotenv()
+
+# Spoken language -> (STT model_id, translation code)
+SPEECH_LANGUAGES = {
+    "English": ("en", "eng_Latn"),
+    "Kannada": ("ka", "kan_Knda")
+}
+
+
+def show():
+    """Display the Speech-to-Speech translation interface"""
+
+    st.title("🔁 Speech-to-Speech Translation")
+
+    NGROK_BASE = os.getenv("NGROK_BASE_URL", "")
+
+    if not NGROK_BASE:
+        st.error("⚠️ NGROK_BASE_URL environment variable not set!")
+        st.info("Please set it in Streamlit Cloud Secrets or your .env file")
+        return
+
+    STT_URL = f"{NGROK_BASE}/transcribe"
+    TRANSLATION_URL = f"{NGROK_BASE}/translation/translate"
+    TTS_URL = f"{NGROK_BASE}/tts/tts"
+
+    with st.expander("🔧 Debug Info"):
+        st.code(f"STT URL: {STT_URL}\nTranslation URL: {TRANSLATION_URL}\nTTS URL: {TTS_URL}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        source_name = st.selectbox("Spoken language:", list(SPEECH_LANGUAGES.keys()), index=0)
+    with col2:
+        target_name = st.selectbox("Speak back in:", list(SPEECH_LANGUAGES.keys()), index=1)
+
+    stt_model_id, source_code = SPEECH_LANGUAGES[source_name]
+    target_code = SPEECH_LANGUAGES[target_name][1]
+
+    with st.expander("⚙️ Pipeline"):
+        sentence_workers = st.slider(
+            "Sentences in flight:", 1, 16, SENTENCE_WORKERS,
+            help="Sentences translated and synthesized at the same time"
+        )
+
+    use_file_upload = st.toggle("📁 Upload audio file instead", value=False)
+
+    audio_data = None
+    filename = "recording.wav"
+
+    if use_file_upload:
+        uploaded_file = st.file_uploader(
+            "Choose an audio file:",
+            type=["wav", "mp3", "m4a", "ogg", "flac"],
+            help="WAV input is split at pauses so the first sentence plays back early"
+        )
+        if uploaded_file is not None:
+            st.audio(uploaded_file, format=f"audio/{uploaded_file.type.split('/')[-1]}")
+            audio_data = uploaded_file.read()
+            filename = uploaded_file.name
+    else:
+        try:
+            from streamlit_mic_recorder import mic_recorder
+
+            audio = mic_recorder(
+                start_prompt="🎙️ Click to Start Recording",
+                stop_prompt="⏹️ Click to Stop Recording",
+                just_once=False,
+                use_container_width=True,
+                key="s2s_recorder"
+            )
+            if audio:
+                st.audio(audio['bytes'], format="audio/wav")
+                audio_data = audio['bytes']
+
+        except ImportError:
+            st.error("❌ Voice recording requires 'streamlit-mic-recorder' package")
+            st.code("pip install streamlit-mic-recorder", language="bash")
+            st.info("💡 Toggle 'Upload audio file instead' to use file upload mode")
+
+    if not audio_data:
+        st.info("👆 Record or upload speech to get started")
+        return
+
+    if st.button("🔁 Translate Speech", type="primary"):
+        import requests
+
+        pipeline = SpeechPipeline(
+            STT_URL, stt_model_id, TranslationEngine(TRANSLATION_URL), TTS_URL,
+            source_code, target_code, sentence_workers=sentence_workers
+        )
+
+        status = st.empty()
+        status.info("🎧 Listening...")
+        audio_chunks = []
+        errors = []
+        first_latency = None
+
+        try:
+            # Sentences arrive in spoken order; each is playable as soon as it lands
+            for result in pipeline.run(audio_data, filename):
+                if result["error"]:
+                    errors.append(result["error"])
+                    continue
+                if result["audio"]:
+                    audio_chunks.append(result["audio"])
+                    if first_latency is None:
+                        first_latency = result["latency"]
+
+                with st.container():
+                    st.markdown(f"**{result['index'] + 1}.** {result['source']}")
+                    st.markdown(f"➡️ {result['translation']}")
+                    if result["audio"]:
+                        st.audio(result["audio"], format="audio/wav")
+                status.info(f"🔄 {result['index'] + 1} sentence(s) ready · {result['latency']:.1f}s")
+
+        except requests.exceptions.ConnectionError:
+            st.error(f"❌ Failed to connect to {NGROK_BASE}. Are the STT, translation and TTS servers running?")
+        except Exception as e:
+            st.error(f"❌ Unexpected error: {type(e).__name__}: {str(e)}")
+
+        if first_latency is not None:
+            status.success(f"✅ Done · first sentence audio after {first_latency:.1f}s")
+        else:
+            status.empty()
+
+        if errors:
+            st.warning(f"⚠️ {len(errors)} sentence(s) failed")
+            with st.expander("Error Details"):
+                for err in errors:
+                    st.error(err)
+
+        if audio_chunks:
+            st.divider()
+            st.subheader(f"🔊 Full {target_name} audio")
+            final_audio = stitch_audio_bytes(audio_chunks)
+            st.audio(final_audio, format="audio/wav")
+            st.download_button(
+                label="⬇️ Download Audio",
+                data=final_audio,
+                file_name=f"speech_{target_code}_{int(time.time())}.wav",
+                mime="audio/wav"
+            )
@@ -1,10 +1,9 @@
 import streamlit as st
-import requests
-import io
 import traceback
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from common.resilience import POLICIES
 
 # Load environment variables
 load_dotenv()
@@ -111,15 +110,17 @@ def show():
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             if st.button("🔄 Convert to Text", type="primary", use_container_width=True):
+                # Deferred so the page renders without loading the HTTP stack
+                import requests
                 with st.spinner("Transcribing audio..."):
                     try:
                         # Log request details
                         st.write(f"🔍 Debug: Sending {len(audio_data)} bytes to {API_URL}")
                         st.write(f"🔍 Debug: Model ID = {model_id}, Filename = {filename}")
                         
-                        # Prepare file for multipart upload
+                        # Prepare file for multipart upload (raw bytes, so a retry can resend it)
                         files = {
-                            'file': (filename, io.BytesIO(audio_data), 'audio/wav')
+                            'file': (filename, audio_data, 'audio/wav')
                         }
                         
                         # Prepare form data
@@ -128,7 +129,9 @@ def show():
                         }
                         
                         # Make API request
-                        response = requests.post(API_URL, files=files, data=data, timeout=60)
+                        response = POLICIES["stt"].call(
+                            lambda timeout: requests.post(API_URL, files=files, data=data, timeout=timeout)
+                        )
                         
                         # Log response
                         st.write(f"🔍 Debug: Response status = {response.status_code}")
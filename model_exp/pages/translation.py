@@ -1,12 +1,131 @@
 import streamlit as st
-import requests
 import os
+import json
+import time
 from pathlib import Path
 from dotenv import load_dotenv
+from translation_engine import TranslationEngine, MAX_TRANSLATION_WORKERS
+from translation_memory import get_translation_memory
+from translation_jobs import (
+    submit_job, get_job, list_jobs, extract_pdf_text, list_json_documents, load_json_document
+)
 
 # Load environment variables
 load_dotenv()
 
+JOB_STATUS_LABELS = {
+    "pending": "⏳ Pending",
+    "running": "🔄 Running",
+    "paused": "⏸️ Paused",
+    "done": "✅ Done",
+    "incomplete": "⚠️ Finished with untranslated sentences",
+    "failed": "❌ Failed"
+}
+
+
+def load_document(source, uploaded_file, json_path, source_lang_name):
+    """Return (name, text) for the selected document"""
+    if source == "Upload":
+        data = uploaded_file.getvalue()
+        if uploaded_file.name.lower().endswith(".pdf"):
+            return uploaded_file.name, extract_pdf_text(data, ocr_language=source_lang_name.lower())
+        if uploaded_file.name.lower().endswith(".json"):
+            return uploaded_file.name, json.loads(data).get("content", "")
+        return uploaded_file.name, data.decode("utf-8", errors="replace")
+    return json_path.name, load_json_document(json_path)
+
+
+def show_job(job, target_lang_name, engine):
+    """Progress, streamed output and download for one background job"""
+    st.subheader(f"📄 {job.name} → {target_lang_name}")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if job.running:
+            if st.button("⏸️ Pause"):
+                job.pause()
+        elif job.status != "done":
+            if st.button("▶️ Resume", type="primary"):
+                job.start(engine)
+                st.rerun()
+    
+    status_placeholder = st.empty()
+    progress_bar = st.progress(0.0)
+    output_placeholder = st.empty()
+    
+    def render():
+        done, total = job.progress()
+        status_placeholder.caption(f"{JOB_STATUS_LABELS.get(job.status, job.status)} · {done}/{total} sentences")
+        progress_bar.progress(done / total if total else 1.0)
+        output_placeholder.text(job.render())
+    
+    # Stream segments as they finish; any click reruns the page and the job keeps going
+    while job.running:
+        render()
+        time.sleep(1)
+    render()
+    
+    if job.errors:
+        with st.expander(f"⚠️ {len(job.errors)} error(s)"):
+            for err in job.errors:
+                st.error(err)
+    
+    done, total = job.progress()
+    with col2:
+        st.download_button(
+            "📥 Download translation" if done == total else f"📥 Download translated part ({done}/{total})",
+            data=job.render(complete_only=done == total),
+            file_name=f"{Path(job.name).stem}_{job.target_language}.txt",
+            mime="text/plain",
+            help=None if done == total else "Resume the job later to translate the rest"
+        )
+
+
+def show_document(source_lang_code, target_lang_code, source_lang_name, target_lang_name, engine):
+    """Display the document translation interface"""
+    source = st.radio("Document source:", ["Upload", "Knowledge base JSON"], horizontal=True)
+    uploaded_file = None
+    json_path = None
+    if source == "Upload":
+        uploaded_file = st.file_uploader(
+            "Upload a document:",
+            type=["txt", "pdf", "json"],
+            help="PDFs go through the pdf_to_json extractor; JSON files are read from their \"content\" field"
+        )
+    else:
+        json_files = list_json_documents()
+        if not json_files:
+            st.info("No JSON documents found. Run voicebot/data/pdf_to_json.py first.")
+        else:
+            json_path = st.selectbox("Document:", json_files, format_func=lambda p: p.name)
+    
+    ready = uploaded_file is not None or json_path is not None
+    if st.button("Translate Document", type="primary", disabled=not ready):
+        try:
+            with st.spinner("Reading document..."):
+                name, text = load_document(source, uploaded_file, json_path, source_lang_name)
+            if not text.strip():
+                st.warning("⚠️ No text found in the document")
+            else:
+                job = submit_job(name, text, source_lang_code, target_lang_code, engine)
+                st.session_state.translation_job = job.job_id
+        except Exception as e:
+            st.error(f"❌ Could not read the document: {type(e).__name__}: {str(e)}")
+    
+    previous = [job for job in list_jobs() if job[0] != st.session_state.get("translation_job")]
+    if previous:
+        with st.expander(f"🗂️ Previous jobs ({len(previous)})"):
+            for job_id, name, src, tgt in previous:
+                if st.button(f"{name} ({src} → {tgt})", key=f"job_{job_id}"):
+                    st.session_state.translation_job = job_id
+                    st.rerun()
+    
+    job = get_job(st.session_state.translation_job) if st.session_state.get("translation_job") else None
+    if job is not None:
+        st.divider()
+        show_job(job, target_lang_name, engine)
+
+
 def show():
     """Display the Translation interface"""
     
@@ -59,6 +178,51 @@ def show():
     source_lang_code = LANGUAGES[source_lang_name]
     target_lang_code = LANGUAGES[target_lang_name]
     
+    document_mode = st.toggle("📄 Document mode (.txt, PDF or knowledge base JSON)", value=False)
+    
+    with st.expander("⚙️ Batching"):
+        max_workers = st.slider("Concurrent requests:", 1, 16, MAX_TRANSLATION_WORKERS)
+        max_batch_tokens = st.slider(
+            "Max tokens per batch:", 50, 1000, 400, step=50,
+            help="Sentences are packed into batches up to this estimated size"
+        )
+        use_memory = st.checkbox(
+            "Use translation memory", value=True,
+            help="Reuse stored translations of sentences seen before and only send the rest"
+        )
+    
+    memory = get_translation_memory()
+    with st.expander("🧠 Translation Memory"):
+        tm_stats = memory.stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Entries", tm_stats["entries"])
+        col2.metric("Hit rate (all time)", f"{tm_stats['hit_rate']:.0%}")
+        col3.metric("Hit rate (this session)", f"{tm_stats['session_hit_rate']:.0%}")
+        
+        st.download_button(
+            "📥 Export memory (JSONL)",
+            data="".join(memory.export_jsonl()),
+            file_name="translation_memory.jsonl",
+            mime="application/jsonl"
+        )
+        imported_file = st.file_uploader("Import memory (JSONL):", type=["jsonl"], key="tm_import")
+        if imported_file is not None and st.session_state.get("tm_imported") != imported_file.file_id:
+            try:
+                count = memory.import_jsonl(imported_file.getvalue().splitlines())
+                st.session_state.tm_imported = imported_file.file_id
+                st.success(f"✅ Imported {count} entries")
+            except (ValueError, KeyError) as e:
+                st.error(f"❌ Not a translation memory export: {type(e).__name__}: {str(e)}")
+    
+    engine = TranslationEngine(
+        API_URL, max_batch_tokens=max_batch_tokens, max_workers=max_workers,
+        memory=memory if use_memory else None
+    )
+    
+    if document_mode:
+        show_document(source_lang_code, target_lang_code, source_lang_name, target_lang_name, engine)
+        return
+    
     text = st.text_area(
         f"Enter {source_lang_name} text:",
         placeholder=f"Type or paste your {source_lang_name} text here...",
@@ -66,34 +230,49 @@ def show():
     )
     
     if st.button("Translate", type="primary"):
+        import requests
         if text.strip():
             with st.spinner("Translating..."):
                 try:
-                    payload = {
-                        "source_language": source_lang_code,
-                        "target_language": target_lang_code,
-                        "text": text
-                    }
+                    progress_bar = st.progress(0.0)
+                    
+                    def on_progress(done, total):
+                        progress_bar.progress(done / total, text=f"{done}/{total} batches")
                     
-                    response = requests.post(API_URL, json=payload, timeout=120)
+                    translated_text, stats = engine.translate(
+                        text, source_lang_code, target_lang_code, on_progress=on_progress
+                    )
+                    progress_bar.empty()
                     
-                    if response.status_code == 200:
-                        result = response.json()
-                        translated_text = result.get('translated_text', '')
+                    if stats["errors"] and len(stats["errors"]) >= stats["batches"]:
+                        for err in stats["errors"]:
+                            st.error(f"❌ {err}")
+                    elif translated_text.strip():
+                        st.divider()
+                        st.success("✅ Translation completed!")
+                        st.info(
+                            f"⏱️ {stats['sentences']} sentences in {stats['batches']} batches, "
+                            f"{stats['elapsed']:.2f} seconds"
+                        )
+                        if stats["memory_hits"]:
+                            st.caption(
+                                f"🧠 {stats['memory_hits']} sentence(s) from translation memory, "
+                                f"{stats['sent']} sent to the API"
+                            )
+                        
+                        if stats["errors"]:
+                            st.warning(f"⚠️ {len(stats['errors'])} batch(es) failed and were left untranslated")
+                            with st.expander("Error Details"):
+                                for err in stats["errors"]:
+                                    st.error(err)
+                        
+                        st.subheader(f"{target_lang_name} Translation:")
+                        st.text(translated_text)
                         
-                        if translated_text:
-                            st.divider()
-                            st.success("✅ Translation completed!")
-                            
-                            st.subheader(f"{target_lang_name} Translation:")
-                            st.write(translated_text)
-                            
-                            # Copy box for the user
-                            st.code(translated_text, language=None)
-                        else:
-                            st.warning("⚠️ No translation returned from the API")
+                        # Copy box for the user
+                        st.code(translated_text, language=None)
                     else:
-                        st.error(f"❌ API Error {response.status_code}: {response.text[:200]}")
+                        st.warning("⚠️ No translation returned from the API")
                         
                 except requests.exceptions.ConnectionError:
                     st.error(f"❌ Failed to connect to {API_URL}. Is the translation server running?")
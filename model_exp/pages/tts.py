@@ -1,9 +1,9 @@
 import streamlit as st
-import requests
 import base64
 import os
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from common.resilience import POLICIES, request_key
 
 load_dotenv()
 
@@ -55,8 +55,10 @@ def split_text(text, chunk_size=100):
 
 def process_chunk(chunk, chunk_index, api_url):
     """Process single chunk and return indexed result"""
+    import requests
     try:
-        response = requests.post(api_url, json={"text": chunk}, timeout=60)
+        response = POLICIES["tts"].call(lambda timeout: requests.post(api_url, json={"text": chunk}, timeout=timeout),
+                                        key=request_key(api_url, chunk))
         if response.status_code == 200:
             result = response.json()
             audio_bytes = base64.b64decode(result["audio_base64"])
@@ -132,6 +134,7 @@ def show():
     
     # Synthesize button
     if st.button("Generate Speech", type="primary"):
+        import requests
         if text.strip():
             with st.spinner("Generating audio..."):
                 try:
@@ -0,0 +1,92 @@
+"""
+Import-time profile for the model_exp pages.
+
+Each page is imported in a fresh interpreter under `python -X importtime`,
+after streamlit (which every page needs anyway), so the number reported is
+what opening that page adds to a cold start.
+
+    python profile_imports.py            # print the table
+    python profile_imports.py --check    # exit 1 if a page is over budget
+    python profile_imports.py --update   # write import_budget.json
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+BUDGET_FILE = SCRIPT_DIR / "import_budget.json"
+PAGE_MODULES = [
+    "pages.home",
+    "pages.ocr",
+    "pages.stt",
+    "pages.translation",
+    "pages.tts",
+    "pages.speech_to_speech"
+]
+
+
+def import_time_ms(module):
+    """Cumulative import time of module in a fresh interpreter, in ms"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import streamlit; import {module}"],
+        cwd=SCRIPT_DIR, capture_output=True, text=True, check=True
+    )
+    # Lines look like: "import time:   self [us] |  cumulative | imported package"
+    for line in reversed(result.stderr.splitlines()):
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"No importtime entry for {module}")
+
+
+def profile(runs):
+    """Best of runs per page - the minimum filters out disk cache and scheduler noise"""
+    return {module: min(import_time_ms(module) for _ in range(runs)) for module in PAGE_MODULES}
+
+
+def load_budget():
+    if not BUDGET_FILE.exists():
+        return {}
+    with open(BUDGET_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile page import times against import_budget.json")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per page")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any page exceeds its budget")
+    parser.add_argument("--update", action="store_true", help="Write the measured times as the new budget")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed fraction over budget")
+    parser.add_argument("--slack-ms", type=float, default=10.0,
+                        help="Allowed ms over budget, so millisecond-sized pages are not flagged on noise")
+    args = parser.parse_args()
+
+    timings = profile(args.runs)
+    budget = load_budget()
+
+    over = []
+    print(f"{'page':28} {'ms':>8} {'budget':>8}")
+    for module, ms in timings.items():
+        limit = budget.get(module)
+        flag = ""
+        if limit is not None and ms > limit * (1 + args.tolerance) + args.slack_ms:
+            over.append(module)
+            flag = "  over budget"
+        print(f"{module:28} {ms:8.1f} {limit if limit is not None else '-':>8}{flag}")
+
+    if args.update:
+        with open(BUDGET_FILE, 'w', encoding='utf-8') as f:
+            json.dump({module: round(ms, 1) for module, ms in timings.items()}, f, indent=2)
+            f.write("\n")
+        print(f"\nWrote {BUDGET_FILE.name}")
+
+    if args.check and over:
+        print(f"\n{len(over)} page(s) over budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Pipelined speech-to-speech translation.
+
+Audio is cut into utterances at pauses and each utterance is transcribed as
+its own STT request. As soon as an utterance's transcript arrives its
+sentences are handed to a worker pool that translates each sentence and
+synthesizes it right away, so translation and TTS of the first sentence
+overlap with STT of the rest. Results are yielded in spoken order, each one
+as soon as it and everything before it is ready.
+"""
+
+import io
+import time
+import wave
+import base64
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from common.resilience import POLICIES, request_key
+from translation_engine import segment_text, needs_translation
+from pages.stt import fix_bytecodes
+from pages.tts import split_text, stitch_audio_bytes
+
+FRAME_MS = 30
+# A pause at least this long ends an utterance
+MIN_SILENCE_MS = 400
+# Utterances are force-cut at the quietest frame past this length
+MAX_UTTERANCE_S = 15
+MIN_UTTERANCE_S = 1.0
+
+STT_WORKERS = 2
+SENTENCE_WORKERS = 4
+TTS_CHUNK_CHARS = 100
+
+
+def _write_wav(params, frames):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as out:
+        out.setparams(params)
+        out.writeframes(frames)
+    return buffer.getvalue()
+
+
+def split_on_silence(audio_bytes):
+    """Cut 16-bit PCM WAV audio into utterances at pauses - returns a list of WAV bytes.
+
+    Anything that is not 16-bit WAV (webm, mp3, ...) is returned whole as a single utterance.
+    """
+    import numpy as np
+
+    try:
+        with wave.open(io.BytesIO(audio_bytes), 'rb') as source:
+            params = source.getparams()
+            frames = source.readframes(params.nframes)
+    except (wave.Error, EOFError):
+        return [audio_bytes]
+    if params.sampwidth != 2 or not frames:
+        return [audio_bytes]
+
+    samples = np.frombuffer(frames, dtype=np.int16).reshape(-1, params.nchannels).mean(axis=1)
+    frame_len = max(1, params.framerate * FRAME_MS // 1000)
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return [audio_bytes]
+    rms = np.sqrt((samples[:n_frames * frame_len].reshape(n_frames, frame_len) ** 2).mean(axis=1))
+
+    # Silence relative to this recording's own level: ~20 dB under loud speech, above the noise floor
+    threshold = max(np.percentile(rms, 1) * 2, np.percentile(rms, 95) * 0.1)
+    silent = rms < threshold
+
+    min_silence = MIN_SILENCE_MS // FRAME_MS
+    max_frames = int(MAX_UTTERANCE_S * 1000 / FRAME_MS)
+    min_frames = int(MIN_UTTERANCE_S * 1000 / FRAME_MS)
+
+    cuts = [0]
+    run_start = None
+    for i in range(n_frames + 1):
+        if i < n_frames and silent[i]:
+            if run_start is None:
+                run_start = i
+            continue
+        if run_start is not None and i - run_start >= min_silence:
+            cut = (run_start + i) // 2
+            if cut - cuts[-1] >= min_frames:
+                cuts.append(cut)
+        run_start = None
+        # Long stretch without a pause: cut at its quietest frame, the latest one on ties
+        while i - cuts[-1] > max_frames:
+            window = rms[cuts[-1] + min_frames:cuts[-1] + max_frames][::-1]
+            cuts.append(cuts[-1] + max_frames - 1 - int(np.argmin(window)))
+    cuts.append(n_frames)
+
+    bytes_per_frame = frame_len * params.sampwidth * params.nchannels
+    utterances = []
+    for start, end in zip(cuts, cuts[1:]):
+        if end <= start or silent[start:end].all():
+            continue
+        last = len(frames) if end == n_frames else end * bytes_per_frame
+        utterances.append(_write_wav(params, frames[start * bytes_per_frame:last]))
+    return utterances or [audio_bytes]
+
+
+class SpeechPipeline:
+    """STT -> translation -> TTS, sentence by sentence"""
+
+    def __init__(self, stt_url, stt_model_id, translation_engine, tts_url, source_language, target_language,
+                 stt_workers=STT_WORKERS, sentence_workers=SENTENCE_WORKERS):
+        self.stt_url = stt_url
+        self.stt_model_id = stt_model_id
+        self.engine = translation_engine
+        self.tts_url = tts_url
+        self.source_language = source_language
+        self.target_language = target_language
+        self.stt_workers = stt_workers
+        self.sentence_workers = sentence_workers
+
+    def transcribe(self, audio_bytes, filename="utterance.wav"):
+        import requests
+        response = POLICIES["stt"].call(lambda timeout: requests.post(
+            self.stt_url, files={'file': (filename, audio_bytes, 'audio/wav')},
+            data={'model_id': self.stt_model_id}, timeout=timeout
+        ))
+        if response.status_code != 200:
+            raise RuntimeError(f"STT API Error {response.status_code}: {response.text[:200]}")
+        result = response.json()
+        text = result.get('text') or result.get('transcription') or result.get('transcript') or ''
+        return fix_bytecodes(text)
+
+    def synthesize(self, text):
+        import requests
+        chunks = []
+        for chunk in split_text(text, chunk_size=TTS_CHUNK_CHARS):
+            response = POLICIES["tts"].call(
+                lambda timeout: requests.post(self.tts_url, json={"text": chunk}, timeout=timeout),
+                key=request_key(self.tts_url, chunk)
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"TTS API Error {response.status_code}: {response.text[:200]}")
+            chunks.append(base64.b64decode(response.json()["audio_base64"]))
+        return stitch_audio_bytes(chunks)
+
+    def process_sentence(self, sentence):
+        """Translate one sentence and synthesize it - returns (translation, audio_bytes)"""
+        if needs_translation(sentence):
+            translation = self.engine.translate_batch([sentence], self.source_language, self.target_language)[0]
+        else:
+            translation = sentence
+        return translation, self.synthesize(translation)
+
+    def run(self, audio_bytes, filename="recording.wav"):
+        """Yield one result dict per sentence, in spoken order, as each becomes ready.
+
+        Results have index, source, translation, audio (WAV bytes or None), error and
+        latency (seconds since the run started).
+        """
+        start_time = time.time()
+        utterances = split_on_silence(audio_bytes)
+
+        with ThreadPoolExecutor(max_workers=self.stt_workers) as stt_pool, \
+                ThreadPoolExecutor(max_workers=self.sentence_workers) as sentence_pool:
+            stt_futures = [
+                stt_pool.submit(self.transcribe, utterance, filename if len(utterances) == 1 else "utterance.wav")
+                for utterance in utterances
+            ]
+            next_utterance = 0
+            # (source_sentence, future, error) in spoken order, growing as transcripts arrive in order
+            sentences = []
+            next_sentence = 0
+
+            while next_utterance < len(stt_futures) or next_sentence < len(sentences):
+                # Transcripts are consumed in order so sentence numbering follows the audio
+                while next_utterance < len(stt_futures) and stt_futures[next_utterance].done():
+                    future = stt_futures[next_utterance]
+                    next_utterance += 1
+                    try:
+                        transcript = future.result()
+                    except Exception as e:
+                        sentences.append((None, None, f"Utterance {next_utterance}: {type(e).__name__}: {str(e)}"))
+                        continue
+                    for sentence in segment_text(transcript, self.source_language)[1::2]:
+                        sentences.append((sentence, sentence_pool.submit(self.process_sentence, sentence), None))
+
+                while next_sentence < len(sentences) and (
+                        sentences[next_sentence][1] is None or sentences[next_sentence][1].done()):
+                    sentence, future, error = sentences[next_sentence]
+                    translation, audio = None, None
+                    if future is not None:
+                        try:
+                            translation, audio = future.result()
+                        except Exception as e:
+                            error = f"{type(e).__name__}: {str(e)}"
+                    yield {
+                        "index": next_sentence,
+                        "source": sentence,
+                        "translation": translation,
+                        "audio": audio,
+                        "error": error,
+                        "latency": time.time() - start_time
+                    }
+                    next_sentence += 1
+
+                pending = [f for f in stt_futures[next_utterance:next_utterance + 1]]
+                pending += [f for _, f, _ in sentences[next_sentence:next_sentence + 1] if f is not None]
+                if pending:
+                    wait(pending, return_when=FIRST_COMPLETED)
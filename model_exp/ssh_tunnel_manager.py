@@ -4,16 +4,19 @@ Establishes SSH tunnels to backend services through jump host
 """
 
 import subprocess
+import socket
 import time
 import os
 import atexit
 import signal
-from pathlib import Path
-from dotenv import load_dotenv
+import random
+import tempfile
+import threading
+from dotenv import load_dotenv, find_dotenv
 
-# Load variables from .env file in the same directory as this script
-# env_path = Path(__file__).parent / '.env'
-load_dotenv()
+# Load variables from the nearest .env file
+env_path = find_dotenv()
+load_dotenv(env_path)
 
 # SSH Configuration
 JUMP_HOST = os.getenv("JUMPHOST")
@@ -26,6 +29,32 @@ PORTS = [8001, 8002, 8003, 8004]
 JUMP_PASSWORD = os.getenv("JUMP_PASSWORD")
 TARGET_PASSWORD = os.getenv("TARGET_PASSWORD")
 
+# How long start_all_tunnels waits for every forwarded port to accept connections
+READY_TIMEOUT = float(os.getenv("TUNNEL_READY_TIMEOUT", "30"))
+PROBE_TIMEOUT = 0.5
+PROBE_BACKOFF_START = 0.05
+PROBE_BACKOFF_MAX = 1.0
+
+# "per_port": one ssh -J process per port. "multiplex": one master connection,
+# with each port forward added over its control socket
+TUNNEL_MODES = ("per_port", "multiplex")
+TUNNEL_MODE = os.getenv("TUNNEL_MODE", "per_port")
+CONTROL_PATH = os.getenv(
+    "TUNNEL_CONTROL_PATH", os.path.join(tempfile.gettempdir(), f"ai-tools-tunnel-{os.getuid()}.sock")
+)
+CONTROL_TIMEOUT = 5
+SSH_OPTIONS = ['-o', 'StrictHostKeyChecking=no', '-o', 'ServerAliveInterval=60']
+
+# Watchdog: how often tunnels are checked, and the reconnect backoff once one
+# has failed (the first reconnect is immediate)
+WATCH_INTERVAL = float(os.getenv("TUNNEL_WATCH_INTERVAL", "2"))
+RECONNECT_BACKOFF_BASE = 1.0
+RECONNECT_BACKOFF_MAX = 30.0
+# How long one watchdog pass waits on the tunnels it reconnected. Slower ones
+# keep connecting (up to READY_TIMEOUT) and are picked up by later passes, so
+# one unreachable remote does not hold up the checks for every other port.
+RECONNECT_WAIT = 3.0
+
 if not JUMP_HOST or not TARGET_HOST:
     raise ValueError("Missing JUMPHOST or TARGETHOST in .env file")
 
@@ -34,18 +63,140 @@ if __name__ == "__main__" or os.getenv("DEBUG_TUNNELS"):
     print(f"[Tunnel Manager] JUMPHOST: {JUMP_HOST}")
     print(f"[Tunnel Manager] TARGETHOST: {TARGET_HOST}")
 
+
+def port_open(port, host="localhost", timeout=PROBE_TIMEOUT):
+    """True if something accepts TCP connections on host:port"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def probe_backoff(timeout):
+    """Yield once per probe round, sleeping with exponential backoff in between, until timeout"""
+    deadline = time.monotonic() + timeout
+    delay = PROBE_BACKOFF_START
+    while True:
+        yield
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, PROBE_BACKOFF_MAX)
+
+
+def wait_for_ports(ports, timeout=READY_TIMEOUT, alive=lambda port: True):
+    """Probe ports with exponential backoff until all accept connections.
+
+    Returns as soon as every port is reachable, or at the timeout with the
+    ports that are. A port whose tunnel process has died (alive(port) is
+    False) is dropped rather than waited on.
+    """
+    ready, pending = [], list(ports)
+    for _ in probe_backoff(timeout):
+        ready += [port for port in pending if port_open(port)]
+        pending = [port for port in pending if port not in ready and alive(port)]
+        if not pending:
+            break
+    return sorted(ready)
+
+
+def free_ports(ports):
+    """Kill whatever is listening on ports (stale tunnels) with one lsof call"""
+    try:
+        result = subprocess.run(
+            ['lsof', '-t', '-sTCP:LISTEN', '-i', 'TCP:' + ','.join(str(port) for port in ports)],
+            capture_output=True, text=True
+        )
+    except FileNotFoundError:
+        return
+    for pid in {int(pid) for pid in result.stdout.split()}:
+        if pid == os.getpid():
+            continue
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+class TunnelHealth:
+    """Watchdog bookkeeping for one forwarded port"""
+
+    def __init__(self, port):
+        self.port = port
+        self.up_since = None
+        self.reconnects = 0
+        self.consecutive_failures = 0
+        self.last_failure = None
+        self.last_failure_at = None
+        self.next_attempt = 0.0
+        self.connecting_since = None
+
+    def mark_up(self, now):
+        if self.up_since is None:
+            self.up_since = now
+        self.connecting_since = None
+        self.consecutive_failures = 0
+
+    def mark_connecting(self, now):
+        self.up_since = None
+        self.connecting_since = now
+
+    def mark_down(self, reason, now):
+        self.up_since = None
+        self.connecting_since = None
+        self.last_failure = reason
+        self.last_failure_at = time.time()
+        if self.consecutive_failures == 0:
+            delay = 0.0
+        else:
+            delay = min(RECONNECT_BACKOFF_MAX, RECONNECT_BACKOFF_BASE * 2 ** (self.consecutive_failures - 1))
+        self.consecutive_failures += 1
+        # Jitter so tunnels that dropped together do not all reconnect at once
+        self.next_attempt = now + delay * random.uniform(0.5, 1.0)
+
+    @property
+    def state(self):
+        if self.up_since is not None:
+            return "up"
+        return "connecting" if self.connecting_since is not None else "down"
+
+    def stats(self, now):
+        return {
+            "port": self.port,
+            "state": self.state,
+            "uptime_s": round(now - self.up_since, 1) if self.up_since is not None else 0.0,
+            "reconnects": self.reconnects,
+            "last_failure": self.last_failure,
+            "last_failure_at": self.last_failure_at,
+            "retry_in_s": round(max(0.0, self.next_attempt - now), 1) if self.state == "down" else 0.0
+        }
+
+
 class TunnelManager:
-    def __init__(self):
+    def __init__(self, mode=TUNNEL_MODE):
+        if mode not in TUNNEL_MODES:
+            raise ValueError(f"TUNNEL_MODE must be one of {TUNNEL_MODES}, got {mode!r}")
+        self.mode = mode
+        self.use_passwords = bool(JUMP_PASSWORD or TARGET_PASSWORD)
         self.processes = []
+        # Multiplex mode: the master ssh process and the ports forwarded over it
+        self.master = None
+        self.forwards = set()
+        self.health = {port: TunnelHealth(port) for port in PORTS}
+        self._health_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watchdog = None
         atexit.register(self.cleanup)
     
-    def create_tunnel_with_expect(self, port):
-        """Create SSH tunnel using expect for password handling"""
+    def _spawn_with_expect(self, ssh_args):
+        """Start ssh under expect, answering the jump and target password prompts"""
         # Removed "Connection established" as -N doesn't return that.
         # Added 'exp_continue' to handle multiple password prompts sequentially.
         expect_script = f"""
 set timeout 20
-spawn ssh -N -L {port}:localhost:{port} -J {JUMP_HOST} {TARGET_HOST} -o StrictHostKeyChecking=no -o ServerAliveInterval=60
+spawn ssh {' '.join(ssh_args)}
 
 expect {{
     "password:" {{
@@ -67,16 +218,40 @@ expect {{
 # Keep the process alive
 interact
 """
-        
+        return subprocess.Popen(
+            ['expect', '-c', expect_script],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            stdin=subprocess.PIPE,
+            preexec_fn=os.setsid # Create a process group for easier cleanup
+        )
+    
+    def _spawn_with_keys(self, ssh_args):
+        # Own process group, so removing one tunnel never signals the app
+        return subprocess.Popen(
+            ['ssh', *ssh_args], stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True
+        )
+    
+    def _spawn(self, ssh_args):
+        if self.use_passwords:
+            return self._spawn_with_expect(ssh_args)
+        return self._spawn_with_keys(ssh_args)
+    
+    @staticmethod
+    def _terminate(process):
         try:
-            process = subprocess.Popen(
-                ['expect', '-c', expect_script],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE,
-                preexec_fn=os.setsid # Create a process group for easier cleanup
-            )
-            
+            # Kill the whole process group (expect + ssh)
+            os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+        except:
+            pass
+    
+    def _tunnel_args(self, port):
+        return ['-N', '-L', f'{port}:localhost:{port}', '-J', JUMP_HOST, TARGET_HOST, *SSH_OPTIONS]
+    
+    def create_tunnel_with_expect(self, port):
+        """Create SSH tunnel using expect for password handling"""
+        try:
+            process = self._spawn_with_expect(self._tunnel_args(port))
             self.processes.append({'port': port, 'process': process})
             return True
         except Exception as e:
@@ -84,69 +259,243 @@ interact
             return False
     
     def create_tunnel_with_keys(self, port):
-        cmd = [
-            'ssh', '-N',
-            '-L', f'{port}:localhost:{port}',
-            '-J', JUMP_HOST,
-            TARGET_HOST,
-            '-o', 'StrictHostKeyChecking=no',
-            '-o', 'ServerAliveInterval=60'
-        ]
         try:
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            process = self._spawn_with_keys(self._tunnel_args(port))
             self.processes.append({'port': port, 'process': process})
             return True
         except Exception as e:
             print(f"Error creating tunnel for port {port}: {e}")
             return False
     
-    def start_all_tunnels(self):
-        use_passwords = bool(JUMP_PASSWORD or TARGET_PASSWORD)
+    def _control(self, command, *args):
+        """Send an ssh -O control command to the master; True if it succeeded"""
+        try:
+            result = subprocess.run(
+                ['ssh', '-S', CONTROL_PATH, '-O', command, *args, TARGET_HOST],
+                capture_output=True, timeout=CONTROL_TIMEOUT
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        return result.returncode == 0
+    
+    def master_alive(self):
+        return self.master is not None and self.master.poll() is None
+    
+    def start_master(self, timeout=READY_TIMEOUT):
+        """Open the one authenticated connection that every port forward rides on"""
+        # A master left behind by an earlier run would own the control socket
+        if os.path.exists(CONTROL_PATH):
+            self._control('exit')
+            try:
+                os.unlink(CONTROL_PATH)
+            except FileNotFoundError:
+                pass
+        
+        try:
+            self.master = self._spawn(['-N', '-M', '-S', CONTROL_PATH, '-J', JUMP_HOST, *SSH_OPTIONS, TARGET_HOST])
+        except Exception as e:
+            print(f"Error starting SSH master connection: {e}")
+            return False
         
+        for _ in probe_backoff(timeout):
+            if self._control('check'):
+                return True
+            if not self.master_alive():
+                return False
+        return False
+    
+    def add_tunnel(self, port):
+        """Forward port. Over the master this is a control-socket request, not a new login."""
+        if self.mode == "multiplex":
+            if self._control('forward', '-L', f'{port}:localhost:{port}'):
+                self.forwards.add(port)
+                return True
+            print(f"Error forwarding port {port} over the SSH master")
+            return False
+        if self.use_passwords:
+            return self.create_tunnel_with_expect(port)
+        return self.create_tunnel_with_keys(port)
+    
+    def remove_tunnel(self, port):
+        """Stop forwarding port, leaving the other tunnels up"""
+        if self.mode == "multiplex":
+            self.forwards.discard(port)
+            return self._control('cancel', '-L', f'{port}:localhost:{port}')
+        for tunnel in [t for t in self.processes if t['port'] == port]:
+            self._terminate(tunnel['process'])
+            self.processes.remove(tunnel)
+        return True
+    
+    def start_all_tunnels(self):
+        """Start a tunnel per port and return the ports that accept connections"""
         # Kill any existing tunnels on these ports first to avoid "Address already in use"
+        free_ports(PORTS)
+        
+        if self.mode == "multiplex" and not self.start_master():
+            print("⚠ SSH master connection failed; no tunnels started")
+            return []
+        
+        # Per-port mode: each ssh authenticates in its own process, so
+        # spawning them back to back runs the handshakes concurrently
         for port in PORTS:
-            subprocess.run(f"lsof -ti:{port} | xargs kill -9", shell=True, stderr=subprocess.DEVNULL)
-            
-            if use_passwords:
-                success = self.create_tunnel_with_expect(port)
-            else:
-                success = self.create_tunnel_with_keys(port)
-            
-            if success:
-                time.sleep(0.5) # Staggering prevents auth collisions
+            self.add_tunnel(port)
         
-        time.sleep(2)
-        return self.check_active_tunnels()
+        ready = wait_for_ports(PORTS, alive=self.is_alive)
+        self._record(PORTS, ready, "not reachable after startup")
+        return ready
+    
+    def is_alive(self, port):
+        if self.mode == "multiplex":
+            return port in self.forwards and self.master_alive()
+        return any(t['port'] == port and t['process'].poll() is None for t in self.processes)
     
     def check_active_tunnels(self):
+        if self.mode == "multiplex":
+            return sorted(self.forwards) if self.master_alive() else []
         active = []
         for tunnel in self.processes:
             if tunnel['process'].poll() is None:
                 active.append(tunnel['port'])
         return active
     
+    def _record(self, ports, ready, reason):
+        # Prefer the specific cause (e.g. the ssh exit code) over the generic reason
+        reasons = {port: self.failure_reason(port) or reason for port in ports if port not in ready}
+        now = time.monotonic()
+        with self._health_lock:
+            for port in ports:
+                if port in ready:
+                    self.health[port].mark_up(now)
+                else:
+                    self.health[port].mark_down(reasons[port], now)
+    
+    def failure_reason(self, port):
+        """Why port is not usable right now, or None if its tunnel is up"""
+        if self.mode == "multiplex":
+            if self.master is None:
+                return "master connection not started"
+            if self.master.poll() is not None:
+                return f"master connection exited (code {self.master.returncode})"
+            if port not in self.forwards:
+                return "port forward not active"
+        else:
+            tunnels = [t for t in self.processes if t['port'] == port]
+            if not tunnels:
+                return "no tunnel process"
+            if all(t['process'].poll() is not None for t in tunnels):
+                return f"ssh exited (code {tunnels[-1]['process'].returncode})"
+        if not port_open(port):
+            return "port not accepting connections"
+        return None
+    
+    def reconnect(self, ports):
+        """Tear down and re-establish the tunnels for ports, waiting at most RECONNECT_WAIT"""
+        with self._health_lock:
+            for port in ports:
+                self.health[port].reconnects += 1
+        
+        if self.mode == "multiplex" and not self.master_alive():
+            # Every forward went down with the master
+            self.forwards.clear()
+            if self.master is not None:
+                self._terminate(self.master)
+            # A master still authenticating is kept; a later pass forwards over it
+            if not self.start_master(RECONNECT_WAIT):
+                self._record(ports, [], "master reconnect failed")
+                return []
+        else:
+            for port in ports:
+                self.remove_tunnel(port)
+        
+        free_ports(ports)
+        for port in ports:
+            self.add_tunnel(port)
+        ready = wait_for_ports(ports, timeout=RECONNECT_WAIT, alive=self.is_alive)
+        # Still alive but not listening yet: let it finish in the background
+        connecting = [port for port in ports if port not in ready and self.is_alive(port)]
+        now = time.monotonic()
+        with self._health_lock:
+            for port in connecting:
+                self.health[port].mark_connecting(now)
+        self._record([port for port in ports if port not in connecting], ready, "not reachable after reconnect")
+        return ready
+    
+    def check_tunnels(self):
+        """One watchdog pass: note tunnels that went down and reconnect the ones due"""
+        reasons = {port: self.failure_reason(port) for port in PORTS}
+        alive = {port: self.is_alive(port) for port in PORTS}
+        now = time.monotonic()
+        due = []
+        with self._health_lock:
+            for port, health in self.health.items():
+                reason = reasons[port]
+                if reason is None:
+                    health.mark_up(now)
+                    continue
+                if health.connecting_since is not None:
+                    if alive[port] and now - health.connecting_since < READY_TIMEOUT:
+                        continue
+                    if alive[port]:
+                        reason = f"not reachable after {READY_TIMEOUT:.0f}s"
+                    health.mark_down(reason, now)
+                elif health.up_since is not None:
+                    print(f"[Tunnel Watchdog] Port {port} down: {reason}")
+                    health.mark_down(reason, now)
+                if now >= health.next_attempt:
+                    due.append(port)
+        if due:
+            ready = self.reconnect(due)
+            print(f"[Tunnel Watchdog] Reconnected {len(ready)}/{len(due)} tunnel(s): {ready}")
+    
+    def _watch(self):
+        while not self._stop.wait(WATCH_INTERVAL):
+            try:
+                self.check_tunnels()
+            except Exception as e:
+                print(f"[Tunnel Watchdog] Error: {type(e).__name__}: {e}")
+    
+    def start_watchdog(self):
+        """Check the tunnels every WATCH_INTERVAL seconds and reconnect any that drop"""
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(target=self._watch, name="tunnel-watchdog", daemon=True)
+            self._watchdog.start()
+    
+    def status(self):
+        """Per-port state, uptime, reconnect count and last failure"""
+        with self._health_lock:
+            now = time.monotonic()
+            return [self.health[port].stats(now) for port in PORTS]
+    
     def cleanup(self):
+        self._stop.set()
         for tunnel in self.processes:
-            try:
-                # Kill the whole process group (expect + ssh)
-                os.killpg(os.getpgid(tunnel['process'].pid), signal.SIGTERM)
-            except:
-                pass
+            self._terminate(tunnel['process'])
+        if self.master is not None:
+            self._control('exit')
+            self._terminate(self.master)
 
 _manager = None
+_manager_lock = threading.Lock()
 
 def initialize_tunnels():
     global _manager
     if _manager is None:
-        _manager = TunnelManager()
-        active_ports = _manager.start_all_tunnels()
-        
-        if len(active_ports) == len(PORTS):
-            print(f"✓ All {len(active_ports)} SSH tunnels established")
-        else:
-            print(f"⚠ Warning: Only {len(active_ports)}/{len(PORTS)} tunnels active")
-            print(f"Active ports: {active_ports}")
+        with _manager_lock:
+            if _manager is None:
+                manager = TunnelManager()
+                start = time.monotonic()
+                ready_ports = manager.start_all_tunnels()
+                elapsed = time.monotonic() - start
+                
+                if len(ready_ports) == len(PORTS):
+                    print(f"✓ All {len(ready_ports)} SSH tunnels reachable in {elapsed:.1f}s")
+                else:
+                    print(f"⚠ Warning: Only {len(ready_ports)}/{len(PORTS)} tunnels reachable after {elapsed:.1f}s")
+                    print(f"Reachable ports: {ready_ports}")
+                manager.start_watchdog()
+                _manager = manager
     return _manager
 
 def get_tunnel_status():
-    return _manager.check_active_tunnels() if _manager else []
\ No newline at end of file
+    """Per-port tunnel health from the watchdog; empty if tunnels were never started"""
+    return _manager.status() if _manager else []
\ No newline at end of file
@@ -9,6 +9,7 @@ TARGET_HOST="neurodx@1xxxxxx"
 JUMP_PASSWORD="your_jump_password_here"
 TARGET_PASSWORD="your_target_password_here"
 PORTS=(8000 8001 8002 8003 8004)
+READY_TIMEOUT=30
 
 echo "Starting SSH tunnels..."
 
@@ -34,15 +35,39 @@ create_tunnel() {
 EOF
     
     echo "✓ Started tunnel for port $port (PID: $!)"
-    sleep 1
 }
 
-# Create tunnels for all ports
+# Wait until localhost:$1 accepts connections, probing with exponential backoff
+wait_for_port() {
+    local port=$1
+    local deadline=$((SECONDS + READY_TIMEOUT))
+    local delay=0.05
+    
+    until (exec 3<>/dev/tcp/127.0.0.1/${port}) 2>/dev/null; do
+        if (( SECONDS >= deadline )); then
+            return 1
+        fi
+        sleep $delay
+        delay=$(awk -v d="$delay" 'BEGIN { d *= 2; print (d > 1 ? 1 : d) }')
+    done
+}
+
+# Create tunnels for all ports; the handshakes run concurrently
 for port in "${PORTS[@]}"; do
     create_tunnel $port
 done
 
-echo "✓ All SSH tunnels started"
+ready=0
+for port in "${PORTS[@]}"; do
+    if wait_for_port $port; then
+        echo "✓ Port $port reachable"
+        ready=$((ready + 1))
+    else
+        echo "⚠ Port $port not reachable after ${READY_TIMEOUT}s"
+    fi
+done
+
+echo "✓ ${ready}/${#PORTS[@]} SSH tunnels ready"
 echo "Press Ctrl+C to stop all tunnels"
 
 # Wait for user interrupt
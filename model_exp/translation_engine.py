@@ -0,0 +1,209 @@
+"""
+Segmented translation engine for the /translation/translate endpoint.
+
+Input is split into paragraphs, lines and sentences using the delimiters of
+the source script. Sentences are packed into token-bounded batches that are
+translated concurrently, and the output is reassembled with the original
+whitespace between segments, so paragraph layout is preserved. With a
+TranslationMemory attached, sentences seen before are served from memory
+and only the rest go to the API.
+"""
+
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from common.resilience import POLICIES, request_key
+
+MAX_BATCH_TOKENS = 400
+MAX_TRANSLATION_WORKERS = 4
+
+# Sentence-ending punctuation per script (the suffix of codes like "kan_Knda")
+DANDA_SCRIPTS = {"Deva", "Beng", "Guru", "Orya"}
+LATIN_DELIMITERS = ".!?"
+DANDA_DELIMITERS = "।॥.!?"
+
+# Common abbreviations in government documents that end in a period but not a sentence
+ABBREVIATIONS = {
+    "no", "nos", "mr", "mrs", "ms", "dr", "sri", "smt", "govt", "dept", "sec", "art",
+    "vol", "viz", "etc", "e.g", "i.e", "vs", "sl", "rs", "st", "ltd", "pvt", "co", "ref"
+}
+
+_ABBREVIATION_END = re.compile(r"(?:^|[\s(])([A-Za-z][A-Za-z.]*)\.$")
+_NOTHING_TO_TRANSLATE = re.compile(r"^[\W\d_]*$")
+
+
+def needs_translation(sentence):
+    """False for segments with no letters (numbering, punctuation) that are kept as-is"""
+    return not _NOTHING_TO_TRANSLATE.match(sentence)
+
+
+def script_of(language_code):
+    """Script suffix of a language code, e.g. kan_Knda -> Knda"""
+    return language_code.split("_")[-1]
+
+
+def estimate_tokens(text):
+    """Rough token estimate: ~4 chars per token for ASCII, ~2 for Indic scripts"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) // 2 + 1
+
+
+def segment_text(text, source_language):
+    """Split text into alternating [separator, sentence, separator, sentence, ..., separator] pieces.
+
+    Joining the list gives back the original text exactly. Odd positions are sentences.
+    """
+    delimiters = DANDA_DELIMITERS if script_of(source_language) in DANDA_SCRIPTS else LATIN_DELIMITERS
+    splitter = re.compile(rf"(\s*\n\s*|(?<=[{re.escape(delimiters)}])\s+)")
+
+    leading = re.match(r"\s*", text).group()
+    trailing = re.search(r"\s*$", text[len(leading):]).group()
+    body = text[len(leading):len(text) - len(trailing)]
+
+    pieces = splitter.split(body) if body else []
+    # pieces alternate sentence, separator, sentence, ...
+    merged = []
+    for i in range(0, len(pieces), 2):
+        sentence = pieces[i]
+        if merged:
+            separator = pieces[i - 1]
+            # Re-join sentences that were split after an abbreviation ("No. 5", "Govt. of Karnataka")
+            match = _ABBREVIATION_END.search(merged[-1])
+            if match and match.group(1).lower() in ABBREVIATIONS and "\n" not in separator:
+                merged[-1] += separator + sentence
+                continue
+            merged.append(separator)
+        merged.append(sentence)
+
+    if not merged:
+        return [text]
+    return [leading] + merged + [trailing]
+
+
+def pack_batches(sentences, max_tokens=MAX_BATCH_TOKENS):
+    """Group sentence indices into consecutive batches whose estimated tokens stay under max_tokens"""
+    batches = []
+    current = []
+    current_tokens = 0
+    for index, sentence in enumerate(sentences):
+        tokens = estimate_tokens(sentence)
+        if current and current_tokens + tokens > max_tokens:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class TranslationEngine:
+    """Translate long text as concurrent, token-bounded batches of sentences"""
+
+    def __init__(self, api_url, max_batch_tokens=MAX_BATCH_TOKENS, max_workers=MAX_TRANSLATION_WORKERS,
+                 policy=POLICIES["translation"], memory=None):
+        self.api_url = api_url
+        self.max_batch_tokens = max_batch_tokens
+        self.max_workers = max_workers
+        self.policy = policy
+        self.memory = memory
+
+    def _request(self, text, source_language, target_language):
+        import requests
+        payload = {
+            "source_language": source_language,
+            "target_language": target_language,
+            "text": text
+        }
+        # Identical concurrent requests (same text, e.g. repeated sentences) share one call
+        response = self.policy.call(lambda timeout: requests.post(self.api_url, json=payload, timeout=timeout),
+                                    key=request_key(self.api_url, payload))
+        if response.status_code != 200:
+            raise RuntimeError(f"API Error {response.status_code}: {response.text[:200]}")
+        return response.json().get('translated_text', '')
+
+    def translate_batch(self, sentences, source_language, target_language):
+        """Translate a batch in one request, one sentence per line.
+
+        If the server does not return one line per sentence, fall back to one
+        request per sentence so alignment is never guessed.
+        """
+        if len(sentences) > 1:
+            translated = self._request("\n".join(sentences), source_language, target_language)
+            lines = [line.strip() for line in translated.strip().split("\n")]
+            if len(lines) == len(sentences):
+                return lines
+        return [self._request(sentence, source_language, target_language).strip() for sentence in sentences]
+
+    def translate_segments(self, sentences, source_language, target_language, on_progress=None,
+                           on_segments=None):
+        """Translate a list of sentences concurrently - returns (translations, errors, stats).
+
+        Sentences found in the translation memory are not sent. Sentences that fail keep
+        their source text. on_progress(done, total) is called from the calling thread as
+        each batch finishes, and on_segments({index: translation}) as soon as memory hits
+        or a batch's translations are available.
+        """
+        translations = list(sentences)
+        errors = []
+        to_translate = [i for i, s in enumerate(sentences) if needs_translation(s)]
+
+        memory_hits = 0
+        if self.memory is not None and to_translate:
+            found = self.memory.lookup_many([sentences[i] for i in to_translate], source_language, target_language)
+            for position, translated in found.items():
+                translations[to_translate[position]] = translated
+            memory_hits = len(found)
+            if found and on_segments:
+                on_segments({to_translate[position]: translated for position, translated in found.items()})
+            to_translate = [index for position, index in enumerate(to_translate) if position not in found]
+
+        batches = [
+            [to_translate[i] for i in batch]
+            for batch in pack_batches([sentences[i] for i in to_translate], self.max_batch_tokens)
+        ]
+        stats = {"batches": len(batches), "memory_hits": memory_hits, "sent": len(to_translate)}
+        if not batches:
+            return translations, errors, stats
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            futures = {
+                executor.submit(
+                    self.translate_batch, [sentences[i] for i in batch], source_language, target_language
+                ): batch
+                for batch in batches
+            }
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                batch = futures[future]
+                try:
+                    results = future.result()
+                    for index, translated in zip(batch, results):
+                        translations[index] = translated
+                    if self.memory is not None:
+                        self.memory.store_many(
+                            [(sentences[i], t) for i, t in zip(batch, results)], source_language, target_language
+                        )
+                    if on_segments:
+                        on_segments(dict(zip(batch, results)))
+                except Exception as e:
+                    errors.append(f"Sentences {batch[0] + 1}-{batch[-1] + 1}: {type(e).__name__}: {str(e)}")
+                if on_progress:
+                    on_progress(done, len(batches))
+
+        return translations, errors, stats
+
+    def translate(self, text, source_language, target_language, on_progress=None):
+        """Translate text, preserving paragraph layout - returns (translated_text, stats)"""
+        start_time = time.time()
+        pieces = segment_text(text, source_language)
+        sentences = pieces[1::2]
+        translations, errors, stats = self.translate_segments(
+            sentences, source_language, target_language, on_progress
+        )
+
+        pieces[1::2] = translations
+        stats.update(sentences=len(sentences), errors=errors, elapsed=time.time() - start_time)
+        return "".join(pieces), stats
@@ -0,0 +1,261 @@
+"""
+Background document translation jobs.
+
+A job segments a whole document once, then translates it in windows of
+sentences on a background thread using a TranslationEngine. Every finished
+sentence is appended to the job's progress file, so the UI can show and
+download the translated prefix while the job runs, and a paused, failed or
+interrupted job resumes where it stopped instead of starting over.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+from translation_engine import segment_text, needs_translation
+
+JOBS_DIR = Path(os.getenv("TRANSLATION_JOBS_DIR", str(Path(__file__).parent / "translation_jobs")))
+
+# voicebot's PDF extractor and its per-document JSON output
+VOICEBOT_DATA_DIR = Path(__file__).parent.parent / "voicebot" / "data"
+JSON_DATA_DIR = Path(os.getenv("JSON_DATA_DIR", str(VOICEBOT_DATA_DIR / "pdfs" / "json_data")))
+
+# Sentences handed to the engine at a time; progress is checkpointed and pause is honoured between windows
+WINDOW_SENTENCES = 200
+
+
+def _import_pdf_to_json():
+    if str(VOICEBOT_DATA_DIR) not in sys.path:
+        sys.path.insert(0, str(VOICEBOT_DATA_DIR))
+    import pdf_to_json
+    return pdf_to_json
+
+
+def extract_pdf_text(pdf_bytes, ocr_language="english"):
+    """Text of an uploaded PDF via pdf_to_json, OCRing scanned pages when a backend is available"""
+    pdf_to_json = _import_pdf_to_json()
+    from normalize import normalize_pages
+
+    backend = pdf_to_json.resolve_ocr_backend("auto")
+    page_ocr = pdf_to_json.PageOCR(backend, language=ocr_language) if backend else None
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(pdf_bytes)
+        temp_path = f.name
+    try:
+        pages = pdf_to_json.extract_pages_from_pdf(temp_path, page_ocr)
+    finally:
+        os.remove(temp_path)
+
+    if pages is None:
+        raise ValueError("Could not read the PDF")
+    pages, _ = normalize_pages(pages)
+    return "\n\n".join(page for page in pages if page.strip())
+
+
+def list_json_documents(json_dir=JSON_DATA_DIR):
+    """Per-document JSON files written by pdf_to_json"""
+    return sorted(Path(json_dir).glob("*.json")) if Path(json_dir).is_dir() else []
+
+
+def load_json_document(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get("content", "")
+
+
+def job_id_for(text, source_language, target_language):
+    """The same document and language pair always maps to the same job, so resubmitting resumes it"""
+    digest = hashlib.sha256(f"{source_language}\0{target_language}\0{text}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class TranslationJob:
+    """One document translation, persisted under JOBS_DIR/<job_id>"""
+
+    def __init__(self, job_id, name, pieces, source_language, target_language, jobs_dir=JOBS_DIR):
+        self.job_id = job_id
+        self.name = name
+        self.pieces = pieces
+        self.source_language = source_language
+        self.target_language = target_language
+        self.job_dir = Path(jobs_dir) / job_id
+        self.status = "pending"
+        self.errors = []
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._pause = threading.Event()
+        self._thread = None
+
+        sentences = pieces[1::2]
+        # None until translated; segments without letters are done from the start
+        self.translations = [None if needs_translation(s) else s for s in sentences]
+        self._load_progress()
+
+    @property
+    def sentences(self):
+        return self.pieces[1::2]
+
+    @property
+    def progress_path(self):
+        return self.job_dir / "progress.jsonl"
+
+    @classmethod
+    def create(cls, name, text, source_language, target_language, jobs_dir=JOBS_DIR):
+        job_id = job_id_for(text, source_language, target_language)
+        job = cls(job_id, name, segment_text(text, source_language), source_language, target_language, jobs_dir)
+        job.job_dir.mkdir(parents=True, exist_ok=True)
+        meta_path = job.job_dir / "job.json"
+        if not meta_path.exists():
+            temp_file = meta_path.with_suffix(".tmp")
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "job_id": job_id,
+                    "name": name,
+                    "source_language": source_language,
+                    "target_language": target_language,
+                    "created_at": time.time(),
+                    "pieces": job.pieces
+                }, f, ensure_ascii=False)
+            os.replace(temp_file, meta_path)
+        return job
+
+    @classmethod
+    def load(cls, job_dir):
+        with open(Path(job_dir) / "job.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(meta["job_id"], meta["name"], meta["pieces"], meta["source_language"],
+                   meta["target_language"], Path(job_dir).parent)
+
+    def _load_progress(self):
+        try:
+            with open(self.progress_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Last line cut short by a crash
+                        continue
+                    self.translations[entry["index"]] = entry["text"]
+        except FileNotFoundError:
+            pass
+
+    def _record(self, finished):
+        """Store {sentence_index: translation} in memory and append it to the progress file"""
+        with self._lock:
+            with open(self.progress_path, 'a', encoding='utf-8') as f:
+                for index, text in sorted(finished.items()):
+                    self.translations[index] = text
+                    f.write(json.dumps({"index": index, "text": text}, ensure_ascii=False) + "\n")
+
+    def progress(self):
+        """(translated, total) sentences"""
+        with self._lock:
+            done = sum(1 for t in self.translations if t is not None)
+        return done, len(self.translations)
+
+    def render(self, complete_only=True):
+        """Translated text. With complete_only, stop at the first sentence not yet translated
+        so the output reads in order; otherwise untranslated sentences keep the source text."""
+        with self._lock:
+            translations = list(self.translations)
+        out = [self.pieces[0]]
+        for i, translated in enumerate(translations):
+            if translated is None:
+                if complete_only:
+                    break
+                translated = self.sentences[i]
+            out.append(translated)
+            out.append(self.pieces[2 * i + 2])
+        return "".join(out)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, engine):
+        """Translate the remaining sentences on a background thread"""
+        if self.running:
+            return self
+        self._pause.clear()
+        self.errors = []
+        self.status = "running"
+        self.started_at = time.time()
+        self.finished_at = None
+        self._thread = threading.Thread(target=self._run, args=(engine,), name=f"translate-{self.job_id}",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def pause(self):
+        """Stop after the current window; start() later resumes"""
+        self._pause.set()
+
+    def _run(self, engine):
+        try:
+            pending = [i for i, t in enumerate(self.translations) if t is None]
+            for start in range(0, len(pending), WINDOW_SENTENCES):
+                if self._pause.is_set():
+                    self.status = "paused"
+                    return
+                window = pending[start:start + WINDOW_SENTENCES]
+                _, errors, _ = engine.translate_segments(
+                    [self.sentences[i] for i in window], self.source_language, self.target_language,
+                    on_segments=lambda finished: self._record({window[k]: t for k, t in finished.items()})
+                )
+                self.errors.extend(errors)
+
+            done, total = self.progress()
+            self.status = "done" if done == total else "incomplete"
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {str(e)}")
+            self.status = "failed"
+        finally:
+            self.finished_at = time.time()
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def submit_job(name, text, source_language, target_language, engine):
+    """Start (or resume) the job for this document - returns the TranslationJob"""
+    job_id = job_id_for(text, source_language, target_language)
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            job = TranslationJob.create(name, text, source_language, target_language)
+            _jobs[job_id] = job
+    return job.start(engine)
+
+
+def get_job(job_id):
+    """Job from this process, or loaded from disk if the app restarted since"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None and (JOBS_DIR / job_id / "job.json").exists():
+            job = TranslationJob.load(JOBS_DIR / job_id)
+            job.status = "paused" if job.progress()[0] < len(job.translations) else "done"
+            _jobs[job_id] = job
+        return job
+
+
+def list_jobs():
+    """Every job on disk as [(job_id, name, source_language, target_language)], newest first"""
+    jobs = []
+    if not JOBS_DIR.is_dir():
+        return jobs
+    for meta_path in JOBS_DIR.glob("*/job.json"):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        jobs.append((meta["created_at"], meta["job_id"], meta["name"], meta["source_language"],
+                     meta["target_language"]))
+    return [job[1:] for job in sorted(jobs, reverse=True)]
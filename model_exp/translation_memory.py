@@ -0,0 +1,177 @@
+"""
+Persistent translation memory keyed by sentence.
+
+Entries are keyed by (source_language, target_language, hash of the
+normalized source sentence) in SQLite. The translation engine consults the
+memory per segment before calling the API, so re-translating a revised
+circular only costs the sentences that changed.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from pathlib import Path
+
+DEFAULT_PATH = os.getenv(
+    "TRANSLATION_MEMORY_PATH",
+    str(Path(__file__).parent / "translation_memory.db")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory (
+    source_language TEXT NOT NULL,
+    target_language TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    source_text TEXT NOT NULL,
+    translated_text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    use_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (source_language, target_language, source_hash)
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def normalize_sentence(sentence):
+    """NFC, collapse whitespace - so re-flowed or re-typed sentences still match"""
+    return " ".join(unicodedata.normalize("NFC", sentence).split())
+
+
+def sentence_hash(sentence):
+    return hashlib.sha256(normalize_sentence(sentence).encode("utf-8")).hexdigest()
+
+
+class TranslationMemory:
+    """SQLite-backed sentence memory, safe to share between threads"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self.session = {"lookups": 0, "hits": 0}
+
+    def lookup_many(self, sentences, source_language, target_language):
+        """Return {index: translation} for the sentences already in memory"""
+        hashes = [sentence_hash(s) for s in sentences]
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                chunk = list(set(hashes[start:start + 500]))
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT source_hash, translated_text FROM memory "
+                    f"WHERE source_language = ? AND target_language = ? AND source_hash IN ({placeholders})",
+                    [source_language, target_language, *chunk]
+                ).fetchall()
+                found.update(rows)
+
+            hits = [(i, found[h]) for i, h in enumerate(hashes) if h in found]
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE memory SET use_count = use_count + 1, last_used_at = ? "
+                "WHERE source_language = ? AND target_language = ? AND source_hash = ?",
+                [(now, source_language, target_language, hashes[i]) for i, _ in hits]
+            )
+            self._bump("lookups", len(sentences))
+            self._bump("hits", len(hits))
+            self._conn.commit()
+            self.session["lookups"] += len(sentences)
+            self.session["hits"] += len(hits)
+        return dict(hits)
+
+    def store_many(self, pairs, source_language, target_language):
+        """Save (source_sentence, translation) pairs, replacing older translations"""
+        now = time.time()
+        rows = [
+            (source_language, target_language, sentence_hash(source), normalize_sentence(source),
+             translated, now, now)
+            for source, translated in pairs
+            if translated and translated.strip()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO memory (source_language, target_language, source_hash, source_text, "
+                "translated_text, created_at, last_used_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (source_language, target_language, source_hash) DO UPDATE SET "
+                "translated_text = excluded.translated_text, last_used_at = excluded.last_used_at",
+                rows
+            )
+            self._conn.commit()
+
+    def _bump(self, name, amount):
+        self._conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def stats(self):
+        """Entry count plus lifetime and session hit rates"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+        lookups = counters.get("lookups", 0)
+        hits = counters.get("hits", 0)
+        return {
+            "entries": entries,
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "session_hit_rate": self.session["hits"] / self.session["lookups"] if self.session["lookups"] else 0.0
+        }
+
+    def export_jsonl(self):
+        """Yield one JSON line per entry"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source_language, target_language, source_text, translated_text, use_count "
+                "FROM memory ORDER BY source_language, target_language, created_at"
+            ).fetchall()
+        for source_language, target_language, source_text, translated_text, use_count in rows:
+            yield json.dumps({
+                "source_language": source_language,
+                "target_language": target_language,
+                "source_text": source_text,
+                "translated_text": translated_text,
+                "use_count": use_count
+            }, ensure_ascii=False) + "\n"
+
+    def import_jsonl(self, lines):
+        """Load entries exported by export_jsonl - returns the number imported"""
+        grouped = {}
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            key = (entry["source_language"], entry["target_language"])
+            grouped.setdefault(key, []).append((entry["source_text"], entry["translated_text"]))
+
+        for (source_language, target_language), pairs in grouped.items():
+            self.store_many(pairs, source_language, target_language)
+        return sum(len(pairs) for pairs in grouped.values())
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_translation_memory():
+    """Process-wide translation memory at TRANSLATION_MEMORY_PATH"""
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = TranslationMemory()
+    return _memory
@@ -1,38 +1,25 @@
 import streamlit as st
-import requests
-import base64
-import io
 import os
 import json
-import hashlib
 import time
 import atexit
 from pathlib import Path
 from datetime import datetime
-from dotenv import load_dotenv
-from google import genai
-from google.oauth2 import service_account
-from google.genai.types import GenerateContentConfig
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
+from knowledge_base import get_knowledge_base
+from resources import load_config, ensure_directory, get_context, get_gemini_pool
+from pipeline import (
+    TTS_API_URL, STT_REPLICAS, TTS_REPLICAS, fix_bytecodes, split_text_into_chunks,
+    generate_and_parse_response, post_stt, process_tts_concurrent, tts_available, POLICIES, GEMINI_POLICY
+)
 
 # --- Configuration & Setup ---
 
-load_dotenv()
-
-# Constants
-NGROK_BASE_URL = os.getenv("NGROK_BASE_URL", "https://your-ngrok-url.ngrok-free.app")
-STT_API_URL = f"{NGROK_BASE_URL}/asr/transcribe"
-TTS_API_URL = f"{NGROK_BASE_URL}/tts/tts"
+load_config()
 
 # Get the directory where this script is located
 SCRIPT_DIR = Path(__file__).parent
 
 # Try relative paths, fallback to voicebot/ prefix if not found
-CONTEXT_FILE = SCRIPT_DIR / "data" / "master.json"
-if not CONTEXT_FILE.exists():
-    CONTEXT_FILE = SCRIPT_DIR / "voicebot" / "data" / "master.json"
-
 MESSAGES_FILE = SCRIPT_DIR / "data" / "messages.json"
 if not MESSAGES_FILE.parent.exists():
     MESSAGES_FILE = SCRIPT_DIR / "voicebot" / "data" / "messages.json"
@@ -43,222 +30,11 @@ if not AUDIO_STORAGE_DIR.exists():
     alt_audio_dir = SCRIPT_DIR / "voicebot" / "audio_cache"
     if alt_audio_dir.exists():
         AUDIO_STORAGE_DIR = alt_audio_dir
-AUDIO_STORAGE_DIR.mkdir(exist_ok=True, parents=True)
-
-# --- Gemini Client Setup ---
-
-SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
-
-if os.getenv("GCP_SA_JSON"):
-    sa_info = json.loads(os.getenv("GCP_SA_JSON"))
-    creds_1 = service_account.Credentials.from_service_account_info(sa_info, scopes=SCOPES)
-    creds_2 = service_account.Credentials.from_service_account_info(sa_info, scopes=SCOPES)
-
-elif os.getenv("GCP_SA_PATH"):
-    creds_1 = service_account.Credentials.from_service_account_file(
-        os.getenv("GCP_SA_PATH"), scopes=SCOPES
-    )
-    creds_2 = service_account.Credentials.from_service_account_file(
-        os.getenv("GCP_SA_PATH"), scopes=SCOPES
-    )
-
-else:
-    raise ValueError("Either GCP_SA_JSON or GCP_SA_PATH must be set")
-
-SA_CLIENTS = {
-    "SA_1": genai.Client(
-        vertexai=True,
-        project="certain-perigee-466307-q6",
-        location="us-central1",
-        credentials=creds_1
-    ),
-    "SA_2": genai.Client(
-        vertexai=True,
-        project="certain-perigee-466307-q6",
-        location="us-central1",
-        credentials=creds_2
-    ),
-}
-
-# Master Instructions
-MASTER_INSTRUCTIONS = """
-You are an AI assistant working for a Government of Karnataka department.
-
-You have been provided with official government documents, circulars, and policy texts as context.
-You MUST base your answers strictly and only on the given documents.
-Do NOT use outside knowledge or assumptions.
-
-LANGUAGE RULES:
-- Detect the language of the user input based on the script/characters used.
-- If the input uses English characters, respond in English.
-- If the input uses Devanagari script (Hindi), respond in Hindi.
-- Otherwise if input uses Kannada script, respond in Kannada.
-- The response language MUST match the input language exactly.
-- Do NOT mix languages in a single response.
-
-INPUT QUALITY NOTE:
-- User input may contain transcription errors, spelling mistakes, or malformed words due to speech-to-text.
-- Infer the intended meaning using context and language understanding.
-
-RESPONSE STYLE (VERY IMPORTANT):
-- Responses must be SHORT, clear, and precise.
-- Optimize responses to be spoken aloud as a voice message.
-- Avoid long explanations, legal-style wording, or unnecessary details.
-- Prefer concise sentences.
-- Do NOT include greetings, fillers, or meta commentary.
-
-OUTPUT FORMAT (MANDATORY):
-Your response MUST always be valid JSON in the following format:
-
-{
-  "answer": "<response in the detected language>",
-  "source_reference": "<brief document name or section reference>"
-}
-
-MISSING INFORMATION RULE:
-If the required information is NOT present in the provided documents, respond as follows
-(using the SAME language as the user input):
-
-{
-  "answer": "<equivalent of: 'This information is not available in the provided documents.'>",
-  "source_reference": "N/A"
-}
-"""
-
-
-# Bytecode to Kannada character mappings
-BYTECODE_MAP = {
-    '<0xE0><0xB2><0x94>': 'ಔ',
-    '<0xE0><0xB2><0x8A>': 'ಊ',
-    '<0xE0><0xB2><0x8E>': 'ಎ',
-    '<0xE0><0xB2><0x90>': 'ಐ',
-    '<0xE0><0xB2><0xA2>': 'ಢ',
-    '<0xE0><0xB2><0x9D>': 'ಝ',
-    '<0xE0><0xB2><0x8B>': 'ಋ',
-    '<0x2E>': '.',
-}
-
-# --- Helper Functions ---
-
-def fix_bytecodes(text):
-    """Replace bytecodes with proper Kannada characters"""
-    corrected = text
-    for bytecode, kannada_char in BYTECODE_MAP.items():
-        corrected = corrected.replace(bytecode, kannada_char)
-    return corrected
-
-def split_text_into_chunks(text, max_chars=100):
-    """Split text into chunks of approximately max_chars, splitting at sentence or word boundaries"""
-    if len(text) <= max_chars:
-        return [text]
-    
-    chunks = []
-    # Sentence delimiters for Kannada and English
-    sentence_delimiters = ['।', '.', '!', '?', '\n']
-    
-    current_chunk = ""
-    sentences = []
-    
-    # First, try to split by sentences
-    temp = text
-    for delimiter in sentence_delimiters:
-        temp = temp.replace(delimiter, delimiter + '<SPLIT>')
-    
-    parts = temp.split('<SPLIT>')
-    
-    for part in parts:
-        part = part.strip()
-        if not part:
-            continue
-            
-        # If adding this part would exceed max_chars, save current chunk and start new one
-        if current_chunk and len(current_chunk) + len(part) + 1 > max_chars:
-            chunks.append(current_chunk.strip())
-            current_chunk = part
-        else:
-            if current_chunk:
-                current_chunk += " " + part
-            else:
-                current_chunk = part
-        
-        # If current part itself is too long, split by words
-        if len(current_chunk) > max_chars:
-            words = current_chunk.split()
-            temp_chunk = ""
-            for word in words:
-                if len(temp_chunk) + len(word) + 1 <= max_chars:
-                    temp_chunk += (" " if temp_chunk else "") + word
-                else:
-                    if temp_chunk:
-                        chunks.append(temp_chunk.strip())
-                    temp_chunk = word
-            current_chunk = temp_chunk
-    
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-    
-    return chunks if chunks else [text]
-
-def stitch_audio_bytes(audio_chunks_list):
-    """Stitch multiple WAV audio byte arrays together by combining audio data and fixing header"""
-    if not audio_chunks_list:
-        return b''
-    if len(audio_chunks_list) == 1:
-        return audio_chunks_list[0]
-    
-    # Parse WAV header from first chunk to get format info
-    # WAV header structure: RIFF (4), filesize-8 (4), WAVE (4), fmt (4), fmt_size (4), format_data (16), data (4), data_size (4)
-    first_chunk = audio_chunks_list[0]
-    
-    # Extract header from first chunk (typically 44 bytes for standard WAV)
-    if len(first_chunk) < 44:
-        # If too short, just concatenate
-        return b''.join(audio_chunks_list)
-    
-    # Find the "data" chunk in the first WAV file
-    data_offset = first_chunk.find(b'data')
-    if data_offset == -1:
-        # No data chunk found, fallback to simple concat
-        return b''.join(audio_chunks_list)
-    
-    # The data chunk header is "data" (4 bytes) + size (4 bytes)
-    # Audio data starts after these 8 bytes
-    audio_data_start = data_offset + 8
-    
-    # Collect all audio data (skip headers from each chunk)
-    all_audio_data = []
-    for i, chunk in enumerate(audio_chunks_list):
-        if i == 0:
-            # For first chunk, include from audio_data_start
-            all_audio_data.append(chunk[audio_data_start:])
-        else:
-            # For subsequent chunks, find and skip their headers too
-            chunk_data_offset = chunk.find(b'data')
-            if chunk_data_offset != -1:
-                chunk_audio_start = chunk_data_offset + 8
-                all_audio_data.append(chunk[chunk_audio_start:])
-            else:
-                # If can't find data marker, skip first 44 bytes as fallback
-                all_audio_data.append(chunk[44:] if len(chunk) > 44 else chunk)
-    
-    # Combine all audio data
-    combined_audio_data = b''.join(all_audio_data)
-    
-    # Create new WAV file with corrected header
-    # Take header from first chunk up to the data size field
-    header = bytearray(first_chunk[:audio_data_start])
-    
-    # Update the data chunk size (4 bytes before audio data starts)
-    new_data_size = len(combined_audio_data)
-    header[audio_data_start - 4:audio_data_start] = new_data_size.to_bytes(4, 'little')
-    
-    # Update the file size in RIFF header (at bytes 4-8)
-    # RIFF chunk size = 4 (WAVE) + 8 (fmt) + 16 (fmt data) + 8 (data header) + data_size
-    new_file_size = 36 + new_data_size  # 36 = header size before data
-    header[4:8] = new_file_size.to_bytes(4, 'little')
-    
-    # Combine header and audio data
-    return bytes(header) + combined_audio_data
+ensure_directory(AUDIO_STORAGE_DIR)
+
+# Circuit breaker state -> sidebar icon
+BREAKER_ICONS = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}
+
 
 def load_messages_from_json():
     """Load message history from JSON file"""
@@ -299,16 +75,15 @@ def clear_all_messages():
         return False
 
 def load_context():
-    """Loads the knowledge base from JSON"""
+    """Returns the current knowledge base snapshot (hot-reloaded in the background), or None"""
     try:
-        with open(CONTEXT_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        st.error(f"Context file '{CONTEXT_FILE}' not found.")
-        return {}
+        return get_context()
+    except FileNotFoundError as e:
+        st.error(f"Context file '{e.filename}' not found.")
+        return None
     except Exception as e:
         st.error(f"Error loading context: {e}")
-        return {}
+        return None
 
 def save_audio_to_file(audio_bytes, message_id):
     """Save audio bytes to a file and return the file path"""
@@ -351,104 +126,6 @@ def cleanup_session_audio_files():
     
     st.session_state.session_audio_files = []
 
-def get_genai_client(sa_index: int = 1):
-    sa_key = "SA_1" if sa_index % 2 == 0 else "SA_2"
-    return SA_CLIENTS[sa_key]
-
-def generate_and_parse_response(genai_client, messages, metadata_string):
-    """Generate content from Gemini and parse Kannada JSON response"""
-    response = genai_client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=messages,
-        config=GenerateContentConfig(
-            system_instruction=f"{MASTER_INSTRUCTIONS}\n\n### Additional User Information: {metadata_string}.",
-            temperature=0.25,
-            response_mime_type="application/json",
-            thinking_config={"thinking_budget": 2048},
-        ),
-    )
-
-    if not response or not response.candidates:
-        return response, None
-
-    candidate = response.candidates[0]
-    if not candidate.content or not candidate.content.parts:
-        return response, None
-
-    raw_text = candidate.content.parts[0].text
-    if not raw_text:
-        return response, None
-
-    try:
-        data = json.loads(raw_text)
-        result = {
-            "answer": data.get("answer", ""),
-            "source_reference": data.get("source_reference", "N/A")
-        }
-        return response, result
-    except json.JSONDecodeError:
-        return response, {
-            "answer": raw_text,
-            "source_reference": "N/A"
-        }
-
-def process_tts_chunk(chunk_text, chunk_index, total_chunks):
-    """Process a single TTS chunk - returns (index, audio_bytes, sample_rate, error)"""
-    try:
-        tts_response = requests.post(
-            TTS_API_URL, 
-            json={"text": chunk_text}, 
-            timeout=60
-        )
-        
-        if tts_response.status_code == 200:
-            tts_result = tts_response.json()
-            audio_b64 = tts_result.get("audio_base64")
-            sample_rate = tts_result.get("sample_rate", 22050)
-            
-            if audio_b64:
-                audio_bytes = base64.b64decode(audio_b64)
-                return (chunk_index, audio_bytes, sample_rate, None)
-            else:
-                return (chunk_index, None, None, f"Missing audio_base64 in response")
-        else:
-            return (chunk_index, None, None, f"TTS API returned status {tts_response.status_code}")
-    except Exception as e:
-        return (chunk_index, None, None, f"{type(e).__name__}: {str(e)}")
-
-def process_tts_concurrent(text_chunks):
-    """Process multiple TTS chunks concurrently and return stitched audio"""
-    audio_results = [None] * len(text_chunks)
-    sample_rate = 22050
-    errors = []
-    
-    with ThreadPoolExecutor(max_workers=min(5, len(text_chunks))) as executor:
-        futures = {
-            executor.submit(process_tts_chunk, chunk, i, len(text_chunks)): i 
-            for i, chunk in enumerate(text_chunks)
-        }
-        
-        for future in as_completed(futures):
-            chunk_index, audio_bytes, chunk_sample_rate, error = future.result()
-            
-            if error:
-                errors.append(f"Chunk {chunk_index + 1}: {error}")
-            elif audio_bytes:
-                audio_results[chunk_index] = audio_bytes
-                if chunk_index == 0 and chunk_sample_rate:
-                    sample_rate = chunk_sample_rate
-    
-    # Filter out None values
-    audio_chunks = [chunk for chunk in audio_results if chunk is not None]
-    
-    if not audio_chunks:
-        return None, sample_rate, errors
-    
-    # Stitch audio chunks
-    final_audio = stitch_audio_bytes(audio_chunks)
-    
-    return final_audio, sample_rate, errors
-
 # --- Status Widget Component ---
 
 class StatusWidget:
@@ -492,13 +169,33 @@ def main():
         debug_mode = st.checkbox("🐛 Debug Mode", value=False)
         
         # Load Context
-        context_data = load_context()
-        context_str = json.dumps(context_data)
+        snapshot = load_context()
+        context_str = snapshot.context_str if snapshot else "[]"
         with st.expander("View Active Context"):
-            st.json(context_data)
+            if snapshot:
+                kb = get_knowledge_base()
+                st.caption(
+                    f"Version {snapshot.version} · {len(snapshot.documents)} documents · "
+                    f"loaded {datetime.fromtimestamp(snapshot.loaded_at).strftime('%H:%M:%S')}"
+                    + (" · 🔄 reloading" if kb.reloading else "")
+                )
+                if kb.last_error:
+                    st.warning(f"Last reload failed: {kb.last_error}")
+                st.json(snapshot.summary)
         
         st.divider()
         
+        # Backend circuit breakers
+        with st.expander("🩺 Backend Status"):
+            for name, policy in {"stt": POLICIES["stt"], "tts": POLICIES["tts"], "gemini": GEMINI_POLICY}.items():
+                breaker = policy.breaker.stats()
+                icon = BREAKER_ICONS[breaker["state"]]
+                detail = (f"retry in {breaker['retry_in_s']:.0f}s" if breaker["state"] == "open"
+                          else f"{breaker['failure_rate']:.0%} failing")
+                st.caption(f"{icon} **{name.upper()}** {breaker['state'].replace('_', '-')} · {detail}")
+        if not tts_available():
+            st.warning("🔇 Speech service unavailable - answers are text-only for now")
+        
         # Clear chat button
         if st.button("🗑️ Clear Chat History", type="secondary", use_container_width=True):
             if clear_all_messages():
@@ -511,6 +208,11 @@ def main():
             st.divider()
             st.subheader("🔍 Debug Info")
             st.write(f"**TTS API:** `{TTS_API_URL}`")
+            st.write("**STT / TTS replicas:**")
+            st.dataframe([{"service": pool.name, **replica} for pool in (STT_REPLICAS, TTS_REPLICAS)
+                          for replica in pool.stats()], hide_index=True)
+            st.write("**Gemini accounts:**")
+            st.dataframe(get_gemini_pool().stats(), hide_index=True)
             st.write(f"**Messages file:** `{MESSAGES_FILE}`")
             st.write(f"**Audio dir:** `{AUDIO_STORAGE_DIR}`")
             
@@ -549,6 +251,8 @@ def main():
                         st.audio(audio_path)
                 else:
                     st.caption("_Audio file not found_")
+            elif msg["role"] == "assistant" and msg.get("text_only"):
+                st.caption("🔇 _Text-only answer: the speech service was unavailable_")
             
             # Show TTS debug info in debug mode
             if debug_mode and msg["role"] == "assistant" and msg.get("tts_debug"):
@@ -603,17 +307,8 @@ def main():
             transcribed_text = ""
             
             try:
-                files = {
-                    'file': (
-                        'recording.wav',
-                        io.BytesIO(st.session_state.temp_audio),
-                        'audio/wav'
-                    )
-                }
                 # Use kannada as default language
-                data = {'language': 'kannada'}
-                
-                stt_response = requests.post(STT_API_URL, files=files, data=data, timeout=60)
+                stt_response = post_stt(st.session_state.temp_audio, 'recording.wav', language='kannada')
                 
                 if stt_response.status_code == 200:
                     result = stt_response.json()
@@ -664,10 +359,7 @@ def main():
                 role = "user" if msg["role"] == "user" else "model"
                 gemini_history.append({"role": role, "parts": [{"text": msg["content"]}]})
             
-            client = get_genai_client(sa_index=1)
-            
             raw_response, response_json = generate_and_parse_response(
-                client, 
                 gemini_history, 
                 context_str
             )
@@ -684,8 +376,12 @@ def main():
             else:
                 final_response_text = "Sorry, I couldn't generate a valid response."
 
-            # 3. TTS - Generate audio
-            status.update("Generating audio response...", "🔊")
+            # 3. TTS - Generate audio (skipped while the TTS breaker is open)
+            text_only = not tts_available()
+            if text_only:
+                status.update("Speech is unavailable right now - answering in text", "🔇")
+            else:
+                status.update("Generating audio response...", "🔊")
             final_response_text = fix_bytecodes(final_response_text) 
 
             audio_filepath = None
@@ -750,7 +446,8 @@ def main():
                 "role": "assistant",
                 "content": final_response_text,
                 "timestamp": datetime.now().isoformat(),
-                "tts_debug": tts_metadata  # Store all TTS debug info
+                "tts_debug": tts_metadata,  # Store all TTS debug info
+                "text_only": text_only
             }
             
             if audio_filepath and os.path.exists(audio_filepath):
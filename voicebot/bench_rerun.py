@@ -0,0 +1,96 @@
+"""
+Rerun-latency benchmark for the voicebot's per-rerun setup work.
+
+"before" repeats what every Streamlit rerun used to do at the top of app.py:
+load .env, parse the service account twice, build two Gemini clients, mkdir
+the audio directory and reload + re-serialize master.json. "after" makes the
+same requests through the resource registry.
+
+    python bench_rerun.py --runs 50
+
+Needs GCP_SA_JSON or GCP_SA_PATH (no network calls are made).
+"""
+
+import os
+import json
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+MASTER_FILE = SCRIPT_DIR / "data" / "master.json"
+AUDIO_STORAGE_DIR = SCRIPT_DIR / "audio_cache"
+
+
+def rerun_before():
+    from dotenv import load_dotenv
+    from google import genai
+    from google.oauth2 import service_account
+    from resources import SCOPES, GCP_PROJECT, GCP_LOCATION
+
+    load_dotenv()
+    if os.getenv("GCP_SA_JSON"):
+        sa_info = json.loads(os.getenv("GCP_SA_JSON"))
+        creds_1 = service_account.Credentials.from_service_account_info(sa_info, scopes=SCOPES)
+        creds_2 = service_account.Credentials.from_service_account_info(sa_info, scopes=SCOPES)
+    else:
+        creds_1 = service_account.Credentials.from_service_account_file(os.getenv("GCP_SA_PATH"), scopes=SCOPES)
+        creds_2 = service_account.Credentials.from_service_account_file(os.getenv("GCP_SA_PATH"), scopes=SCOPES)
+    {
+        "SA_1": genai.Client(vertexai=True, project=GCP_PROJECT, location=GCP_LOCATION, credentials=creds_1),
+        "SA_2": genai.Client(vertexai=True, project=GCP_PROJECT, location=GCP_LOCATION, credentials=creds_2),
+    }
+    AUDIO_STORAGE_DIR.mkdir(exist_ok=True, parents=True)
+    with open(MASTER_FILE, 'r', encoding='utf-8') as f:
+        json.dumps(json.load(f))
+
+
+def rerun_after():
+    from resources import load_config, get_gemini_pool, ensure_directory, get_context
+
+    load_config()
+    get_gemini_pool()
+    ensure_directory(AUDIO_STORAGE_DIR)
+    get_context().context_str
+
+
+def measure(fn, runs):
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "first_ms": first * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[int(len(timings) * 0.95) - 1] * 1000,
+        "mean_ms": statistics.mean(timings) * 1000
+    }
+
+
+def main(runs):
+    results = {"before": measure(rerun_before, runs), "after": measure(rerun_after, runs)}
+
+    print(f"{'':8} {'first':>10} {'median':>10} {'p95':>10} {'mean':>10}   (ms, {runs} reruns)")
+    for name, stats in results.items():
+        print(f"{name:8} {stats['first_ms']:10.2f} {stats['median_ms']:10.2f} "
+              f"{stats['p95_ms']:10.2f} {stats['mean_ms']:10.2f}")
+    speedup = results["before"]["median_ms"] / max(results["after"]["median_ms"], 1e-6)
+    print(f"\nMedian rerun setup: {speedup:.0f}x faster")
+
+    from knowledge_base import get_knowledge_base
+    get_knowledge_base().stop()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-rerun setup cost before and after the resource registry")
+    parser.add_argument("--runs", type=int, default=50, help="Reruns to time after the first")
+    args = parser.parse_args()
+    main(args.runs)
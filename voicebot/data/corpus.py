@@ -0,0 +1,131 @@
+"""
+Page-level JSONL corpus for the voicebot knowledge base.
+
+corpus.jsonl holds one record per page: {"filename", "page", "text"}, grouped
+by document. corpus.index.json lists every document with the byte offset and
+length of its records, so a single document can be read without scanning the
+whole corpus.
+"""
+
+import os
+import json
+import filecmp
+from pathlib import Path
+
+
+def index_path_for(corpus_path):
+    """corpus.jsonl -> corpus.index.json"""
+    corpus_path = Path(corpus_path)
+    return corpus_path.with_name(corpus_path.stem + ".index.json")
+
+
+def replace_if_changed(temp_path, dest_path):
+    """Move temp_path over dest_path unless the contents are identical - returns True if replaced"""
+    if os.path.exists(dest_path) and filecmp.cmp(temp_path, dest_path, shallow=False):
+        os.remove(temp_path)
+        return False
+    os.replace(temp_path, dest_path)
+    return True
+
+
+def write_page_records(pages_path, filename, pages):
+    """Stream one JSONL record per non-empty page to pages_path - returns True if the file changed"""
+    temp_file = str(pages_path) + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        for page_number, text in enumerate(pages, start=1):
+            if text and text.strip():
+                record = {"filename": filename, "page": page_number, "text": text}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return replace_if_changed(temp_file, pages_path)
+
+
+class CorpusWriter:
+    """Assemble corpus.jsonl and its index from per-document page files, one line at a time"""
+
+    def __init__(self, corpus_path):
+        self.corpus_path = Path(corpus_path)
+        self.index_path = index_path_for(self.corpus_path)
+        self.documents = []
+        self.changed = False
+        self._temp_file = str(self.corpus_path) + ".tmp"
+        self._file = None
+
+    def __enter__(self):
+        self.corpus_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self._temp_file, 'wb')
+        return self
+
+    def append_document(self, filename, filepath, pages_path):
+        """Copy a document's page records into the corpus and record where they landed"""
+        offset = self._file.tell()
+        pages = 0
+        with open(pages_path, 'rb') as f:
+            for line in f:
+                self._file.write(line)
+                pages += 1
+        self.documents.append({
+            "filename": filename,
+            "filepath": filepath,
+            "offset": offset,
+            "length": self._file.tell() - offset,
+            "pages": pages
+        })
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        if exc_type is not None:
+            os.remove(self._temp_file)
+            return False
+
+        corpus_changed = replace_if_changed(self._temp_file, self.corpus_path)
+        temp_index = str(self.index_path) + ".tmp"
+        with open(temp_index, 'w', encoding='utf-8') as f:
+            json.dump({"documents": self.documents}, f, indent=2, ensure_ascii=False)
+        index_changed = replace_if_changed(temp_index, self.index_path)
+        self.changed = corpus_changed or index_changed
+        return False
+
+
+class CorpusReader:
+    """Lazy reader over corpus.jsonl - nothing is loaded until a document is requested"""
+
+    def __init__(self, corpus_path):
+        self.corpus_path = Path(corpus_path)
+        self.index_path = index_path_for(self.corpus_path)
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            self.documents = json.load(f)["documents"]
+        self._by_name = {doc["filename"]: doc for doc in self.documents}
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __contains__(self, filename):
+        return filename in self._by_name
+
+    def filenames(self):
+        return [doc["filename"] for doc in self.documents]
+
+    def iter_pages(self, filename=None):
+        """Yield page records for one document (seeking straight to it) or for the whole corpus"""
+        with open(self.corpus_path, 'rb') as f:
+            if filename is None:
+                for line in f:
+                    yield json.loads(line)
+                return
+
+            doc = self._by_name[filename]
+            f.seek(doc["offset"])
+            end = doc["offset"] + doc["length"]
+            while f.tell() < end:
+                yield json.loads(f.readline())
+
+    def get_document(self, filename):
+        """Return {"filename", "filepath", "content"} for one document"""
+        doc = self._by_name[filename]
+        content = "\n".join(record["text"] for record in self.iter_pages(filename))
+        return {"filename": doc["filename"], "filepath": doc["filepath"], "content": content}
+
+    def iter_documents(self):
+        """Yield documents one at a time in corpus order"""
+        for doc in self.documents:
+            yield self.get_document(doc["filename"])
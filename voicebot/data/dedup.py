@@ -0,0 +1,195 @@
+"""
+Near-duplicate passage detection for the page corpus.
+
+Pages are split into passages, each passage gets a MinHash signature over
+word shingles, and LSH banding finds candidate pairs. Every passage that is
+a near-duplicate of an earlier one is linked to that canonical passage in
+corpus.dedup.json, so the prompt carries each piece of content once.
+"""
+
+import re
+import json
+import zlib
+import hashlib
+import numpy as np
+from pathlib import Path
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+# Estimated Jaccard similarity above which a passage counts as a duplicate
+SIMILARITY_THRESHOLD = 0.8
+
+MIN_PASSAGE_CHARS = 200
+MAX_PASSAGE_CHARS = 1200
+
+_PRIME = (1 << 61) - 1
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+
+_WORD = re.compile(r"\w+")
+
+
+def dedup_path_for(corpus_path):
+    """corpus.jsonl -> corpus.dedup.json"""
+    corpus_path = Path(corpus_path)
+    return corpus_path.with_name(corpus_path.stem + ".dedup.json")
+
+
+def corpus_sha256(corpus_path):
+    """Hash of corpus.jsonl - ties a dedup index to the corpus it was built from"""
+    digest = hashlib.sha256()
+    with open(corpus_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def split_passages(text):
+    """Split page text into passages of roughly MIN..MAX chars along paragraph and line breaks"""
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        while len(paragraph) > MAX_PASSAGE_CHARS:
+            cut = paragraph.rfind("\n", 0, MAX_PASSAGE_CHARS)
+            if cut < MIN_PASSAGE_CHARS:
+                cut = paragraph.rfind(" ", 0, MAX_PASSAGE_CHARS)
+            if cut < MIN_PASSAGE_CHARS:
+                cut = MAX_PASSAGE_CHARS
+            pieces.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            pieces.append(paragraph)
+
+    passages = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) >= MIN_PASSAGE_CHARS:
+            passages.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        passages.append(current)
+    return passages
+
+
+def passage_id(filename, page, index):
+    return f"{filename}|{page}|{index}"
+
+
+def minhash_signature(text):
+    """MinHash signature (NUM_PERM uint64 values) over word shingles"""
+    words = _WORD.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) & 0x7FFFFFFF for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _PRIME
+    return permuted.min(axis=0)
+
+
+def build_dedup_index(reader):
+    """Find near-duplicate passages across a CorpusReader - returns the index dict.
+
+    Passages are visited in corpus order; the first of a group of duplicates is canonical.
+    Only canonical passages are added to the LSH buckets, so chains always resolve to
+    the first occurrence.
+    """
+    buckets = [dict() for _ in range(BANDS)]
+    signatures = {}
+    duplicates = {}
+    passage_count = 0
+    chars_saved = 0
+
+    for record in reader.iter_pages():
+        for index, passage in enumerate(split_passages(record["text"])):
+            passage_count += 1
+            pid = passage_id(record["filename"], record["page"], index)
+            signature = minhash_signature(passage)
+            band_keys = [signature[b * ROWS:(b + 1) * ROWS].tobytes() for b in range(BANDS)]
+
+            canonical = None
+            seen = set()
+            for band, key in enumerate(band_keys):
+                for candidate in buckets[band].get(key, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    if np.mean(signatures[candidate] == signature) >= SIMILARITY_THRESHOLD:
+                        canonical = candidate
+                        break
+                if canonical:
+                    break
+
+            if canonical:
+                duplicates[pid] = canonical
+                chars_saved += len(passage)
+                continue
+
+            signatures[pid] = signature
+            for band, key in enumerate(band_keys):
+                buckets[band].setdefault(key, []).append(pid)
+
+    return {
+        "passages": passage_count,
+        "duplicates": duplicates,
+        "chars_saved": chars_saved
+    }
+
+
+def write_dedup_index(corpus_path, reader):
+    """Build and save corpus.dedup.json - returns the index"""
+    index = {"corpus_sha256": corpus_sha256(corpus_path), **build_dedup_index(reader)}
+    path = dedup_path_for(corpus_path)
+    temp_file = str(path) + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    Path(temp_file).replace(path)
+    return index
+
+
+def load_dedup_index(corpus_path):
+    """Load corpus.dedup.json, or None if it has not been built or is stale.
+
+    Passage IDs are positions (filename|page|index), so an index built from
+    another version of the corpus would drop the wrong passages.
+    """
+    try:
+        with open(dedup_path_for(corpus_path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return None
+    if index.get("corpus_sha256") != corpus_sha256(corpus_path):
+        return None
+    return index
+
+
+def iter_unique_documents(reader, dedup_index):
+    """Yield documents like CorpusReader.iter_documents, with duplicate passages left out"""
+    duplicates = dedup_index["duplicates"] if dedup_index else {}
+    for doc in reader.documents:
+        passages = []
+        dropped = 0
+        for record in reader.iter_pages(doc["filename"]):
+            for index, passage in enumerate(split_passages(record["text"])):
+                if passage_id(record["filename"], record["page"], index) in duplicates:
+                    dropped += 1
+                else:
+                    passages.append(passage)
+        if not passages:
+            continue
+        yield {
+            "filename": doc["filename"],
+            "filepath": doc["filepath"],
+            "content": "\n\n".join(passages),
+            "duplicate_passages": dropped
+        }
@@ -0,0 +1,110 @@
+"""
+Text normalization for extracted PDF pages.
+
+Removes layout noise before it reaches the Gemini prompt: runs of blank
+lines, repeated page headers/footers, "| P a g e" markers, spaced-out
+letters, hyphenated words split across lines and sentences broken at
+line ends.
+"""
+
+import re
+from collections import Counter
+
+# Bump when the rules below change, so pdf_to_json re-extracts every PDF
+NORMALIZE_VERSION = 2
+
+# Header/footer lines must repeat on at least this share of pages to be stripped
+REPEATED_LINE_RATIO = 0.5
+REPEATED_LINE_MIN_PAGES = 3
+# Lines checked at the top and bottom of each page
+EDGE_LINES = 2
+
+# "166 | P a g e" page markers left by the source documents' footers
+_PAGE_MARK = r"\d*[ \t]*\|?[ \t]*P[ \t]a[ \t]g[ \t]e[ \t]*\d*"
+
+# "(a)", "(iv)", "1)" starting a line open a new clause, not a continuation
+_ENUMERATOR = r"\(?\w{1,4}\)(?!\S)"
+
+# One pattern, one pass. Alternatives are tried left to right at each position;
+# runs of blank lines absorb any page markers inside them so they collapse to one break.
+_NOISE = re.compile(
+    rf"""
+    (?P<lead>\A[ \t\n]*(?:{_PAGE_MARK}[ \t]*(?:\n[ \t]*)*)?(?=\S))
+    | (?P<hyphen>(?<=[A-Za-z])-[ \t]*\n[ \t]*(?=[a-z]))
+    | (?P<blank>[ \t]*\n(?:[ \t]*(?:{_PAGE_MARK}[ \t]*)?\n)+[ \t]*)
+    | (?P<broken>(?<=[^\s.:;!?।])[ \t]*\n[ \t]*(?=[a-z(])(?!{_ENUMERATOR}))
+    | (?P<edge>[ \t]+\n[ \t]*|\n[ \t]+)
+    | (?P<spaced>(?<![A-Za-z])(?:[A-Za-z][ ]){{3,}}[A-Za-z](?![A-Za-z]))
+    | (?P<spaces>[ \t\u00a0]{{2,}})
+    """,
+    re.VERBOSE,
+)
+
+_DIGITS = re.compile(r"\d+")
+
+
+def _replace(match):
+    kind = match.lastgroup
+    if kind == "lead" or kind == "hyphen":
+        return ""
+    if kind == "blank":
+        return "\n\n"
+    if kind == "broken" or kind == "spaces":
+        return " "
+    if kind == "edge":
+        return "\n"
+    # spaced-out letters: "P R O C E E D I N G S" -> "PROCEEDINGS"
+    return match.group().replace(" ", "")
+
+
+def estimate_tokens(text):
+    """Rough token estimate: ~4 chars per token for ASCII, ~2 for Indic scripts"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) // 2
+
+
+def _line_key(line):
+    # Page numbers change from page to page, so compare lines with digits masked
+    return _DIGITS.sub("#", " ".join(line.split()))
+
+
+def find_repeated_lines(pages):
+    """Return the normalized keys of lines that repeat at the top or bottom of most pages"""
+    if len(pages) < REPEATED_LINE_MIN_PAGES:
+        return set()
+
+    counts = Counter()
+    for text in pages:
+        lines = [line for line in text.splitlines() if line.strip()]
+        if len(lines) <= 2 * EDGE_LINES:
+            # Short pages are all edge, counting them would flag body text
+            continue
+        edges = set(lines[:EDGE_LINES] + lines[-EDGE_LINES:])
+        counts.update({_line_key(line) for line in edges})
+
+    threshold = max(REPEATED_LINE_MIN_PAGES, len(pages) * REPEATED_LINE_RATIO)
+    return {key for key, count in counts.items() if count >= threshold and key}
+
+
+def normalize_text(text, repeated_lines=frozenset()):
+    """Clean one page of text in a single regex pass after dropping repeated header/footer lines"""
+    if repeated_lines:
+        text = "\n".join(line for line in text.split("\n") if _line_key(line) not in repeated_lines)
+    return _NOISE.sub(_replace, text).strip()
+
+
+def normalize_pages(pages):
+    """Normalize every page of a document - returns (pages, stats)"""
+    repeated_lines = find_repeated_lines(pages)
+    cleaned = [normalize_text(text, repeated_lines) for text in pages]
+
+    before = "\n".join(pages)
+    after = "\n".join(cleaned)
+    stats = {
+        "chars_before": len(before),
+        "chars_after": len(after),
+        "tokens_before": estimate_tokens(before),
+        "tokens_after": estimate_tokens(after),
+        "repeated_lines": len(repeated_lines)
+    }
+    return cleaned, stats
@@ -1,83 +1,448 @@
 #python pdf_to_json.py /Users/chaitanyakartik/Projects/TTS/prototype/voicebot/data/pdfs /Users/chaitanyakartik/Projects/TTS/prototype/voicebot/data/master.json
 
 import os
+import io
 import json
+import base64
+import hashlib
 import argparse
+import textwrap
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from dotenv import load_dotenv
 from pypdf import PdfReader
+from corpus import CorpusWriter, CorpusReader, write_page_records, replace_if_changed
+from dedup import write_dedup_index, load_dedup_index, dedup_path_for
+from normalize import normalize_pages, NORMALIZE_VERSION
 
-def extract_text_from_pdf(pdf_path):
-    """Extracts text from a single PDF file."""
+load_dotenv()
+
+# Pages with less extracted text than this are treated as scanned and sent to OCR
+MIN_PAGE_CHARS = 25
+OCR_DPI = 200
+OCR_WORKERS = 4
+
+# Per-PDF hash and mtime from the last build, used to skip unchanged files
+MANIFEST_NAME = ".manifest.json"
+
+# Tesseract language packs used by the offline OCR stand-in
+TESSERACT_LANGUAGES = {
+    "kannada": "kan+eng",
+    "hindi": "hin+eng",
+    "english": "eng"
+}
+
+
+def rasterize_pages(pdf_path, page_indices, dpi=OCR_DPI):
+    """Render the given pages to PNG bytes - returns {page_index: bytes or None}.
+
+    Uses pypdfium2 when installed. Otherwise falls back to the largest embedded
+    image on each page, which is the whole page for scanned documents.
+    """
+    images = {}
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        pdfium = None
+
+    if pdfium is not None:
+        pdf = pdfium.PdfDocument(str(pdf_path))
+        try:
+            for index in page_indices:
+                buffer = io.BytesIO()
+                pdf[index].render(scale=dpi / 72).to_pil().save(buffer, format="PNG")
+                images[index] = buffer.getvalue()
+        finally:
+            pdf.close()
+        return images
+
+    reader = PdfReader(pdf_path)
+    for index in page_indices:
+        try:
+            embedded = list(reader.pages[index].images)
+        except Exception:
+            embedded = []
+        images[index] = max(embedded, key=lambda img: len(img.data)).data if embedded else None
+    return images
+
+
+class PageOCR:
+    """OCR for scanned pages with a per-page-hash cache.
+
+    backend is "remote" (the /ocr/infer endpoint behind NGROK_BASE_URL) or
+    "local" (pytesseract, works offline).
+    """
+
+    def __init__(self, backend, language="kannada", workers=OCR_WORKERS, cache_dir=None):
+        self.backend = backend
+        self.language = language
+        self.workers = workers
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.api_url = f"{os.getenv('NGROK_BASE_URL', '')}/ocr/infer"
+        self.stats = {"pages": 0, "cache_hits": 0, "errors": 0}
+        self._lock = threading.Lock()
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _cache_path(self, image_bytes):
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return self.cache_dir / f"{self.backend}_{self.language}_{digest}.txt"
+
+    def _ocr_remote(self, image_bytes):
+        import requests
+        payload = {
+            "image_b64": base64.b64encode(image_bytes).decode('utf-8'),
+            "prompt": "<image>",
+            "language": self.language,
+            "temperature": 0.0,
+            "max_tokens": 8192
+        }
+        response = requests.post(self.api_url, json=payload, timeout=120)
+        response.raise_for_status()
+        result = response.json()
+        if not result.get('success'):
+            raise RuntimeError(result.get('error', 'Unknown error'))
+        return result.get('text', '')
+
+    def _ocr_local(self, image_bytes):
+        import pytesseract
+        from PIL import Image
+        lang = TESSERACT_LANGUAGES.get(self.language, "eng")
+        return pytesseract.image_to_string(Image.open(io.BytesIO(image_bytes)), lang=lang)
+
+    def ocr_page(self, image_bytes):
+        """OCR a single page image, consulting the cache first"""
+        cache_path = self._cache_path(image_bytes) if self.cache_dir else None
+        if cache_path and cache_path.exists():
+            with self._lock:
+                self.stats["cache_hits"] += 1
+            return cache_path.read_text(encoding='utf-8')
+
+        if self.backend == "remote":
+            text = self._ocr_remote(image_bytes)
+        else:
+            text = self._ocr_local(image_bytes)
+        text = text.strip()
+
+        with self._lock:
+            self.stats["pages"] += 1
+        if cache_path:
+            temp_file = cache_path.with_suffix(".tmp")
+            temp_file.write_text(text, encoding='utf-8')
+            os.replace(temp_file, cache_path)
+        return text
+
+    def ocr_images(self, images):
+        """OCR {page_index: image_bytes} in a worker pool - returns {page_index: text}"""
+        def run(item):
+            index, image_bytes = item
+            if image_bytes is None:
+                return index, ""
+            try:
+                return index, self.ocr_page(image_bytes)
+            except Exception as e:
+                with self._lock:
+                    self.stats["errors"] += 1
+                print(f"  OCR failed for page {index + 1}: {type(e).__name__}: {e}")
+                return index, ""
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return dict(executor.map(run, images.items()))
+
+
+def resolve_ocr_backend(choice):
+    """Pick an OCR backend for --ocr auto: remote if an endpoint is configured, else local tesseract"""
+    if choice != "auto":
+        return None if choice == "none" else choice
+    if os.getenv("NGROK_BASE_URL"):
+        return "remote"
+    try:
+        import pytesseract  # noqa: F401
+        return "local"
+    except ImportError:
+        return None
+
+
+def extract_pages_from_pdf(pdf_path, page_ocr=None, min_chars=MIN_PAGE_CHARS):
+    """Extracts the text of each page of a PDF, OCRing pages that have no text layer."""
     try:
         reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
+        pages = [page.extract_text() or "" for page in reader.pages]
+
+        if page_ocr is not None:
+            scanned = [i for i, text in enumerate(pages) if len(text.strip()) < min_chars]
+            if scanned:
+                print(f"  OCR for {len(scanned)}/{len(pages)} low-text pages")
+                images = rasterize_pages(pdf_path, scanned)
+                for index, text in page_ocr.ocr_images(images).items():
+                    if len(text.strip()) > len(pages[index].strip()):
+                        pages[index] = text
+
+        return pages
     except Exception as e:
         print(f"Error reading {pdf_path}: {e}")
         return None
 
-def main(input_folder, output_json_path):
+def extract_text_from_pdf(pdf_path, page_ocr=None, min_chars=MIN_PAGE_CHARS):
+    """Extracts text from a single PDF file."""
+    pages = extract_pages_from_pdf(pdf_path, page_ocr, min_chars)
+    return "\n".join(pages).strip() if pages is not None else None
+
+def extract_pdf_job(pdf_path, json_path, pages_path, ocr_config=None, normalize=True, min_chars=MIN_PAGE_CHARS):
+    """Worker entry point: extract one PDF in a child process and write its outputs.
+
+    Writes the per-page JSONL records and the per-file JSON directly, so document
+    text never travels back to the parent process.
+    Returns (ok, json_written, ocr_stats, normalize_stats).
+    """
+    page_ocr = PageOCR(**ocr_config) if ocr_config else None
+    pages = extract_pages_from_pdf(pdf_path, page_ocr, min_chars)
+    stats = page_ocr.stats if page_ocr else None
+    if pages is None:
+        return False, False, stats, None
+
+    filename = Path(pdf_path).name
+    norm_stats = None
+    if normalize:
+        pages, norm_stats = normalize_pages(pages)
+        saved = norm_stats["chars_before"] - norm_stats["chars_after"]
+        print(f"  Normalized {filename}: {norm_stats['chars_before']:,} -> {norm_stats['chars_after']:,} chars "
+              f"({saved:,} saved, ~{norm_stats['tokens_before'] - norm_stats['tokens_after']:,} tokens)")
+
+    write_page_records(pages_path, filename, pages)
+    file_data = {
+        "filename": filename,
+        "filepath": str(Path(pdf_path).absolute()),
+        "content": "\n".join(pages).strip()
+    }
+    return True, write_json_if_changed(json_path, file_data), stats, norm_stats
+
+
+def file_sha256(path):
+    """Hash a file in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_json_if_changed(path, data):
+    """Write JSON atomically, skipping the write when the file already has this content - returns True if written"""
+    serialized = json.dumps(data, indent=4, ensure_ascii=False)
+    path = Path(path)
+    if path.exists() and path.read_text(encoding='utf-8') == serialized:
+        return False
+    temp_file = str(path) + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.write(serialized)
+    os.replace(temp_file, path)
+    return True
+
+
+def write_master_json(output_path, json_paths):
+    """Stream per-file JSONs into the master JSON array one document at a time - returns True if it changed.
+
+    Produces the same text as json.dump(all_data, f, indent=4, ensure_ascii=False).
+    """
+    temp_file = str(output_path) + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as out:
+        out.write("[")
+        for i, json_path in enumerate(json_paths):
+            with open(json_path, 'r', encoding='utf-8') as f:
+                file_data = json.load(f)
+            out.write(",\n" if i else "\n")
+            out.write(textwrap.indent(json.dumps(file_data, indent=4, ensure_ascii=False), "    "))
+        out.write("\n]" if json_paths else "]")
+    return replace_if_changed(temp_file, output_path)
+
+
+def extraction_settings(normalize, ocr_config=None):
+    """Manifest fields for the settings that shape the extracted text"""
+    return {
+        "normalize": normalize,
+        "normalize_version": NORMALIZE_VERSION if normalize else None,
+        "ocr_backend": ocr_config["backend"] if ocr_config else None,
+        "ocr_language": ocr_config["language"] if ocr_config else None
+    }
+
+
+def find_stale_pdfs(files, manifest, individual_json_dir, pages_dir, normalize=True, ocr_config=None):
+    """Return the PDFs whose content or extraction settings changed since the last build,
+    or whose last extraction had OCR failures, refreshing mtimes of touched-but-identical files"""
+    settings = extraction_settings(normalize, ocr_config)
+    stale = []
+    for pdf_file in files:
+        stat = pdf_file.stat()
+        entry = manifest.get(pdf_file.name)
+        reusable = (
+            entry is not None
+            and all(entry.get(key) == value for key, value in settings.items())
+            and not entry.get("ocr_errors")
+            and (individual_json_dir / (pdf_file.stem + ".json")).exists()
+            and (pages_dir / (pdf_file.stem + ".jsonl")).exists()
+        )
+
+        if reusable and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            continue
+
+        sha256 = file_sha256(pdf_file)
+        if reusable and entry["sha256"] == sha256:
+            entry.update(mtime=stat.st_mtime, size=stat.st_size)
+            continue
+
+        stale.append((pdf_file, {"sha256": sha256, "mtime": stat.st_mtime, "size": stat.st_size, **settings}))
+    return stale
+
+
+def main(input_folder, output_json_path, ocr="auto", ocr_language="kannada", ocr_workers=OCR_WORKERS,
+         workers=None, force=False, corpus_path=None, normalize=True, dedup=True):
     input_path = Path(input_folder)
     output_path = Path(output_json_path)
-    
-    # 1. create the individual json_data folder
+    corpus_path = Path(corpus_path) if corpus_path else output_path.with_name("corpus.jsonl")
+
+    # 1. create the individual json_data folder and the per-document page records folder
     individual_json_dir = input_path / "json_data"
     individual_json_dir.mkdir(exist_ok=True)
+    pages_dir = input_path / "page_data"
+    pages_dir.mkdir(exist_ok=True)
+    manifest_path = input_path / MANIFEST_NAME
+    manifest = {} if force else load_manifest(manifest_path)
 
-    all_data = []
+    backend = resolve_ocr_backend(ocr)
+    ocr_config = None
+    if backend:
+        ocr_config = {
+            "backend": backend,
+            "language": ocr_language,
+            "workers": ocr_workers,
+            "cache_dir": str(input_path / ".ocr_cache")
+        }
+        print(f"OCR fallback: {backend} ({ocr_language})")
+    else:
+        print("OCR fallback: disabled")
 
-    # 2. Iterate through all files in the folder
+    # 2. Find PDFs that are new or changed since the last build
     print(f"Scanning folder: {input_path}...")
-    
-    files = list(input_path.glob("*.pdf"))
-    if not files:
+
+    files = sorted(input_path.glob("*.pdf"))
+    if not files and not manifest:
         print("No PDF files found in the input folder.")
         return
 
-    for pdf_file in files:
-        print(f"Processing: {pdf_file.name}")
-        
-        # Extract text
-        content = extract_text_from_pdf(pdf_file)
-        
-        if content is not None:
-            file_data = {
-                "filename": pdf_file.name,
-                "filepath": str(pdf_file.absolute()),
-                "content": content
+    stale = find_stale_pdfs(files, manifest, individual_json_dir, pages_dir, normalize, ocr_config)
+    print(f"{len(files) - len(stale)} unchanged, {len(stale)} to extract")
+
+    # 3. Extract changed PDFs in parallel, one process per file
+    ocr_totals = {"pages": 0, "cache_hits": 0, "errors": 0}
+    norm_totals = {"chars_before": 0, "chars_after": 0, "tokens_before": 0, "tokens_after": 0}
+    written = 0
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    extract_pdf_job,
+                    str(pdf_file),
+                    str(individual_json_dir / (pdf_file.stem + ".json")),
+                    str(pages_dir / (pdf_file.stem + ".jsonl")),
+                    ocr_config,
+                    normalize
+                ): (pdf_file, entry)
+                for pdf_file, entry in stale
             }
-            
-            # Add to master list
-            all_data.append(file_data)
-
-            # Write individual JSON file
-            individual_file_name = pdf_file.stem + ".json"
-            individual_file_path = individual_json_dir / individual_file_name
-            
-            with open(individual_file_path, 'w', encoding='utf-8') as f:
-                json.dump(file_data, f, indent=4, ensure_ascii=False)
-
-    # 3. Write the master JSON file
+
+            for future in as_completed(futures):
+                pdf_file, entry = futures[future]
+                try:
+                    ok, json_written, ocr_stats, norm_stats = future.result()
+                except Exception as e:
+                    print(f"Error processing {pdf_file.name}: {e}")
+                    continue
+                for key, value in (ocr_stats or {}).items():
+                    ocr_totals[key] += value
+                for key in norm_totals:
+                    norm_totals[key] += (norm_stats or {}).get(key, 0)
+                if not ok:
+                    continue
+                print(f"Processed: {pdf_file.name}")
+
+                written += int(json_written)
+                ocr_errors = (ocr_stats or {}).get("errors", 0)
+                if ocr_errors:
+                    # Keep the partial text in the corpus but retry the failed pages next build
+                    entry = dict(entry, ocr_errors=ocr_errors)
+                    print(f"  {ocr_errors} page(s) failed OCR, will retry on the next build")
+                manifest[pdf_file.name] = entry
+
+    # 4. Drop PDFs that were removed from the folder
+    current_names = {pdf_file.name for pdf_file in files}
+    for name in [name for name in manifest if name not in current_names]:
+        (individual_json_dir / (Path(name).stem + ".json")).unlink(missing_ok=True)
+        (pages_dir / (Path(name).stem + ".jsonl")).unlink(missing_ok=True)
+        del manifest[name]
+        print(f"Removed: {name}")
+
+    # 5. Stream the page corpus and the master JSON from the per-document outputs
+    built = [pdf_file for pdf_file in files if pdf_file.name in manifest]
+
+    with CorpusWriter(corpus_path) as corpus:
+        for pdf_file in built:
+            corpus.append_document(pdf_file.name, str(pdf_file.absolute()), pages_dir / (pdf_file.stem + ".jsonl"))
+
+    # 6. Link near-duplicate passages to their first occurrence
+    dedup_index = None
+    if dedup and (corpus.changed or load_dedup_index(corpus_path) is None):
+        dedup_index = write_dedup_index(corpus_path, CorpusReader(corpus_path))
+    elif not dedup and corpus.changed:
+        # An index from the old corpus would drop passages by position from the new one
+        dedup_path_for(corpus_path).unlink(missing_ok=True)
+
     # Ensure the directory for the output file exists
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(all_data, f, indent=4, ensure_ascii=False)
+    master_written = write_master_json(output_path, [individual_json_dir / (f.stem + ".json") for f in built])
+    write_json_if_changed(manifest_path, manifest)
 
-    print(f"\nSuccess! Processed {len(all_data)} files.")
-    print(f"Master JSON saved to: {output_path}")
+    print(f"\nSuccess! {len(built)} files in knowledge base, {written} individual JSONs rewritten.")
+    if ocr_config:
+        print(f"OCR: {ocr_totals['pages']} pages recognised, {ocr_totals['cache_hits']} from cache, "
+              f"{ocr_totals['errors']} failed")
+    if norm_totals["chars_before"]:
+        print(f"Normalization: {norm_totals['chars_before'] - norm_totals['chars_after']:,} chars and "
+              f"~{norm_totals['tokens_before'] - norm_totals['tokens_after']:,} tokens removed")
+    print(f"Master JSON {'saved to' if master_written else 'unchanged at'}: {output_path}")
+    print(f"Page corpus {'saved to' if corpus.changed else 'unchanged at'}: {corpus_path}")
+    if dedup_index:
+        print(f"Deduplication: {len(dedup_index['duplicates'])}/{dedup_index['passages']} passages are "
+              f"near-duplicates ({dedup_index['chars_saved']:,} chars), index saved to {dedup_path_for(corpus_path)}")
     print(f"Individual JSONs saved to: {individual_json_dir}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Extract text from PDFs to JSON.")
     parser.add_argument("input_folder", help="Path to the folder containing PDF files")
     parser.add_argument("output_json_file", help="Path where the master JSON file will be saved")
-    
-    args = parser.parse_args()
-    
-    main(args.input_folder, args.output_json_file)
-
+    parser.add_argument("--ocr", choices=["auto", "remote", "local", "none"], default="auto",
+                        help="OCR backend for scanned pages: remote /ocr/infer endpoint, local tesseract, or none")
+    parser.add_argument("--ocr-language", default="kannada", choices=list(TESSERACT_LANGUAGES.keys()),
+                        help="Language hint for OCR")
+    parser.add_argument("--ocr-workers", type=int, default=OCR_WORKERS, help="Concurrent OCR requests")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and re-extract every PDF")
+    parser.add_argument("--corpus", default=None,
+                        help="Path for the page-level JSONL corpus (default: corpus.jsonl next to the master JSON)")
+    parser.add_argument("--no-normalize", action="store_true",
+                        help="Keep raw extracted text (skip whitespace, header/footer and line-break cleanup)")
+    parser.add_argument("--no-dedup", action="store_true", help="Skip near-duplicate passage detection")
 
+    args = parser.parse_args()
 
+    main(args.input_folder, args.output_json_file, args.ocr, args.ocr_language, args.ocr_workers,
+         args.workers, args.force, args.corpus, not args.no_normalize, not args.no_dedup)
@@ -0,0 +1,165 @@
+"""
+Gemini client pool across service accounts, projects and regions.
+
+Quota is per account/project/region, so each configured account adds
+throughput. A request goes to the available account with the fewest
+requests in flight. An account that answers 429, 5xx or an auth error is
+cooled down with exponential backoff, and the request fails over to the next
+account, so one account's rate limit does not stall every turn. Token usage
+is tallied per account from each response's usage_metadata.
+"""
+
+import time
+import random
+import threading
+
+import httpx
+from google.genai import errors
+
+COOLDOWN_BASE = 5.0
+COOLDOWN_MAX = 120.0
+# Statuses that say "this account, not this request" - try another account
+ACCOUNT_ERROR_STATUSES = {401, 403, 429}
+TOKEN_FIELDS = {
+    "prompt_tokens": "prompt_token_count",
+    "output_tokens": "candidates_token_count",
+    "thinking_tokens": "thoughts_token_count",
+    "total_tokens": "total_token_count"
+}
+
+
+def is_account_error(error):
+    """True if error is the account's fault (quota, auth, server) rather than the request's"""
+    if isinstance(error, errors.APIError):
+        return error.code in ACCOUNT_ERROR_STATUSES or error.code >= 500
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+class GeminiAccount:
+    """One genai client plus its routing state and usage counters"""
+
+    def __init__(self, name, client, project, location):
+        self.name = name
+        self.client = client
+        self.project = project
+        self.location = location
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.last_used = 0.0
+        self.last_error = None
+        self.usage = {field: 0 for field in TOKEN_FIELDS}
+
+    def available(self, now):
+        return now >= self.cooldown_until
+
+    def stats(self, now):
+        return {
+            "account": self.name,
+            "project": self.project,
+            "location": self.location,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "cooldown_s": round(max(0.0, self.cooldown_until - now), 1),
+            "last_error": self.last_error,
+            **self.usage
+        }
+
+
+class GeminiPool:
+    """Least-outstanding routing over GeminiAccounts with cooldown and failover.
+
+    generate_content / agenerate_content take the same keyword arguments as
+    client.models.generate_content and try each account at most once.
+    """
+
+    def __init__(self, accounts, cooldown_base=COOLDOWN_BASE, cooldown_max=COOLDOWN_MAX):
+        if not accounts:
+            raise ValueError("GeminiPool needs at least one account")
+        self.accounts = list(accounts)
+        self.cooldown_base = cooldown_base
+        self.cooldown_max = cooldown_max
+        self._lock = threading.Lock()
+
+    def _acquire(self, tried):
+        with self._lock:
+            now = time.monotonic()
+            candidates = [a for a in self.accounts if a not in tried]
+            available = [a for a in candidates if a.available(now)]
+            if available:
+                # Fewest in flight; ties go to the least recently used
+                account = min(available, key=lambda a: (a.outstanding, a.last_used))
+            else:
+                # Everything is cooling down: rather than stall, use the one that recovers first
+                account = min(candidates, key=lambda a: a.cooldown_until)
+            account.outstanding += 1
+            account.requests += 1
+            account.last_used = now
+            return account
+
+    def _release(self, account, response=None, error=None):
+        with self._lock:
+            account.outstanding -= 1
+            if response is not None:
+                account.consecutive_failures = 0
+                usage = getattr(response, "usage_metadata", None)
+                if usage is not None:
+                    for field, attribute in TOKEN_FIELDS.items():
+                        account.usage[field] += getattr(usage, attribute, None) or 0
+            elif error is not None:
+                account.failures += 1
+                account.last_error = f"{type(error).__name__}: {str(error)}"[:200]
+                if is_account_error(error):
+                    account.consecutive_failures += 1
+                    delay = min(self.cooldown_max, self.cooldown_base * 2 ** (account.consecutive_failures - 1))
+                    # Jitter so accounts that failed together do not all return at once
+                    account.cooldown_until = time.monotonic() + delay * random.uniform(0.5, 1.0)
+
+    def _should_fail_over(self, error, tried):
+        return is_account_error(error) and len(tried) < len(self.accounts)
+
+    def generate_content(self, **kwargs):
+        tried = []
+        while True:
+            account = self._acquire(tried)
+            tried.append(account)
+            try:
+                response = account.client.models.generate_content(**kwargs)
+            except Exception as e:
+                self._release(account, error=e)
+                if self._should_fail_over(e, tried):
+                    continue
+                raise
+            except BaseException:
+                self._release(account)
+                raise
+            self._release(account, response=response)
+            return response
+
+    async def agenerate_content(self, **kwargs):
+        tried = []
+        while True:
+            account = self._acquire(tried)
+            tried.append(account)
+            try:
+                response = await account.client.aio.models.generate_content(**kwargs)
+            except Exception as e:
+                self._release(account, error=e)
+                if self._should_fail_over(e, tried):
+                    continue
+                raise
+            except BaseException:
+                # Cancelled: the account did nothing wrong
+                self._release(account)
+                raise
+            self._release(account, response=response)
+            return response
+
+    def stats(self):
+        """Per-account routing state and token usage, for the UI and /health"""
+        with self._lock:
+            now = time.monotonic()
+            return [account.stats(now) for account in self.accounts]
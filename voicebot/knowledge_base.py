@@ -0,0 +1,179 @@
+"""
+Hot-reloading knowledge base for the voicebot.
+
+A background thread watches data/pdfs. When a PDF is added, changed or
+removed it runs the incremental pdf_to_json build (only the affected files
+are re-extracted) and loads a new snapshot. Snapshots are immutable and
+swapped in with a single reference assignment, so readers never wait on a
+reload and a Streamlit rerun only picks up a reference.
+"""
+
+import os
+import sys
+import json
+import fcntl
+import time
+import threading
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent / "data"
+if str(DATA_DIR) not in sys.path:
+    sys.path.insert(0, str(DATA_DIR))
+
+from corpus import CorpusReader, index_path_for
+from dedup import load_dedup_index, iter_unique_documents
+
+PDF_DIR = DATA_DIR / "pdfs"
+MASTER_FILE = DATA_DIR / "master.json"
+CORPUS_FILE = DATA_DIR / "corpus.jsonl"
+# Serializes rebuilds when several processes (server workers, the app) watch the same folder
+BUILD_LOCK_FILE = DATA_DIR / ".kb_build.lock"
+
+WATCH_INTERVAL = float(os.getenv("KB_WATCH_INTERVAL", "5"))
+
+
+class Snapshot:
+    """One immutable version of the knowledge base"""
+
+    def __init__(self, documents, source, version):
+        self.documents = documents
+        self.source = source
+        self.version = version
+        self.loaded_at = time.time()
+        # Serialized once per version; every Gemini call reuses it
+        self.context_str = json.dumps(documents)
+        self.summary = [
+            {"filename": doc["filename"], "chars": len(doc.get("content", ""))}
+            for doc in documents
+        ]
+
+
+def load_snapshot(version=0, corpus_file=CORPUS_FILE, master_file=MASTER_FILE):
+    """Read the page corpus (minus duplicate passages), falling back to master JSON"""
+    if corpus_file.exists() and index_path_for(corpus_file).exists():
+        reader = CorpusReader(corpus_file)
+        dedup_index = load_dedup_index(corpus_file)
+        if dedup_index:
+            documents = list(iter_unique_documents(reader, dedup_index))
+        else:
+            documents = list(reader.iter_documents())
+        return Snapshot(documents, str(corpus_file), version)
+
+    with open(master_file, 'r', encoding='utf-8') as f:
+        return Snapshot(json.load(f), str(master_file), version)
+
+
+def _folder_signature(folder):
+    """(name, mtime, size) of every PDF - cheap to compute on each poll"""
+    try:
+        entries = os.scandir(folder)
+    except FileNotFoundError:
+        return ()
+    with entries:
+        return tuple(sorted(
+            (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+            for entry in entries
+            if entry.name.lower().endswith(".pdf") and entry.is_file()
+        ))
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return None
+
+
+class KnowledgeBase:
+    """Holds the current snapshot and keeps it fresh from a background watcher thread"""
+
+    def __init__(self, pdf_dir=PDF_DIR, master_file=MASTER_FILE, corpus_file=CORPUS_FILE,
+                 interval=WATCH_INTERVAL):
+        self.pdf_dir = Path(pdf_dir)
+        self.master_file = Path(master_file)
+        self.corpus_file = Path(corpus_file)
+        self.interval = interval
+        self.reloading = False
+        self.last_error = None
+        self.reload_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._pdf_signature = _folder_signature(self.pdf_dir)
+        self._corpus_signature = _file_signature(self.corpus_file)
+        self._snapshot = load_snapshot(0, self.corpus_file, self.master_file)
+
+    @property
+    def snapshot(self):
+        """The current snapshot - never blocks"""
+        return self._snapshot
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="kb-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _rebuild_corpus(self):
+        """Run the incremental pdf_to_json build for the watched folder.
+
+        Other processes wait on the lock; their build then finds nothing stale.
+        """
+        import pdf_to_json
+        with open(BUILD_LOCK_FILE, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                pdf_to_json.main(str(self.pdf_dir), str(self.master_file), corpus_path=str(self.corpus_file))
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _swap(self):
+        self._snapshot = load_snapshot(self._snapshot.version + 1, self.corpus_file, self.master_file)
+        self._corpus_signature = _file_signature(self.corpus_file)
+        self.reload_count += 1
+        print(f"[Knowledge Base] Loaded version {self._snapshot.version} "
+              f"({len(self._snapshot.documents)} documents)")
+
+    def _watch(self):
+        # PDFs may have been added, changed or removed while the server was down, which the
+        # signature taken in __init__ cannot see: run the incremental build once at startup
+        needs_build = self.pdf_dir.is_dir()
+
+        while not self._stop.is_set():
+            try:
+                pdf_signature = _folder_signature(self.pdf_dir)
+                if needs_build or pdf_signature != self._pdf_signature:
+                    self.reloading = True
+                    self._rebuild_corpus()
+                    self._pdf_signature = pdf_signature
+                    needs_build = False
+                    if _file_signature(self.corpus_file) != self._corpus_signature:
+                        self._swap()
+                elif _file_signature(self.corpus_file) != self._corpus_signature:
+                    # Corpus rebuilt by hand with pdf_to_json.py
+                    self.reloading = True
+                    self._swap()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"[Knowledge Base] Reload failed: {self.last_error}")
+            finally:
+                self.reloading = False
+            self._stop.wait(self.interval)
+
+
+_knowledge_base = None
+_lock = threading.Lock()
+
+
+def get_knowledge_base():
+    """Process-wide knowledge base with its watcher started on first use"""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _lock:
+            if _knowledge_base is None:
+                _knowledge_base = KnowledgeBase().start()
+    return _knowledge_base
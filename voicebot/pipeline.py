@@ -0,0 +1,363 @@
+"""
+Voicebot pipeline shared by the Streamlit app and the HTTP service:
+STT, Gemini answer generation and chunked TTS.
+"""
+
+import base64
+import os
+import sys
+import json
+from pathlib import Path
+from google.genai.types import GenerateContentConfig
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from resources import load_config, get_gemini_pool, get_http_session
+from gemini_pool import is_account_error
+
+# Retry/hedging policies live in the repo-level common package, shared with model_exp
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+from common.resilience import Policy, POLICIES, CircuitOpenError, ReplicaPool, request_key
+
+load_config()
+
+# Constants
+NGROK_BASE_URL = os.getenv("NGROK_BASE_URL", "https://your-ngrok-url.ngrok-free.app")
+STT_API_URL = f"{NGROK_BASE_URL}/asr/transcribe"
+TTS_API_URL = f"{NGROK_BASE_URL}/tts/tts"
+# TTS chunks in flight per answer, per TTS replica
+TTS_WORKERS_PER_REPLICA = 5
+
+
+def replica_urls(env_name, default_url):
+    """Comma-separated endpoint URLs from env_name, or just default_url"""
+    urls = [url.strip() for url in os.getenv(env_name, "").split(",") if url.strip()]
+    return urls or [default_url]
+
+
+# One pool per service, shared by every session in the process. List several
+# full endpoint URLs (e.g. one per GPU box) to spread load across them.
+STT_REPLICAS = ReplicaPool("stt", replica_urls("STT_REPLICA_URLS", STT_API_URL))
+TTS_REPLICAS = ReplicaPool("tts", replica_urls("TTS_REPLICA_URLS", TTS_API_URL))
+TTS_CONCURRENCY = TTS_WORKERS_PER_REPLICA * len(TTS_REPLICAS)
+
+# --- Gemini Client Setup ---
+
+GEMINI_MODEL = "gemini-2.5-flash"
+# The pool already fails over across accounts; this retries once more after
+# backoff when every account failed, and bounds the whole turn
+GEMINI_POLICY = Policy("gemini", timeout=45, deadline=90, retries=1, retryable=is_account_error)
+
+# Master Instructions
+MASTER_INSTRUCTIONS = """
+You are an AI assistant working for a Government of Karnataka department.
+
+You have been provided with official government documents, circulars, and policy texts as context.
+You MUST base your answers strictly and only on the given documents.
+Do NOT use outside knowledge or assumptions.
+
+LANGUAGE RULES:
+- Detect the language of the user input based on the script/characters used.
+- If the input uses English characters, respond in English.
+- If the input uses Devanagari script (Hindi), respond in Hindi.
+- Otherwise if input uses Kannada script, respond in Kannada.
+- The response language MUST match the input language exactly.
+- Do NOT mix languages in a single response.
+
+INPUT QUALITY NOTE:
+- User input may contain transcription errors, spelling mistakes, or malformed words due to speech-to-text.
+- Infer the intended meaning using context and language understanding.
+
+RESPONSE STYLE (VERY IMPORTANT):
+- Responses must be SHORT, clear, and precise.
+- Optimize responses to be spoken aloud as a voice message.
+- Avoid long explanations, legal-style wording, or unnecessary details.
+- Prefer concise sentences.
+- Do NOT include greetings, fillers, or meta commentary.
+
+OUTPUT FORMAT (MANDATORY):
+Your response MUST always be valid JSON in the following format:
+
+{
+  "answer": "<response in the detected language>",
+  "source_reference": "<brief document name or section reference>"
+}
+
+MISSING INFORMATION RULE:
+If the required information is NOT present in the provided documents, respond as follows
+(using the SAME language as the user input):
+
+{
+  "answer": "<equivalent of: 'This information is not available in the provided documents.'>",
+  "source_reference": "N/A"
+}
+"""
+
+
+# Bytecode to Kannada character mappings
+BYTECODE_MAP = {
+    '<0xE0><0xB2><0x94>': 'ಔ',
+    '<0xE0><0xB2><0x8A>': 'ಊ',
+    '<0xE0><0xB2><0x8E>': 'ಎ',
+    '<0xE0><0xB2><0x90>': 'ಐ',
+    '<0xE0><0xB2><0xA2>': 'ಢ',
+    '<0xE0><0xB2><0x9D>': 'ಝ',
+    '<0xE0><0xB2><0x8B>': 'ಋ',
+    '<0x2E>': '.',
+}
+
+# --- Helper Functions ---
+
+def fix_bytecodes(text):
+    """Replace bytecodes with proper Kannada characters"""
+    corrected = text
+    for bytecode, kannada_char in BYTECODE_MAP.items():
+        corrected = corrected.replace(bytecode, kannada_char)
+    return corrected
+
+def split_text_into_chunks(text, max_chars=100):
+    """Split text into chunks of approximately max_chars, splitting at sentence or word boundaries"""
+    if len(text) <= max_chars:
+        return [text]
+    
+    chunks = []
+    # Sentence delimiters for Kannada and English
+    sentence_delimiters = ['।', '.', '!', '?', '\n']
+    
+    current_chunk = ""
+    sentences = []
+    
+    # First, try to split by sentences
+    temp = text
+    for delimiter in sentence_delimiters:
+        temp = temp.replace(delimiter, delimiter + '<SPLIT>')
+    
+    parts = temp.split('<SPLIT>')
+    
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+            
+        # If adding this part would exceed max_chars, save current chunk and start new one
+        if current_chunk and len(current_chunk) + len(part) + 1 > max_chars:
+            chunks.append(current_chunk.strip())
+            current_chunk = part
+        else:
+            if current_chunk:
+                current_chunk += " " + part
+            else:
+                current_chunk = part
+        
+        # If current part itself is too long, split by words
+        if len(current_chunk) > max_chars:
+            words = current_chunk.split()
+            temp_chunk = ""
+            for word in words:
+                if len(temp_chunk) + len(word) + 1 <= max_chars:
+                    temp_chunk += (" " if temp_chunk else "") + word
+                else:
+                    if temp_chunk:
+                        chunks.append(temp_chunk.strip())
+                    temp_chunk = word
+            current_chunk = temp_chunk
+    
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+    
+    return chunks if chunks else [text]
+
+def stitch_audio_bytes(audio_chunks_list):
+    """Stitch multiple WAV audio byte arrays together by combining audio data and fixing header"""
+    if not audio_chunks_list:
+        return b''
+    if len(audio_chunks_list) == 1:
+        return audio_chunks_list[0]
+    
+    # Parse WAV header from first chunk to get format info
+    # WAV header structure: RIFF (4), filesize-8 (4), WAVE (4), fmt (4), fmt_size (4), format_data (16), data (4), data_size (4)
+    first_chunk = audio_chunks_list[0]
+    
+    # Extract header from first chunk (typically 44 bytes for standard WAV)
+    if len(first_chunk) < 44:
+        # If too short, just concatenate
+        return b''.join(audio_chunks_list)
+    
+    # Find the "data" chunk in the first WAV file
+    data_offset = first_chunk.find(b'data')
+    if data_offset == -1:
+        # No data chunk found, fallback to simple concat
+        return b''.join(audio_chunks_list)
+    
+    # The data chunk header is "data" (4 bytes) + size (4 bytes)
+    # Audio data starts after these 8 bytes
+    audio_data_start = data_offset + 8
+    
+    # Collect all audio data (skip headers from each chunk)
+    all_audio_data = []
+    for i, chunk in enumerate(audio_chunks_list):
+        if i == 0:
+            # For first chunk, include from audio_data_start
+            all_audio_data.append(chunk[audio_data_start:])
+        else:
+            # For subsequent chunks, find and skip their headers too
+            chunk_data_offset = chunk.find(b'data')
+            if chunk_data_offset != -1:
+                chunk_audio_start = chunk_data_offset + 8
+                all_audio_data.append(chunk[chunk_audio_start:])
+            else:
+                # If can't find data marker, skip first 44 bytes as fallback
+                all_audio_data.append(chunk[44:] if len(chunk) > 44 else chunk)
+    
+    # Combine all audio data
+    combined_audio_data = b''.join(all_audio_data)
+    
+    # Create new WAV file with corrected header
+    # Take header from first chunk up to the data size field
+    header = bytearray(first_chunk[:audio_data_start])
+    
+    # Update the data chunk size (4 bytes before audio data starts)
+    new_data_size = len(combined_audio_data)
+    header[audio_data_start - 4:audio_data_start] = new_data_size.to_bytes(4, 'little')
+    
+    # Update the file size in RIFF header (at bytes 4-8)
+    # RIFF chunk size = 4 (WAVE) + 8 (fmt) + 16 (fmt data) + 8 (data header) + data_size
+    new_file_size = 36 + new_data_size  # 36 = header size before data
+    header[4:8] = new_file_size.to_bytes(4, 'little')
+    
+    # Combine header and audio data
+    return bytes(header) + combined_audio_data
+
+def build_generate_config(metadata_string, timeout=None):
+    return GenerateContentConfig(
+        system_instruction=f"{MASTER_INSTRUCTIONS}\n\n### Additional User Information: {metadata_string}.",
+        temperature=0.25,
+        response_mime_type="application/json",
+        thinking_config={"thinking_budget": 2048},
+        http_options={"timeout": int(timeout * 1000)} if timeout else None,
+    )
+
+def parse_response(response):
+    """Parse Gemini's JSON answer - returns {"answer", "source_reference"} or None"""
+    if not response or not response.candidates:
+        return None
+
+    candidate = response.candidates[0]
+    if not candidate.content or not candidate.content.parts:
+        return None
+
+    raw_text = candidate.content.parts[0].text
+    if not raw_text:
+        return None
+
+    try:
+        data = json.loads(raw_text)
+        return {
+            "answer": data.get("answer", ""),
+            "source_reference": data.get("source_reference", "N/A")
+        }
+    except json.JSONDecodeError:
+        return {
+            "answer": raw_text,
+            "source_reference": "N/A"
+        }
+
+def generate_and_parse_response(messages, metadata_string):
+    """Generate content from Gemini (via the account pool) and parse Kannada JSON response"""
+    response = GEMINI_POLICY.call(lambda timeout: get_gemini_pool().generate_content(
+        model=GEMINI_MODEL,
+        contents=messages,
+        config=build_generate_config(metadata_string, timeout),
+    ))
+    return response, parse_response(response)
+
+def to_gemini_history(messages):
+    """Convert [{"role", "content"}] chat messages to Gemini contents"""
+    return [
+        {"role": "user" if msg["role"] == "user" else "model", "parts": [{"text": msg["content"]}]}
+        for msg in messages
+    ]
+
+def extract_transcript(result):
+    """Transcript text from an STT response, with bytecode artifacts fixed"""
+    raw_text = (
+        result.get('text') or 
+        result.get('transcription') or 
+        result.get('transcript') or 
+        ''
+    )
+    return fix_bytecodes(raw_text)
+
+def post_stt(audio_bytes, filename="recording.wav", language="kannada"):
+    """Send audio to the STT backend (retried and hedged) - returns the response"""
+    return POLICIES["stt"].call(STT_REPLICAS.bind(lambda url, timeout: get_http_session().post(
+        url,
+        files={'file': (filename, audio_bytes, 'audio/wav')},
+        data={'language': language},
+        timeout=timeout
+    )))
+
+def process_tts_chunk(chunk_text, chunk_index, total_chunks):
+    """Process a single TTS chunk - returns (index, audio_bytes, sample_rate, error)"""
+    try:
+        # Repeated chunks (within an answer or across users) share one in-flight call
+        tts_response = POLICIES["tts"].call(TTS_REPLICAS.bind(lambda url, timeout: get_http_session().post(
+            url, 
+            json={"text": chunk_text}, 
+            timeout=timeout
+        )), key=request_key(chunk_text))
+        
+        if tts_response.status_code == 200:
+            tts_result = tts_response.json()
+            audio_b64 = tts_result.get("audio_base64")
+            sample_rate = tts_result.get("sample_rate", 22050)
+            
+            if audio_b64:
+                audio_bytes = base64.b64decode(audio_b64)
+                return (chunk_index, audio_bytes, sample_rate, None)
+            else:
+                return (chunk_index, None, None, f"Missing audio_base64 in response")
+        else:
+            return (chunk_index, None, None, f"TTS API returned status {tts_response.status_code}")
+    except Exception as e:
+        return (chunk_index, None, None, f"{type(e).__name__}: {str(e)}")
+
+def tts_available():
+    """False while the TTS circuit breaker is open - answers go out as text only"""
+    return POLICIES["tts"].breaker.available
+
+def process_tts_concurrent(text_chunks):
+    """Process multiple TTS chunks concurrently and return stitched audio"""
+    audio_results = [None] * len(text_chunks)
+    sample_rate = 22050
+    errors = []
+
+    if not tts_available():
+        return None, sample_rate, [str(POLICIES["tts"].breaker.error())]
+    
+    with ThreadPoolExecutor(max_workers=min(TTS_CONCURRENCY, len(text_chunks))) as executor:
+        futures = {
+            executor.submit(process_tts_chunk, chunk, i, len(text_chunks)): i 
+            for i, chunk in enumerate(text_chunks)
+        }
+        
+        for future in as_completed(futures):
+            chunk_index, audio_bytes, chunk_sample_rate, error = future.result()
+            
+            if error:
+                errors.append(f"Chunk {chunk_index + 1}: {error}")
+            elif audio_bytes:
+                audio_results[chunk_index] = audio_bytes
+                if chunk_index == 0 and chunk_sample_rate:
+                    sample_rate = chunk_sample_rate
+    
+    # Filter out None values
+    audio_chunks = [chunk for chunk in audio_results if chunk is not None]
+    
+    if not audio_chunks:
+        return None, sample_rate, errors
+    
+    # Stitch audio chunks
+    final_audio = stitch_audio_bytes(audio_chunks)
+    
+    return final_audio, sample_rate, errors
@@ -0,0 +1,215 @@
+"""
+Process-wide registry of expensive resources.
+
+Streamlit re-executes app.py on every interaction, but the objects it needs
+(service-account credentials, the Gemini client pool, pooled HTTP sessions, the
+knowledge base) only change when their configuration does. Each resource is
+built lazily on first use, shared by every session and thread in the
+process, and rebuilt only when its key - a hash of the env config or a
+file's stat signature - changes.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import find_dotenv, load_dotenv
+
+SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+GCP_PROJECT = "certain-perigee-466307-q6"
+GCP_LOCATION = "us-central1"
+HTTP_POOL_SIZE = int(os.getenv("VOICEBOT_HTTP_POOL_SIZE", "20"))
+ENV_FILE = Path(__file__).parent / ".env"
+
+
+class ResourceRegistry:
+    """Lazy, thread-safe singletons keyed by a config fingerprint"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self.builds = {}
+
+    def get(self, name, factory, key=None):
+        """Return the resource called name, calling factory() if missing or if key changed"""
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+        # Per-resource lock: a slow build does not block unrelated resources
+        with build_lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == key:
+                return entry[1]
+            value = factory()
+            self._entries[name] = (key, value)
+            self.builds[name] = self.builds.get(name, 0) + 1
+            return value
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+
+registry = ResourceRegistry()
+
+
+def file_signature(path):
+    """(path, mtime, size) - cheap stand-in for a content hash on every rerun"""
+    try:
+        stat = os.stat(path)
+        return (str(path), stat.st_mtime_ns, stat.st_size)
+    except (FileNotFoundError, TypeError):
+        return (str(path), None, None)
+
+
+def load_config():
+    """Load .env once per version of the file; an edited .env overrides the old values"""
+    # voicebot/.env, whatever directory the app or server is started from; otherwise
+    # searched upward from this file like the old load_dotenv() in app.py
+    dotenv_path = str(ENV_FILE) if ENV_FILE.exists() else find_dotenv()
+    signature = file_signature(dotenv_path) if dotenv_path else None
+    first_load = "config" not in registry
+
+    def load():
+        if dotenv_path:
+            load_dotenv(dotenv_path, override=not first_load)
+        return signature
+
+    return registry.get("config", load, key=signature)
+
+
+def _credentials_key():
+    sa_json = os.getenv("GCP_SA_JSON")
+    if sa_json:
+        return ("json", hashlib.sha256(sa_json.encode("utf-8")).hexdigest())
+    sa_path = os.getenv("GCP_SA_PATH")
+    if sa_path:
+        return ("path",) + file_signature(sa_path)
+    return None
+
+
+def get_credentials():
+    """Service-account credentials from GCP_SA_JSON or GCP_SA_PATH"""
+    from google.oauth2 import service_account
+
+    load_config()
+    key = _credentials_key()
+
+    def build():
+        if os.getenv("GCP_SA_JSON"):
+            sa_info = json.loads(os.getenv("GCP_SA_JSON"))
+            return service_account.Credentials.from_service_account_info(sa_info, scopes=SCOPES)
+        if os.getenv("GCP_SA_PATH"):
+            return service_account.Credentials.from_service_account_file(os.getenv("GCP_SA_PATH"), scopes=SCOPES)
+        raise ValueError("Either GCP_SA_JSON or GCP_SA_PATH must be set")
+
+    return registry.get("credentials", build, key=key)
+
+
+def _gemini_account_configs():
+    """[{"name", "project", "location", "sa_json" | "sa_path"}] from GEMINI_ACCOUNTS or GEMINI_ACCOUNTS_PATH.
+
+    Without either, a single account uses GCP_SA_JSON/GCP_SA_PATH in GCP_PROJECT/GCP_LOCATION.
+    Entries without sa_json/sa_path also use those credentials, e.g. to add a region.
+    """
+    if os.getenv("GEMINI_ACCOUNTS"):
+        configs = json.loads(os.getenv("GEMINI_ACCOUNTS"))
+    elif os.getenv("GEMINI_ACCOUNTS_PATH"):
+        with open(os.getenv("GEMINI_ACCOUNTS_PATH"), 'r', encoding='utf-8') as f:
+            configs = json.load(f)
+    else:
+        configs = [{}]
+    if not isinstance(configs, list) or not configs:
+        raise ValueError("GEMINI_ACCOUNTS must be a non-empty JSON list")
+
+    accounts = []
+    for index, config in enumerate(configs):
+        account = {
+            "name": config.get("name") or f"account_{index + 1}",
+            "project": config.get("project") or GCP_PROJECT,
+            "location": config.get("location") or GCP_LOCATION
+        }
+        if config.get("sa_json"):
+            sa_json = config["sa_json"]
+            account["sa_json"] = sa_json if isinstance(sa_json, dict) else json.loads(sa_json)
+        elif config.get("sa_path"):
+            account["sa_path"] = config["sa_path"]
+        accounts.append(account)
+    return accounts
+
+
+def _account_credentials(account):
+    from google.oauth2 import service_account
+
+    if "sa_json" in account:
+        return service_account.Credentials.from_service_account_info(account["sa_json"], scopes=SCOPES)
+    if "sa_path" in account:
+        return service_account.Credentials.from_service_account_file(account["sa_path"], scopes=SCOPES)
+    return get_credentials()
+
+
+def get_gemini_pool():
+    """GeminiPool over every configured account, rebuilt when the account config changes"""
+    from google import genai
+    from gemini_pool import GeminiPool, GeminiAccount
+
+    load_config()
+    accounts = _gemini_account_configs()
+    config_hash = hashlib.sha256(json.dumps(accounts, sort_keys=True).encode("utf-8")).hexdigest()
+    key = (
+        config_hash,
+        tuple(file_signature(a["sa_path"]) for a in accounts if "sa_path" in a),
+        _credentials_key()
+    )
+
+    def build():
+        return GeminiPool([
+            GeminiAccount(
+                account["name"],
+                genai.Client(vertexai=True, project=account["project"], location=account["location"],
+                             credentials=_account_credentials(account)),
+                account["project"],
+                account["location"]
+            )
+            for account in accounts
+        ])
+
+    return registry.get("gemini_pool", build, key=key)
+
+
+def get_http_session():
+    """requests.Session with a keep-alive pool for the STT/TTS backends"""
+    def build():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    return registry.get("http_session", build, key=HTTP_POOL_SIZE)
+
+
+def get_context():
+    """Current knowledge base snapshot; the knowledge base itself tracks file changes"""
+    from knowledge_base import get_knowledge_base
+    return registry.get("knowledge_base", get_knowledge_base).snapshot
+
+
+def ensure_directory(path):
+    """mkdir once per process instead of on every rerun"""
+    path = Path(path)
+    return registry.get(f"dir:{path}", lambda: path.mkdir(exist_ok=True, parents=True) or path, key=str(path))
@@ -0,0 +1,364 @@
+"""
+Headless HTTP service for the voicebot (the infomatics_bot API).
+
+Serves the same STT -> Gemini -> TTS pipeline as the Streamlit app without a
+browser session per request. Handlers are async end to end: STT and TTS go
+through one pooled httpx client per worker and Gemini through the async
+client, so a worker holds many conversations in flight at once.
+
+Endpoints:
+    POST /infomatics_bot/generate_response            text in, text out
+    POST /infomatics_bot/generate_response/audio_out  text in, text + WAV out
+    POST /infomatics_bot/generate_response/audio_in   audio in (multipart), text out
+                                                      (audio_out=true adds WAV)
+    POST /infomatics_bot/generate_response/stream     text in, NDJSON events out: the answer,
+                                                      then each TTS chunk as it is ready (or one
+                                                      audio_unavailable event while TTS is down)
+    GET  /health
+
+Run with several worker processes:
+    python server.py --port 8000 --workers 4
+"""
+
+import os
+import json
+import base64
+import asyncio
+import argparse
+from pathlib import Path
+from contextlib import asynccontextmanager
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from knowledge_base import get_knowledge_base
+from pipeline import (
+    STT_REPLICAS, TTS_REPLICAS, TTS_CONCURRENCY, GEMINI_MODEL, GEMINI_POLICY, POLICIES, CircuitOpenError,
+    build_generate_config, parse_response, to_gemini_history, extract_transcript, fix_bytecodes,
+    split_text_into_chunks, stitch_audio_bytes, tts_available, request_key
+)
+from resources import get_gemini_pool
+
+REQUEST_TIMEOUT = 60
+# Pooled connections to the STT/TTS backends, per worker
+MAX_CONNECTIONS = int(os.getenv("VOICEBOT_MAX_CONNECTIONS", "100"))
+DEFAULT_SAMPLE_RATE = 22050
+
+FALLBACK_ANSWER = "Sorry, I couldn't generate a valid response."
+
+
+class RequestError(Exception):
+    """Bad input from the client - returned as 400"""
+
+
+class UpstreamError(Exception):
+    """A backend (STT, Gemini, TTS) failed - returned as 502"""
+
+
+# Everything a backend call can raise once retries are exhausted. TimeoutError is the
+# policy's own wait_for deadline firing (asyncio.TimeoutError is the same class on 3.11+)
+BACKEND_ERRORS = (UpstreamError, CircuitOpenError, httpx.HTTPError, TimeoutError, asyncio.TimeoutError)
+
+
+def _error_message(error):
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        return f"Backend timed out: {str(error) or type(error).__name__}"
+    return str(error)
+
+
+def _backend_json(response, name):
+    """Decode a backend's JSON object body - a malformed one is the backend's fault, not the client's"""
+    try:
+        result = response.json()
+    except ValueError:
+        raise UpstreamError(f"{name} API returned invalid JSON: {response.text[:200]}")
+    if not isinstance(result, dict):
+        raise UpstreamError(f"{name} API returned {type(result).__name__}, expected a JSON object")
+    return result
+
+
+def validate_chat_history(chat_history):
+    if not isinstance(chat_history, list):
+        raise RequestError("chat_history must be a list")
+    for msg in chat_history:
+        if not isinstance(msg, dict) or msg.get("role") not in ("user", "assistant") \
+                or not isinstance(msg.get("content"), str):
+            raise RequestError('chat_history items must be {"role": "user"|"assistant", "content": str}')
+    return chat_history
+
+
+def _parse_json_field(value, default, name):
+    if value is None or value == "":
+        return default
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        raise RequestError(f"{name} must be JSON")
+
+
+async def transcribe(http, audio_bytes, filename="recording.wav", language="kannada"):
+    response = await POLICIES["stt"].acall(STT_REPLICAS.abind(lambda url, timeout: http.post(
+        url, files={'file': (filename, audio_bytes, 'audio/wav')}, data={'language': language},
+        timeout=timeout
+    )))
+    if response.status_code != 200:
+        raise UpstreamError(f"STT API returned status {response.status_code}: {response.text[:200]}")
+    return extract_transcript(_backend_json(response, "STT"))
+
+
+async def synthesize_chunk(http, chunk, semaphore):
+    """One TTS request - returns (wav_bytes, sample_rate)"""
+    async with semaphore:
+        response = await POLICIES["tts"].acall(
+            TTS_REPLICAS.abind(lambda url, timeout: http.post(url, json={"text": chunk}, timeout=timeout)),
+            key=request_key(chunk)
+        )
+    if response.status_code != 200:
+        raise UpstreamError(f"TTS API returned status {response.status_code}")
+    result = _backend_json(response, "TTS")
+    if not result.get("audio_base64"):
+        raise UpstreamError("Missing audio_base64 in response")
+    try:
+        audio_bytes = base64.b64decode(result["audio_base64"])
+    except (TypeError, ValueError):
+        raise UpstreamError("TTS API returned invalid audio_base64")
+    return audio_bytes, result.get("sample_rate", DEFAULT_SAMPLE_RATE)
+
+
+async def synthesize(http, text):
+    """Chunked TTS with bounded concurrency - returns (wav_bytes or None, sample_rate, errors)"""
+    if not tts_available():
+        return None, DEFAULT_SAMPLE_RATE, [str(POLICIES["tts"].breaker.error())]
+    chunks = split_text_into_chunks(text, max_chars=100)
+    semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+    results = await asyncio.gather(
+        *(synthesize_chunk(http, chunk, semaphore) for chunk in chunks), return_exceptions=True
+    )
+
+    audio_chunks = []
+    errors = []
+    sample_rate = DEFAULT_SAMPLE_RATE
+    for index, result in enumerate(results):
+        if isinstance(result, Exception):
+            errors.append(f"Chunk {index + 1}: {type(result).__name__}: {str(result)}")
+        else:
+            audio_chunks.append(result[0])
+            sample_rate = result[1]
+
+    return (stitch_audio_bytes(audio_chunks) if audio_chunks else None), sample_rate, errors
+
+
+async def generate_answer(http, message, chat_history, metadata, audio_out=False):
+    """One conversation turn - returns the response body"""
+    snapshot = get_knowledge_base().snapshot
+    metadata_string = snapshot.context_str
+    if metadata:
+        metadata_string += f"\n\n### Request Metadata: {json.dumps(metadata, ensure_ascii=False)}"
+
+    history = chat_history + [{"role": "user", "content": message}]
+    try:
+        response = await GEMINI_POLICY.acall(lambda timeout: get_gemini_pool().agenerate_content(
+            model=GEMINI_MODEL,
+            contents=to_gemini_history(history),
+            config=build_generate_config(metadata_string, timeout),
+        ))
+    except (CircuitOpenError, TimeoutError, asyncio.TimeoutError):
+        raise
+    except Exception as e:
+        raise UpstreamError(f"Gemini error: {type(e).__name__}: {str(e)}")
+
+    parsed = parse_response(response)
+    answer = fix_bytecodes(parsed["answer"]) if parsed and parsed["answer"] else FALLBACK_ANSWER
+    result = {
+        "answer": answer,
+        "source_reference": parsed["source_reference"] if parsed else "N/A",
+        "chat_history": history + [{"role": "assistant", "content": answer}]
+    }
+
+    if audio_out:
+        audio_bytes, sample_rate, errors = await synthesize(http, answer)
+        result["audio_base64"] = base64.b64encode(audio_bytes).decode("utf-8") if audio_bytes else None
+        result["sample_rate"] = sample_rate
+        if errors:
+            result["tts_errors"] = errors
+    return result
+
+
+async def _read_text_request(request):
+    """Validate a JSON turn - returns (message, chat_history, metadata)"""
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise RequestError("Body must be JSON")
+    if not isinstance(body, dict):
+        raise RequestError("Body must be a JSON object")
+    message = body.get("message")
+    if not isinstance(message, str) or not message.strip():
+        raise RequestError("message is required")
+    chat_history = validate_chat_history(body.get("chat_history") or [])
+    metadata = body.get("metadata") or {}
+    return message, chat_history, metadata
+
+
+async def _text_request(request, audio_out):
+    message, chat_history, metadata = await _read_text_request(request)
+    return await generate_answer(request.app.state.http, message, chat_history, metadata, audio_out)
+
+
+def handle_errors(handler):
+    async def wrapper(request):
+        try:
+            return JSONResponse(await handler(request))
+        except RequestError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        except UpstreamError as e:
+            return JSONResponse({"error": str(e)}, status_code=502)
+        except CircuitOpenError as e:
+            # Fail fast while a backend is down; clients retry 503 after Retry-After
+            return JSONResponse({"error": str(e)}, status_code=503,
+                                headers={"Retry-After": str(max(1, round(e.retry_in)))})
+        except (TimeoutError, asyncio.TimeoutError) as e:
+            return JSONResponse({"error": _error_message(e)}, status_code=504)
+        except httpx.HTTPError as e:
+            return JSONResponse({"error": f"Backend connection error: {type(e).__name__}: {str(e)}"},
+                                status_code=502)
+    return wrapper
+
+
+@handle_errors
+async def generate_response(request):
+    return await _text_request(request, audio_out=False)
+
+
+@handle_errors
+async def generate_response_audio_out(request):
+    return await _text_request(request, audio_out=True)
+
+
+@handle_errors
+async def generate_response_audio_in(request):
+    async with request.form() as form:
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise RequestError("file is required")
+        audio_bytes = await upload.read()
+        filename = upload.filename or "recording.wav"
+        language = form.get("language") or "kannada"
+        chat_history = validate_chat_history(_parse_json_field(form.get("chat_history"), [], "chat_history"))
+        metadata = _parse_json_field(form.get("metadata"), {}, "metadata")
+        audio_out = (form.get("audio_out") or "").lower() in ("1", "true", "yes")
+
+    http = request.app.state.http
+    transcript = await transcribe(http, audio_bytes, filename, language)
+    if not transcript.strip():
+        raise RequestError("No speech detected in audio")
+
+    result = await generate_answer(http, transcript, chat_history, metadata, audio_out)
+    result["transcript"] = transcript
+    return result
+
+
+def _ndjson(event):
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def generate_response_stream(request):
+    """Answer first, then the audio chunk by chunk in order, so clients can start playback early"""
+    try:
+        message, chat_history, metadata = await _read_text_request(request)
+    except RequestError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    http = request.app.state.http
+
+    async def events():
+        try:
+            result = await generate_answer(http, message, chat_history, metadata)
+        except BACKEND_ERRORS as e:
+            yield _ndjson({"type": "error", "error": _error_message(e)})
+            return
+        yield _ndjson({"type": "answer", **result})
+
+        if not tts_available():
+            # Text-only answer while the TTS breaker is open
+            yield _ndjson({"type": "audio_unavailable",
+                           "error": str(POLICIES["tts"].breaker.error())})
+            yield _ndjson({"type": "done"})
+            return
+
+        chunks = split_text_into_chunks(result["answer"], max_chars=100)
+        semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+        tasks = [asyncio.create_task(synthesize_chunk(http, chunk, semaphore)) for chunk in chunks]
+        try:
+            for index, task in enumerate(tasks):
+                try:
+                    audio_bytes, sample_rate = await task
+                    yield _ndjson({
+                        "type": "audio",
+                        "index": index,
+                        "total": len(tasks),
+                        "audio_base64": base64.b64encode(audio_bytes).decode("utf-8"),
+                        "sample_rate": sample_rate
+                    })
+                except BACKEND_ERRORS as e:
+                    yield _ndjson({"type": "audio_error", "index": index, "error": _error_message(e)})
+        finally:
+            # Client went away mid-stream: stop the remaining TTS requests
+            for task in tasks:
+                task.cancel()
+        yield _ndjson({"type": "done"})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+async def health(request):
+    snapshot = get_knowledge_base().snapshot
+    return JSONResponse({
+        "status": "ok",
+        "knowledge_base_version": snapshot.version,
+        "documents": len(snapshot.documents),
+        "gemini_accounts": get_gemini_pool().stats(),
+        "backends": [policy.stats() for policy in (*POLICIES.values(), GEMINI_POLICY)],
+        "replicas": {pool.name: pool.stats() for pool in (STT_REPLICAS, TTS_REPLICAS)}
+    })
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.http = httpx.AsyncClient(
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+    )
+    # Load the knowledge base and start its watcher before taking traffic
+    get_knowledge_base()
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+
+
+app = Starlette(
+    routes=[
+        Route("/infomatics_bot/generate_response", generate_response, methods=["POST"]),
+        Route("/infomatics_bot/generate_response/audio_out", generate_response_audio_out, methods=["POST"]),
+        Route("/infomatics_bot/generate_response/audio_in", generate_response_audio_in, methods=["POST"]),
+        Route("/infomatics_bot/generate_response/stream", generate_response_stream, methods=["POST"]),
+        Route("/health", health, methods=["GET"]),
+    ],
+    lifespan=lifespan
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the voicebot HTTP service")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("VOICEBOT_WORKERS", "1")),
+                        help="Worker processes, each with its own event loop and connection pool")
+    args = parser.parse_args()
+
+    uvicorn.run("server:app", host=args.host, port=args.port, workers=args.workers,
+                app_dir=str(Path(__file__).parent))